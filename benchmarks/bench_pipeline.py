@@ -0,0 +1,151 @@
+"""
+Times the pipeline building blocks on synthetic documents of several sizes
+(see synthetic_corpus.py) and writes the results as JSON:
+  XmiParser.parse (tree and streaming, plain and gzipped), milestone_1
+  extract_from_xmi, clean_text, every NER annotator and evaluate().
+
+Runs offline on a CPU: the Hugging Face hub is switched to offline mode and
+annotators whose models or data are not available locally are skipped (the
+reason is recorded in the output).
+
+usage: python -m benchmarks.bench_pipeline [--sizes session_1918,session_1975] [--repeat 3]
+                                           [--no-models] [--out bench_pipeline.json]
+"""
+import argparse
+import json
+import os
+import platform
+import random
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import SIZES, write_corpus
+from milestone_1.preprocessing.clean_plain_text import clean_text
+from milestone_1.preprocessing.xmi_parser import extract_from_xmi
+from milestone_2 import model_registry
+from milestone_2.entities import Entity
+from milestone_2.evaluate_results import evaluate
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+def best_of(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def fake_predictions(ground_truth: list[Entity], seed: int) -> list[Entity]:
+    # ~70% hits, some shifted spans and relabeled entities, so evaluate() sees TP, FP and FN
+    rng = random.Random(seed)
+    preds = []
+    for e in ground_truth:
+        r = rng.random()
+        if r < 0.7:
+            preds.append(e)
+        elif r < 0.8:
+            preds.append(Entity(e.text, e.label, e.start + 1, e.end))
+        elif r < 0.9:
+            preds.append(Entity(e.text, "ORG" if e.label != "ORG" else "LOC", e.start, e.end))
+    return preds
+
+
+def load_annotators(skipped: dict[str, str]) -> dict:
+    # every annotator on its own, a missing model or network access only skips that one
+    annotators = {}
+    for name in model_registry.MODEL_NAMES:
+        try:
+            annotators[name] = model_registry.get_model(name).annotate
+        except Exception as e:
+            skipped[name] = f"{type(e).__name__}: {e}"
+    return annotators
+
+
+def bench_size(size: str, paths: list[Path], annotators: dict, repeat: int) -> list[dict]:
+    rows = []
+    parsers = {"tree": XmiParser(), "stream": XmiParser(streaming=True)}
+    plain = next(p for p in paths if p.suffix == ".xmi")
+    doc = parsers["stream"].parse(plain)
+    text = doc["text"]
+    ground_truth = [Entity(**e) for e in doc["entities"]]
+
+    def row(bench, variant, seconds):
+        rows.append({
+            "size": size,
+            "bench": bench,
+            "variant": variant,
+            "chars": len(text),
+            "entities": len(ground_truth),
+            "seconds": seconds,
+            "chars_per_s": len(text) / seconds if seconds > 0 else None,
+        })
+
+    for path in paths:
+        variant = "gzip" if path.suffix == ".gz" else "plain"
+        for mode, parser in parsers.items():
+            row(f"XmiParser.parse[{mode}]", variant, best_of(parser.parse, path, repeat))
+        row("extract_from_xmi", variant, best_of(extract_from_xmi, str(path), repeat))
+
+    row("clean_text", None, best_of(clean_text, text, repeat))
+    preds = fake_predictions(ground_truth, seed=len(text))
+    row("evaluate", None, best_of(lambda _: evaluate(ground_truth, preds), None, repeat))
+
+    for name, annotate in annotators.items():
+        # models are slow, one warm-up call and one timed call
+        annotate(text[:1000])
+        row(f"{name}.annotate", None, best_of(annotate, text, 1))
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the pipeline stages on synthetic documents")
+    arg_parser.add_argument("--sizes", default="session_1918,session_1975,session_2020",
+                            help=f"comma separated, out of {', '.join(SIZES)}")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    arg_parser.add_argument("--no-models", action="store_true", help="skip the NER annotators")
+    arg_parser.add_argument("--out", type=Path, default=Path("bench_pipeline.json"))
+    args = arg_parser.parse_args()
+
+    # never wait for downloads, models have to be in the local cache
+    os.environ.setdefault("HF_HUB_OFFLINE", "1")
+    os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+    skipped: dict[str, str] = {}
+    annotators = {} if args.no_models else load_annotators(skipped)
+    for name, reason in skipped.items():
+        print(f"skipping {name}: {reason}")
+
+    sizes = args.sizes.split(",")
+    rows = []
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = write_corpus(Path(tmp), sizes, args.seed, gzipped=True)
+        for size in sizes:
+            size_paths = [p for p in paths if p.name.startswith(f"{size}.")]
+            for r in bench_size(size, size_paths, annotators, args.repeat):
+                rows.append(r)
+                rate = f"{r['chars_per_s']:>12.0f}" if r["chars_per_s"] else f"{'-':>12}"
+                print(f"{r['size']:<17} {r['bench']:<26} {r['variant'] or '':<6} {r['seconds']:>9.4f}s {rate} chars/s")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "seed": args.seed,
+            "repeat": args.repeat,
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "skipped": skipped,
+        "results": rows,
+    }
+    with args.out.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""
+Compares the spaCy component profiles of SpacyNer (ner-only against the full
+pipeline): load time, throughput and F1 against the ground truth, plus the
+number of documents whose entities differ between the profiles.
+
+Uses the given XMI files, or synthetic documents (synthetic_corpus.py) when
+none are given. Their F1 is only meaningful relative between the profiles.
+
+usage: python -m benchmarks.bench_spacy_profiles [data/raw_xmi/NR_1.S_04.11.1971.xmi ...]
+                                                 [--sizes session_1975] [--model-dir models/]
+                                                 [--out bench_spacy_profiles.json]
+"""
+import argparse
+import json
+import os
+import platform
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic_corpus import SIZES, write_corpus
+from milestone_2.entities import Entity
+from milestone_2.evaluate_results import TARGETS, evaluate
+from milestone_2.ml_spacy.spacy_ner import PROFILES, SpacyNer
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+def load_documents(paths: list[Path]) -> list[dict]:
+    parser = XmiParser(streaming=True)
+    docs = []
+    for path in paths:
+        doc = parser.parse(path)
+        docs.append({"name": path.name, "text": doc["text"],
+                     "ground_truth": [Entity(**e) for e in doc["entities"]]})
+    return docs
+
+
+def f1(tp: int, fp: int, fn: int) -> float:
+    precision = tp / (tp + fp) if tp + fp else 0.0
+    recall = tp / (tp + fn) if tp + fn else 0.0
+    return 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+
+
+def f1_scores(counts: dict[str, dict[str, int]]) -> dict[str, float]:
+    # per label, macro (mean over the labels) and micro (counts summed over the labels)
+    scores = {lab: f1(c["TP"], c["FP"], c["FN"]) for lab, c in counts.items()}
+    scores["macro"] = sum(scores[lab] for lab in TARGETS) / len(TARGETS)
+    scores["micro"] = f1(*(sum(counts[lab][key] for lab in TARGETS) for key in ("TP", "FP", "FN")))
+    return scores
+
+
+def bench_profile(profile: str, docs: list[dict], model_dir) -> tuple[dict, list[list[Entity]]]:
+    start = time.perf_counter()
+    ner = SpacyNer(model_dir=model_dir, profile=profile)
+    load_s = time.perf_counter() - start
+    ner.annotate(docs[0]["text"][:1000])
+
+    counts = {lab: {"TP": 0, "FP": 0, "FN": 0} for lab in TARGETS}
+    predictions = []
+    seconds = 0.0
+    for doc in docs:
+        start = time.perf_counter()
+        preds = ner.annotate(doc["text"])
+        seconds += time.perf_counter() - start
+        predictions.append(preds)
+        for lab, m in evaluate(doc["ground_truth"], preds)["per_label"].items():
+            for key in counts[lab]:
+                counts[lab][key] += m[key]
+
+    chars = sum(len(doc["text"]) for doc in docs)
+    result = {
+        "profile": profile,
+        "components": ner._nlp.pipe_names,
+        "load_s": load_s,
+        "seconds": seconds,
+        "chars_per_s": chars / seconds if seconds > 0 else None,
+        "f1": f1_scores(counts),
+        "counts": counts,
+    }
+    return result, predictions
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Benchmark the SpacyNer component profiles")
+    arg_parser.add_argument("files", type=Path, nargs="*", help="XMI files (default: synthetic documents)")
+    arg_parser.add_argument("--sizes", default="session_1975",
+                            help=f"synthetic documents if no files are given, out of {', '.join(SIZES)}")
+    arg_parser.add_argument("--model-dir", type=Path, default=None, help="model bundle, see milestone_2/model_bundle.py")
+    arg_parser.add_argument("--out", type=Path, default=Path("bench_spacy_profiles.json"))
+    args = arg_parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = args.files or write_corpus(Path(tmp), args.sizes.split(","))
+        docs = load_documents(paths)
+
+    results = []
+    predictions = {}
+    for profile in PROFILES:
+        result, predictions[profile] = bench_profile(profile, docs, args.model_dir)
+        results.append(result)
+        print(f"{profile:<10} load {result['load_s']:>5.1f}s  {result['chars_per_s']:>10.0f} chars/s  "
+              f"micro F1 {result['f1']['micro']:.4f}  macro F1 {result['f1']['macro']:.4f}  [{', '.join(result['components'])}]")
+
+    full = predictions["full"]
+    differing = {profile: [doc["name"] for doc, a, b in zip(docs, preds, full) if a != b]
+                 for profile, preds in predictions.items() if profile != "full"}
+    for profile, names in differing.items():
+        print(f"{profile}: entities differ from full in {len(names)} of {len(docs)} documents")
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "documents": [doc["name"] for doc in docs],
+            "chars": sum(len(doc["text"]) for doc in docs),
+            "time": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+        "differs_from_full": differing,
+    }
+    with args.out.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"Results written to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
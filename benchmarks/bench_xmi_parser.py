@@ -0,0 +1,88 @@
+"""
+Compares the tree-based and the streaming (iterparse) mode of the milestone_2
+XmiParser on plain and gzipped copies of the given XMI files.
+
+usage: python -m benchmarks.bench_xmi_parser data/raw_xmi/NR_1.S_04.11.1971.xmi [...] [--repeat 3]
+"""
+import argparse
+import gzip
+import shutil
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from milestone_1.preprocessing.xmi_engine import open_xmi
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+def materialize(xmi_path: Path, tmp_dir: Path) -> dict[str, Path]:
+    # write a plain and a gzipped copy regardless of how the input is stored
+    plain = tmp_dir / f"{xmi_path.name}.plain.xmi"
+    gz = tmp_dir / f"{xmi_path.name}.xmi.gz"
+    with open_xmi(xmi_path) as src, plain.open("wb") as dst:
+        shutil.copyfileobj(src, dst)
+    with plain.open("rb") as src, gzip.open(gz, "wb") as dst:
+        shutil.copyfileobj(src, dst)
+    return {"plain": plain, "gzip": gz}
+
+
+def time_parse(parser: XmiParser, path: Path, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parser.parse(path)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def traced_parse(parser: XmiParser, path: Path):
+    # separate run, tracemalloc slows the parse down considerably
+    tracemalloc.start()
+    result = parser.parse(path)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return result, peak
+
+
+def bench_file(xmi_path: Path, repeat: int) -> list[dict]:
+    rows = []
+    parsers = {"tree": XmiParser(), "stream": XmiParser(streaming=True)}
+    with tempfile.TemporaryDirectory() as tmp:
+        for variant, path in materialize(xmi_path, Path(tmp)).items():
+            results = {}
+            for mode, parser in parsers.items():
+                seconds = time_parse(parser, path, repeat)
+                result, peak = traced_parse(parser, path)
+                results[mode] = result
+                rows.append({
+                    "file": xmi_path.name,
+                    "variant": variant,
+                    "mode": mode,
+                    "size_mb": path.stat().st_size / 2**20,
+                    "seconds": seconds,
+                    "peak_mb": peak / 2**20,
+                    "entities": len(result["entities"]),
+                })
+            if results["tree"] != results["stream"]:
+                raise AssertionError(f"tree and stream results differ for {xmi_path} ({variant})")
+    return rows
+
+
+def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("files", nargs="+", type=Path)
+    arg_parser.add_argument("--repeat", type=int, default=3)
+    args = arg_parser.parse_args()
+
+    print(f"{'file':<32} {'variant':<7} {'mode':<6} {'size MB':>8} {'seconds':>8} {'peak MB':>8} {'entities':>8}")
+    for xmi_path in args.files:
+        for row in bench_file(xmi_path, args.repeat):
+            print(
+                f"{row['file']:<32} {row['variant']:<7} {row['mode']:<6} {row['size_mb']:>8.2f} "
+                f"{row['seconds']:>8.3f} {row['peak_mb']:>8.1f} {row['entities']:>8}"
+            )
+
+
+if __name__ == "__main__":
+    main()
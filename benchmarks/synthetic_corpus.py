@@ -0,0 +1,174 @@
+"""
+Deterministic generator for synthetic GerParCor-like XMI documents, so the
+parsing and annotation code can be benchmarked without the real corpus.
+
+Documents look like the Nationalrat/Bundesrat protocols: speeches opened by
+the president, interjections, party and place names and some OCR noise
+(long s, ligatures, soft hyphens). Every word and punctuation mark is a
+token:Token and the names are ner:NamedEntity annotations, including a few
+lower case and MISC values like in the corpus. The same seed and size always
+give the same bytes.
+
+usage: python -m benchmarks.synthetic_corpus out_dir [--sizes session_1918,session_1975] [--seed 0] [--gzip]
+"""
+import argparse
+import gzip
+import random
+import re
+from pathlib import Path
+from xml.sax.saxutils import quoteattr
+
+from milestone_1.preprocessing.xmi_engine import NS
+
+# approximate token counts: an early session, a typical one, a long modern Nationalrat day
+SIZES = {
+    "session_1918": 3_000,
+    "session_1975": 30_000,
+    "session_2020": 120_000,
+    "session_marathon": 400_000,
+}
+
+PERSONS = ["Nehammer", "Kogler", "Rendi-Wagner", "Kickl", "Meinl-Reisinger", "Sobotka", "Figl", "Raab",
+           "Kreisky", "Renner", "Seitz", "Bures", "Hofer", "Wöginger", "Leichtfried", "Kurz", "Gewessler"]
+FIRST_NAMES = ["Karl", "Werner", "Pamela", "Herbert", "Beate", "Wolfgang", "Leopold", "Julius", "Doris",
+               "Norbert", "August", "Jörg", "Leonore"]
+ORGS = ["ÖVP", "SPÖ", "FPÖ", "NEOS", "Grünen", "Bundesregierung", "Europäischen Union",
+        "Europäischen Kommission", "Rechnungshof", "Verfassungsgerichtshof", "Bundesrat", "Nationalrat"]
+LOCS = ["Wien", "Niederösterreich", "Salzburg", "Tirol", "Vorarlberg", "Kärnten", "Steiermark",
+        "Oberösterreich", "Burgenland", "Graz", "Linz", "Brüssel", "Deutschland", "Europa"]
+
+FILLER = [
+    "Wir haben in diesem Haus schon oft darüber gesprochen, dass die Maßnahmen nicht ausreichen.",
+    "Die Regierungsvorlage sieht vor, dass die Mittel im nächsten Jahr erhöht werden.",
+    "Meine Damen und Herren, das ist keine Frage der Ideologie, sondern der Verantwortung.",
+    "Ich darf daran erinnern, dass der Ausschuss diesen Antrag einstimmig angenommen hat.",
+    "Es geht um die Menschen in unserem Land und um ihre Zukunft.",
+    "Der vorliegende Bericht zeigt deutlich, wo die Probleme liegen.",
+    "Hier ist die Bundesverfassung ganz eindeutig.",
+    "Wir werden diesem Gesetz daher nicht zustimmen.",
+    "Die Zahlen sprechen eine klare Sprache.",
+    "Daſs dieſe Vorlage dem Hauſe ſo ſpät zugeht, iſt bedauerlich.",
+    "Die Budgetbe¬ ratungen haben gezeigt, dass ein Konſens möglich iſt.",
+]
+
+# {PER}, {ORG} and {LOC} become annotated names
+TEMPLATES = [
+    "Präsident {PER}: Ich erteile Herrn Abgeordneten {PER} das Wort.",
+    "Abgeordneter {PER} ({ORG}): Sehr geehrter Herr Präsident! Hohes Haus!",
+    "Abgeordnete {PER} ({ORG}): Frau Präsidentin! Meine Damen und Herren!",
+    "(Beifall bei der {ORG}.)",
+    "(Zwischenruf des Abg. {PER}.)",
+    "(Heiterkeit und Beifall bei {ORG} und {ORG}.)",
+    "In {LOC} und in {LOC} sieht man, was die {ORG} versäumt hat.",
+    "Der Herr Bundeskanzler {PER} war gestern in {LOC}.",
+    "Die {ORG} hat gemeinsam mit der {ORG} einen Entschließungsantrag eingebracht.",
+    "Ich komme aus {LOC}, und dort wissen die Menschen genau, was das bedeutet.",
+    "Kollege {PER} hat vorhin gesagt, dass {LOC} benachteiligt wird.",
+]
+
+# ground truth values as they appear in the corpus, lower case and MISC included
+LABEL_VARIANTS = {"PER": ["PER", "PER", "PER", "per"], "ORG": ["ORG", "ORG", "ORG", "org"],
+                  "LOC": ["LOC", "LOC", "LOC", "MISC"]}
+
+TOKEN_RE = re.compile(r"\w+|[^\w\s]")
+SLOT_RE = re.compile(r"\{(PER|ORG|LOC)\}")
+
+
+def _name(rng: random.Random, label: str) -> str:
+    if label == "PER":
+        name = rng.choice(PERSONS)
+        return f"{rng.choice(FIRST_NAMES)} {name}" if rng.random() < 0.3 else name
+    return rng.choice(ORGS if label == "ORG" else LOCS)
+
+
+def generate_text(n_tokens: int, seed: int = 0) -> tuple[str, list[tuple[int, int, str]]]:
+    """
+    Returns the sofa text and its (begin, end, value) entities.
+    """
+    rng = random.Random(seed)
+    parts: list[str] = []
+    entities: list[tuple[int, int, str]] = []
+    offset = 0
+    tokens = 0
+
+    while tokens < n_tokens:
+        if rng.random() < 0.35:
+            template = rng.choice(TEMPLATES)
+        else:
+            template = rng.choice(FILLER)
+
+        pos = 0
+        for m in SLOT_RE.finditer(template):
+            before = template[pos:m.start()]
+            name = _name(rng, m.group(1))
+            parts.append(before)
+            offset += len(before)
+            entities.append((offset, offset + len(name), rng.choice(LABEL_VARIANTS[m.group(1)])))
+            parts.append(name)
+            offset += len(name)
+            tokens += len(TOKEN_RE.findall(before + name))
+            pos = m.end()
+        rest = template[pos:]
+        sep = "\n\n" if rng.random() < 0.15 else " "
+        parts.append(rest + sep)
+        offset += len(rest) + len(sep)
+        tokens += len(TOKEN_RE.findall(rest))
+
+    return "".join(parts), entities
+
+
+def generate_xmi(n_tokens: int, seed: int = 0) -> bytes:
+    text, entities = generate_text(n_tokens, seed)
+
+    out = [
+        '<?xml version="1.0" encoding="UTF-8"?>',
+        f'<xmi:XMI xmlns:xmi="http://www.omg.org/XMI" xmlns:cas="{NS["cas"]}" '
+        f'xmlns:token="{NS["token"]}" xmlns:type="{NS["ner"]}" xmi:version="2.0">',
+        '<cas:NULL xmi:id="0"/>',
+    ]
+    xmi_id = 1
+    for m in TOKEN_RE.finditer(text):
+        out.append(f'<token:Token xmi:id="{xmi_id}" sofa="1" begin="{m.start()}" end="{m.end()}"/>')
+        xmi_id += 1
+    for begin, end, value in entities:
+        out.append(f'<type:NamedEntity xmi:id="{xmi_id}" sofa="1" begin="{begin}" end="{end}" value="{value}"/>')
+        xmi_id += 1
+    sofa = quoteattr(text, {"\n": "&#10;"})
+    out.append(f'<cas:Sofa xmi:id="{xmi_id}" sofaNum="1" sofaID="_InitialView" mimeType="text" sofaString={sofa}/>')
+    out.append(f'<cas:View sofa="{xmi_id}" members="{" ".join(str(i) for i in range(1, xmi_id))}"/>')
+    out.append("</xmi:XMI>")
+    return "\n".join(out).encode("utf-8")
+
+
+def write_corpus(out_dir: Path, sizes: list[str], seed: int = 0, gzipped: bool = False) -> list[Path]:
+    out_dir.mkdir(parents=True, exist_ok=True)
+    paths = []
+    for i, size in enumerate(sizes):
+        data = generate_xmi(SIZES[size], seed + i)
+        path = out_dir / f"{size}.xmi"
+        path.write_bytes(data)
+        paths.append(path)
+        if gzipped:
+            gz_path = out_dir / f"{size}.xmi.gz"
+            # mtime=0 keeps the gzip bytes deterministic
+            with gzip.GzipFile(gz_path, "wb", mtime=0) as f:
+                f.write(data)
+            paths.append(gz_path)
+    return paths
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Write synthetic GerParCor-like XMI files")
+    arg_parser.add_argument("out_dir", type=Path)
+    arg_parser.add_argument("--sizes", default="session_1918,session_1975,session_2020",
+                            help=f"comma separated, out of {', '.join(SIZES)}")
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--gzip", action="store_true", help="also write gzipped copies")
+    args = arg_parser.parse_args()
+
+    for path in write_corpus(args.out_dir, args.sizes.split(","), args.seed, args.gzip):
+        print(f"{path} {path.stat().st_size / 2**20:.2f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -8,6 +8,13 @@ BASE_URL="http://lrec2022.gerparcor.texttechnologylab.org/data"
 
 FILE_LIST=("Bundesrat.tar" "Nationalrat.tar")
 
+# --download-only: keep just the archives, the pipeline can read them directly
+# (python -m milestone_2.ner_pipeline --tar downloads/Bundesrat.tar downloads/Nationalrat.tar)
+DOWNLOAD_ONLY=false
+if [ "${1:-}" == "--download-only" ]; then
+    DOWNLOAD_ONLY=true
+fi
+
 mkdir -p "$DOWNLOAD_DIR" "$RAW_DIR"
 
 for FILE_NAME in "${FILE_LIST[@]}"; do
@@ -22,6 +29,10 @@ for FILE_NAME in "${FILE_LIST[@]}"; do
         curl -L "$FULL_URL" -o "$SAVE_PATH"
     fi
 
+    if [ "$DOWNLOAD_ONLY" = true ]; then
+        continue
+    fi
+
     echo "Extracting..."
     TMP_DIR=$(mktemp -d)
     tar -xf "$SAVE_PATH" -C "$TMP_DIR"
@@ -32,6 +43,11 @@ for FILE_NAME in "${FILE_LIST[@]}"; do
     rm -rf "$TMP_DIR"
 done
 
+if [ "$DOWNLOAD_ONLY" = true ]; then
+    echo "Download complete. Archives in '$DOWNLOAD_DIR'"
+    exit 0
+fi
+
 echo "--- renaming ---"
 
 for f in "$RAW_DIR"/*; do
@@ -0,0 +1,230 @@
+"""
+Single-pass extraction engine for GerParCor XMI files
+
+Reads a document once and returns the sofa text together with the token and
+named entity layers as int32 offset arrays (array("i"), can be wrapped without
+copying via numpy.frombuffer). Used by xmi_parser.py and xmi_to_plain_text.py
+as well as by the milestone_2 XmiParser.
+"""
+import gzip
+import io
+import re
+import xml.etree.ElementTree as ET
+from array import array
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import BinaryIO, List, Tuple, Union
+
+#namespace in corpus
+NS = {
+    "cas": "http:///uima/cas.ecore",
+    "token": "http:///org/texttechnologylab/annotation/token.ecore",
+    "ner": "http:///de/tudarmstadt/ukp/dkpro/core/api/ner/type.ecore",
+}
+
+VALID_NER = {"PER": "PER", "ORG": "ORG", "LOC": "LOC"}
+
+#label codes stored in XmiLayers.entity_label
+LABELS = ("PER", "ORG", "LOC")
+LABEL_CODES = {label: code for code, label in enumerate(LABELS)}
+
+TOKEN_TAG = f"{{{NS['token']}}}Token"
+NE_TAG = f"{{{NS['ner']}}}NamedEntity"
+
+#first element start tag (skips <?xml ...?>, comments and doctype) and the Sofa start tag
+ROOT_START = re.compile(rb"<([A-Za-z_][\w.-]*(?::[\w.-]+)?)[\s/>]")
+SOFA_START = re.compile(rb"<(?:[\w.-]+:)?Sofa[\s/>]")
+
+
+def _offsets() -> array:
+    return array("i")
+
+
+@dataclass
+class XmiLayers:
+    text: str
+    token_begin: array = field(default_factory=_offsets)
+    token_end: array = field(default_factory=_offsets)
+    entity_begin: array = field(default_factory=_offsets)
+    entity_end: array = field(default_factory=_offsets)
+    entity_label: array = field(default_factory=_offsets)
+
+    def tokens(self) -> List[Tuple[int, int, str]]:
+        return [(b, e, self.text[b:e]) for b, e in zip(self.token_begin, self.token_end)]
+
+    def entities(self) -> List[Tuple[int, int, str]]:
+        return [
+            (b, e, LABELS[code])
+            for b, e, code in zip(self.entity_begin, self.entity_end, self.entity_label)
+        ]
+
+
+def open_xmi(xmi_source):
+    """
+    opens plain or gzipped XMI files in binary mode, xmi_source is a path or
+    an already opened binary file object (e.g. a tar member)
+    """
+    if hasattr(xmi_source, "read"):
+        fh = xmi_source if hasattr(xmi_source, "peek") else io.BufferedReader(xmi_source)
+        if fh.peek(2)[:2] == b"\x1f\x8b":
+            return gzip.GzipFile(fileobj=fh, mode="rb")
+        return fh
+
+    xmi_path = Path(xmi_source)
+    with xmi_path.open("rb") as fh:
+        magic = fh.read(2)
+    if magic == b"\x1f\x8b":
+        return gzip.open(xmi_path, "rb")
+    return xmi_path.open("rb")
+
+
+class _Collector:
+    """
+    Collects the layers from the elements of a document in document order.
+    Namespaced Token/NamedEntity elements are preferred, any *Token/*NamedEntity
+    element is only used if the document has no namespaced ones.
+    """
+
+    def __init__(self, tokens: bool, entities: bool):
+        self.want_tokens = tokens
+        self.want_entities = entities
+        self.text = None
+        self.tokens = (_offsets(), _offsets())
+        self.fallback_tokens = (_offsets(), _offsets())
+        self.entities = (_offsets(), _offsets(), _offsets())
+        self.fallback_entities = (_offsets(), _offsets(), _offsets())
+
+    def feed(self, tag: str, attrib: dict):
+        if self.text is None and tag.endswith("Sofa") and "sofaString" in attrib:
+            self.text = attrib["sofaString"]
+            return
+        if "begin" not in attrib or "end" not in attrib:
+            return
+
+        if self.want_tokens and tag.endswith("Token"):
+            if tag == TOKEN_TAG:
+                target = self.tokens
+            elif not self.tokens[0]:
+                target = self.fallback_tokens
+            else:
+                return
+            target[0].append(int(attrib["begin"]))
+            target[1].append(int(attrib["end"]))
+
+        elif self.want_entities and tag.endswith("NamedEntity"):
+            val = attrib.get("value", "").strip().upper()
+            if val not in VALID_NER:
+                return
+            if tag == NE_TAG:
+                target = self.entities
+            elif not self.entities[0]:
+                target = self.fallback_entities
+            else:
+                return
+            target[0].append(int(attrib["begin"]))
+            target[1].append(int(attrib["end"]))
+            target[2].append(LABEL_CODES[VALID_NER[val]])
+
+    def finish(self, xmi_path) -> XmiLayers:
+        if self.text is None:
+            raise ValueError(f"No sofaString found in {xmi_path}")
+        tokens = self.tokens if self.tokens[0] else self.fallback_tokens
+        entities = self.entities if self.entities[0] else self.fallback_entities
+        return XmiLayers(self.text, *tokens, *entities)
+
+
+def _walk_stream(fh, collector: _Collector):
+    # iterparse, every top-level element is dropped once it is closed
+    root = None
+    depth = 0
+    for event, elem in ET.iterparse(fh, events=("start", "end")):
+        if event == "end":
+            depth -= 1
+            if depth == 1:
+                root.clear()
+            continue
+
+        depth += 1
+        if root is None:
+            root = elem
+            continue
+        collector.feed(elem.tag, elem.attrib)
+
+
+def _walk_tree(fh, collector: _Collector):
+    root = ET.parse(fh).getroot()
+    for elem in root.iter():
+        if elem is not root:
+            collector.feed(elem.tag, elem.attrib)
+
+
+def extract_layers(xmi_path: Union[str, Path, BinaryIO], tokens: bool = True, entities: bool = True,
+                   streaming: bool = True) -> XmiLayers:
+    """
+    Reads the document once and returns its sofa text, tokens and entities.
+    Layers that are not requested are skipped while reading and stay empty.
+    streaming=False builds the full ElementTree first (same result, more memory).
+    """
+    collector = _Collector(tokens, entities)
+    walk = _walk_stream if streaming else _walk_tree
+    with open_xmi(xmi_path) as fh:
+        walk(fh, collector)
+    return collector.finish(xmi_path)
+
+
+def _sofa_from_tag(head: bytes, root_name: bytes, tag: bytes):
+    #parse the Sofa start tag inside the root start tag, so namespaces and entities resolve
+    tag = tag.rstrip()
+    if not tag.endswith(b"/>"):
+        return None
+    try:
+        root = ET.fromstring(head + tag + b"</" + root_name + b">")
+    except ET.ParseError:
+        return None
+    if len(root) != 1:
+        return None
+    return root[0].attrib.get("sofaString")
+
+
+def _scan_sofa(fh, chunk_size: int):
+    head = root_name = None
+    buf = b""
+    while True:
+        chunk = fh.read(chunk_size)
+        buf += chunk
+
+        if head is None:
+            m = ROOT_START.search(buf)
+            end = buf.find(b">", m.end() - 1) if m else -1
+            if end != -1:
+                head, root_name = buf[:end + 1], m.group(1)
+                buf = buf[end + 1:]
+
+        if head is not None:
+            m = SOFA_START.search(buf)
+            if m is None:
+                #keep a tail in case the tag is split between two chunks
+                buf = buf[-64:]
+            else:
+                buf = buf[m.start():]
+                #attribute values cannot contain "<", so the tag ends before the next one
+                nxt = buf.find(b"<", 1)
+                if nxt != -1 or not chunk:
+                    return _sofa_from_tag(head, root_name, buf[:nxt] if nxt != -1 else buf)
+
+        if not chunk:
+            return None
+
+
+def extract_sofa(xmi_path: Union[str, Path], chunk_size: int = 1 << 20) -> str:
+    """
+    Returns only the sofa text. The file is scanned for the Sofa start tag and
+    reading stops as soon as it is found, only that tag is parsed. If the Sofa
+    isn't found this way (unusual markup, no sofaString on the first Sofa) the
+    document is read completely with extract_layers instead.
+    """
+    with open_xmi(xmi_path) as fh:
+        text = _scan_sofa(fh, chunk_size)
+    if text is None:
+        return extract_layers(xmi_path, tokens=False, entities=False).text
+    return text
@@ -4,93 +4,77 @@ Extracts text, tokens, and bio tags from XMI files
 ** input and output folders are for the test set
 ** need to change that for the full dataset  
 """
+from bisect import bisect_right
+from heapq import heappop, heappush
 from typing import List, Tuple
-import xml.etree.ElementTree as ET
 import os
 import json
 
-#namespace in corpus
-NS = {
-    "cas": "http:///uima/cas.ecore",
-    "token": "http:///org/texttechnologylab/annotation/token.ecore",
-    "ner": "http:///de/tudarmstadt/ukp/dkpro/core/api/ner/type.ecore",
-}
+from milestone_1.preprocessing.xmi_engine import extract_layers
 
-VALID_NER = {"PER": "PER", "ORG": "ORG", "LOC": "LOC"}
+def _bio_tags(tokens: List[Tuple[int, int, str]], entities: List[Tuple[int, int, str]]) -> List[str]:
+    """
+    BIO tags for the tokens: every token inside or partially overlapping an
+    entity gets tagged, the first of them (in token order) with B-, later
+    entities overwrite earlier ones.
+    Tokens starting inside an entity are looked up with bisect on the sorted
+    token begins, tokens starting before it and reaching into it are kept in a
+    heap while sweeping over the entities sorted by begin. No token is checked
+    against an entity it cannot touch, however long some tokens are.
+    """
+    bio_tags = ["O"] * len(tokens)
+    if not tokens or not entities:
+        return bio_tags
 
-def _ns(tag, prefix):
-    return f".//{{{NS[prefix]}}}{tag}"
+    order = sorted(range(len(tokens)), key=lambda i: tokens[i][0])
+    begins = [tokens[i][0] for i in order]
 
-def extract_from_xmi(xmi_path: str):
-    tree = ET.parse(xmi_path)
-    root = tree.getroot()
+    def touches(i, ent_b, ent_e):
+        tb, te, _ = tokens[i]
+        return (tb >= ent_b and te <= ent_e) or (tb < ent_e and te > ent_b)
 
-    #raw text
-    sofa_elem = None
-    for s in root.findall(".//"):
-        if s.tag.endswith("Sofa") and "sofaString" in s.attrib:
-            sofa_elem = s
-            break
-    if sofa_elem is None:
-        sofa_elem = root.find(_ns("Sofa", "cas"))
-    if sofa_elem is None or "sofaString" not in sofa_elem.attrib:
-        raise ValueError(f"No sofaString found in {xmi_path}")
-    raw_text = sofa_elem.attrib["sofaString"]
+    hits_by_entity = [[] for _ in entities]
+    # (end, index) of the tokens beginning before the current entity that may still reach into it
+    open_tokens = []
+    pos = 0
+    for n in sorted(range(len(entities)), key=lambda n: entities[n][0]):
+        ent_b, ent_e, _ = entities[n]
+        while pos < len(order) and begins[pos] < ent_b:
+            heappush(open_tokens, (tokens[order[pos]][1], order[pos]))
+            pos += 1
+        # ends before this entity, and so before all later ones
+        while open_tokens and open_tokens[0][0] <= ent_b:
+            heappop(open_tokens)
+        hits = [i for _, i in open_tokens if touches(i, ent_b, ent_e)]
+        hits.extend(i for i in order[pos:bisect_right(begins, ent_e, pos)] if touches(i, ent_b, ent_e))
+        hits_by_entity[n] = hits
 
-    #Tokens
-    tokens = []
-    for tok in root.findall(_ns("Token", "token")):
-        try:
-            b, e = int(tok.attrib["begin"]), int(tok.attrib["end"])
-        except KeyError:
-            continue
-        tokens.append((b, e, raw_text[b:e]))
-    if not tokens:
-        for elem in root.findall(".//"):
-            if elem.tag.endswith("Token") and "begin" in elem.attrib:
-                b, e = int(elem.attrib["begin"]), int(elem.attrib["end"])
-                tokens.append((b, e, raw_text[b:e]))
+    for (_, _, ent_label), hits in zip(entities, hits_by_entity):
+        hits.sort()
+        for n, i in enumerate(hits):
+            bio_tags[i] = f"B-{ent_label}" if n == 0 else f"I-{ent_label}"
 
-    #NER
-    entities = []
-    for ne in root.findall(_ns("NamedEntity", "ner")):
-        try:
-            b, e = int(ne.attrib["begin"]), int(ne.attrib["end"])
-        except KeyError:
-            continue
-        val = ne.attrib.get("value", "").strip().upper()
-        if val in VALID_NER:
-            entities.append((b, e, VALID_NER[val]))
-    if not entities:
-        for elem in root.findall(".//"):
-            if elem.tag.endswith("NamedEntity") and "begin" in elem.attrib:
-                b, e = int(elem.attrib["begin"]), int(elem.attrib["end"])
-                val = elem.attrib.get("value", "").strip().upper()
-                if val in VALID_NER:
-                    entities.append((b, e, VALID_NER[val]))
+    return bio_tags
+
+def extract_from_xmi(xmi_path: str):
+    layers = extract_layers(xmi_path)
+    raw_text = layers.text
+    tokens = layers.tokens()
+    entities = layers.entities()
 
     #BIO tags
-    bio_tags = ["O"] * len(tokens)
-    for ent_b, ent_e, ent_label in entities:
-        started = False
-        for i, (tb, te, _) in enumerate(tokens):
-            if tb >= ent_b and te <= ent_e:
-                if not started:
-                    bio_tags[i] = f"B-{ent_label}"
-                    started = True
-                else:
-                    bio_tags[i] = f"I-{ent_label}"
-            elif tb < ent_e and te > ent_b and not (tb >= ent_b and te <= ent_e):
-                if not started:
-                    bio_tags[i] = f"B-{ent_label}"
-                    started = True
-                else:
-                    bio_tags[i] = f"I-{ent_label}"
+    bio_tags = _bio_tags(tokens, entities)
 
     return {"text": raw_text, "tokens": tokens, "bio_tags": bio_tags}
 
-def main(input_path: str, output_folder: str):
+def main(input_path: str, output_folder: str, text_folder: str = None):
+    """
+    text_folder: if given, the plain text is written there as well from the
+    same parse (replaces a separate xmi_to_plain_text.py run)
+    """
     os.makedirs(output_folder, exist_ok=True)
+    if text_folder is not None:
+        os.makedirs(text_folder, exist_ok=True)
     files = [input_path] if os.path.isfile(input_path) else [os.path.join(input_path, f) for f in os.listdir(input_path) if f.endswith(".xmi")]
 
     for f in files:
@@ -100,6 +84,11 @@ def main(input_path: str, output_folder: str):
             with open(out_file, "w", encoding="utf-8") as fout:
                 json.dump(data, fout, ensure_ascii=False, indent=2)
             print(f"Parsed {f} -> {out_file}")
+            if text_folder is not None:
+                txt_file = os.path.join(text_folder, os.path.basename(f).replace(".xmi", ".txt"))
+                with open(txt_file, "w", encoding="utf-8") as fout:
+                    fout.write(data["text"])
+                print(f"Extracted text: {f} → {txt_file}")
         except Exception as e:
             print(f"Error parsing {f}: {e}")
 
@@ -108,9 +97,11 @@ if __name__ == "__main__":
     #test data
     input_folder = "data/test_set"
     output_folder = "data/test_set_json"
+    text_folder = "data/test_set_txt"
 
     ##full dataset
     #input_folder = "data/raw_xmi/"
     #output_folder = "data/raw_json/"
+    #text_folder = "data/plain_text/"
 
-    main(input_folder, output_folder)
+    main(input_folder, output_folder, text_folder)
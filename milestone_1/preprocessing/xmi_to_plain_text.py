@@ -6,34 +6,12 @@ xmi into plain text
 """
 
 import os
-import xml.etree.ElementTree as ET
 
-NS = {"cas": "http:///uima/cas.ecore"}
-
-def _ns(tag, prefix):
-    return f".//{{{NS[prefix]}}}{tag}"
+from milestone_1.preprocessing.xmi_engine import extract_sofa
 
 def extract_plaintext(xmi_path: str) -> str:
-    #get sofa string
-    tree = ET.parse(xmi_path)
-    root = tree.getroot()
-
-    sofa_elem = None
-
-    #fallback search
-    for elem in root.findall(".//"):
-        if elem.tag.endswith("Sofa") and "sofaString" in elem.attrib:
-            sofa_elem = elem
-            break
-
-    #strict namespace search if above doesn't work
-    if sofa_elem is None:
-        sofa_elem = root.find(_ns("Sofa", "cas"))
-
-    if sofa_elem is None or "sofaString" not in sofa_elem.attrib:
-        raise ValueError(f"No sofaString found in {xmi_path}")
-
-    return sofa_elem.attrib["sofaString"]
+    #stops reading once the sofa string has been found, full parse as fallback
+    return extract_sofa(xmi_path)
 
 
 def main(input_path: str, output_folder: str):
@@ -1,25 +1,21 @@
 #!/bin/bash
 
-cd ./preprocessing || exit
+# run from the repository root, the scripts are imported as milestone_1.preprocessing.*
+cd "$(dirname "$0")/.." || exit
 
 echo "Starting Preprocessing"
 
-#XMI parsing 
+#XMI parsing (JSON and plain text from a single parse per file)
 printf "\n==================================\n"
-printf  "[1/4] Parsing the xmi files to JSON\n"
-python xmi_parser.py
-
-#Convert xmi to plain txt files
-printf "\n==================================\n"
-printf  "[2/4] Converting to plain txt files\n"
-python xmi_to_plain_text.py
+printf  "[1/3] Parsing the xmi files to JSON and plain txt files\n"
+python -m milestone_1.preprocessing.xmi_parser
 
 # Clean plain text files
 printf "\n==================================\n"
-printf  "[3/4] Cleaning plain txt files\n"
-python clean_plain_text.py
+printf  "[2/3] Cleaning plain txt files\n"
+python -m milestone_1.preprocessing.clean_plain_text
 
 # Format Records into CoNLL-U Format
 printf "\n==================================\n"
-printf  "[4/4] Format records in CoNLL-U Format\n"
-python conllu_formatter.py
\ No newline at end of file
+printf  "[3/3] Format records in CoNLL-U Format\n"
+python -m milestone_1.preprocessing.conllu_formatter
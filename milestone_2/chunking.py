@@ -0,0 +1,71 @@
+"""
+Splits long texts into chunks for the annotators and maps the entities of the
+chunks back to document offsets.
+
+Chunks end at the last paragraph break in the second half of the window, or
+else at the last sentence end, or else at the last whitespace, and only cut
+inside a word if the window has no whitespace at all. Entities that touch a
+whitespace (or hard) cut on both sides and have the same label are merged,
+so a name cut in two is one entity again. A text that fits into one window is
+a single chunk, its entities are the ones of the unchunked text.
+"""
+import re
+from typing import Iterable
+
+from milestone_2.entities import Entity
+
+PARAGRAPH_RE = re.compile(r"\n[^\S\n]*\n\s*")
+SENTENCE_RE = re.compile(r"[.!?:][\"'»«“”)\]]*\s+")
+WHITESPACE_RE = re.compile(r"\s+")
+
+# a chunk ends with "paragraph", "sentence", "whitespace", "hard" or "end" (the last one),
+# entities are only merged across cuts that can be inside a name
+MERGED_CUTS = {"whitespace", "hard"}
+
+
+def _last_boundary(text: str, start: int, end: int, pattern: re.Pattern):
+    # end of the last match in the second half of text[start:end]
+    last = None
+    for m in pattern.finditer(text, start + (end - start) // 2, end):
+        last = m.end()
+    return last
+
+
+def chunk_spans(text: str, max_chars: int) -> list[tuple[int, int, str]]:
+    """
+    (start, end, cut) of consecutive chunks covering the whole text, none longer than max_chars.
+    """
+    if max_chars < 1:
+        raise ValueError(f"max_chars must be at least 1, got {max_chars}")
+    spans = []
+    start = 0
+    while len(text) - start > max_chars:
+        window_end = start + max_chars
+        for cut, pattern in (("paragraph", PARAGRAPH_RE), ("sentence", SENTENCE_RE), ("whitespace", WHITESPACE_RE)):
+            end = _last_boundary(text, start, window_end, pattern)
+            if end is not None:
+                break
+        else:
+            end, cut = window_end, "hard"
+        spans.append((start, end, cut))
+        start = end
+    spans.append((start, len(text), "end"))
+    return spans
+
+
+def remap(text: str, spans: list[tuple[int, int, str]], chunk_entities: Iterable[list[Entity]]) -> list[Entity]:
+    # entities of every chunk (in chunk offsets) -> entities of the text
+    entities: list[Entity] = []
+    previous_end, previous_cut = 0, "end"
+    for (start, end, cut), ents in zip(spans, chunk_entities):
+        shifted = [Entity(e.text, e.label, e.start + start, e.end + start) for e in ents]
+        if previous_cut in MERGED_CUTS and entities and shifted:
+            # only whitespace between the two entities and the cut
+            last, first = entities[-1], shifted[0]
+            if (last.label == first.label and not text[last.end:previous_end].strip()
+                    and not text[start:first.start].strip()):
+                entities[-1] = Entity(text[last.start:first.end], last.label, last.start, first.end)
+                shifted = shifted[1:]
+        entities.extend(shifted)
+        previous_end, previous_cut = end, cut
+    return entities
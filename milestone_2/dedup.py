@@ -0,0 +1,47 @@
+import hashlib
+import json
+from pathlib import Path
+from typing import Optional
+
+
+def fingerprint(text: str) -> str:
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).hexdigest()
+
+
+class Deduplicator:
+    """
+    Remembers the first document for every sofa text fingerprint. Later
+    documents with the same text are reported as duplicates of it, so they
+    don't have to be annotated again.
+    """
+
+    def __init__(self):
+        self._canonical: dict[str, Path] = {}
+        self.duplicates: dict[Path, Path] = {}
+
+    def check(self, doc_path: Path, text: str) -> Optional[Path]:
+        key = fingerprint(text)
+        canonical = self._canonical.setdefault(key, doc_path)
+        if canonical == doc_path:
+            return None
+        self.duplicates[doc_path] = canonical
+        return canonical
+
+    def promote(self, canonical: Path) -> Optional[Path]:
+        # the first duplicate of canonical takes its place (e.g. because annotating canonical failed)
+        members = [dup for dup, c in self.duplicates.items() if c == canonical]
+        if not members:
+            return None
+        new_canonical = members[0]
+        del self.duplicates[new_canonical]
+        for dup in members[1:]:
+            self.duplicates[dup] = new_canonical
+        for key, path in self._canonical.items():
+            if path == canonical:
+                self._canonical[key] = new_canonical
+        return new_canonical
+
+    def write_report(self, out_file: Path):
+        report = {dup.name: canonical.name for dup, canonical in self.duplicates.items()}
+        with open(out_file, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
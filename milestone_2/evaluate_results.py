@@ -3,6 +3,7 @@ import json
 from pathlib import Path
 
 from milestone_2.entities import Entity
+from milestone_2.profiling import StageProfiler, profiled
 
 RESULTS_DIR = Path("milestone_2/results")
 ENTITIES_DIR = RESULTS_DIR / "entities"
@@ -204,15 +205,21 @@ def main():
     entity_files = sorted(ENTITIES_DIR.glob("*_entities.json"))
 
     score_rows: list[dict] = []
+    # NER_PROFILE=evaluate profiles evaluate() on the sampled documents
+    profiler = StageProfiler.configure()
 
     for json_file in entity_files:
         filename, ground_truth, predictions_by_model = load_doc_entities(json_file)
 
         for model_name, preds in predictions_by_model.items():
-            eval_result = evaluate(ground_truth, preds)
+            with profiled(profiler, "evaluate", filename):
+                eval_result = evaluate(ground_truth, preds)
             row = make_score_row(filename, model_name, eval_result)
             score_rows.append(row)
 
+    if profiler is not None:
+        profiler.dump()
+
     base_fields = ["filename", "model", "macro_f1"]
     metric_fields = [f"{m}_{lab}" for lab in TARGETS for m in METRIC_NAMES]
     fieldnames = base_fields + metric_fields
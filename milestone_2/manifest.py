@@ -0,0 +1,110 @@
+import hashlib
+import json
+import logging
+import os
+import threading
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+MANIFEST_VERSION = 1
+
+
+def input_hash(text: str, entities: list) -> str:
+    # everything written to the entities file besides the predictions
+    h = hashlib.blake2b(text.encode("utf-8"), digest_size=16)
+    for e in entities:
+        e = e if isinstance(e, dict) else e.to_dict()
+        h.update(f"{e['start']}:{e['end']}:{e['label']};".encode("utf-8"))
+    return h.hexdigest()
+
+
+class RunManifest:
+    """
+    Records for every document the hash of its input and the fingerprint of
+    every model whose predictions are in its entities file. Every finished
+    document is appended to a journal next to the manifest (<name>.jsonl),
+    close() folds the journal into the manifest. An interrupted run leaves the
+    journal behind and is resumed from both: up to date documents are skipped
+    and only models whose fingerprint changed are run again.
+    """
+
+    def __init__(self, path: Path):
+        self.path = Path(path)
+        self.journal_path = self.path.with_suffix(".jsonl")
+        self._lock = threading.Lock()
+        self.documents: dict[str, dict] = {}
+        if self.path.exists():
+            try:
+                with self.path.open("r", encoding="utf-8") as f:
+                    manifest = json.load(f)
+            except (OSError, ValueError):
+                logger.warning(f"Unreadable run manifest {self.path}, starting a new one")
+                manifest = {}
+            if manifest.get("version") == MANIFEST_VERSION:
+                self.documents = manifest["documents"]
+        if self.journal_path.exists():
+            # left by an interrupted run, folded in before anything is appended to it
+            self._replay()
+            self._save()
+            self.journal_path.unlink()
+        self._journal = None
+
+    def is_current(self, name: str, doc_hash: str) -> bool:
+        entry = self.documents.get(name)
+        return entry is not None and entry["input"] == doc_hash
+
+    def has_models(self, name: str, fingerprints: dict[str, str]) -> bool:
+        # all models are done for the input recorded last, without knowing the current input
+        entry = self.documents.get(name)
+        return entry is not None and all(entry["models"].get(m) == fp for m, fp in fingerprints.items())
+
+    def stale_models(self, name: str, doc_hash: str, fingerprints: dict[str, str]) -> list[str]:
+        entry = self.documents.get(name)
+        if entry is None or entry["input"] != doc_hash:
+            return list(fingerprints)
+        done = entry["models"]
+        return [model for model, fp in fingerprints.items() if done.get(model) != fp]
+
+    def record(self, name: str, doc_hash: str, fingerprints: dict[str, str]):
+        with self._lock:
+            self._apply(name, doc_hash, fingerprints)
+            if self._journal is None:
+                self._journal = self.journal_path.open("a", encoding="utf-8")
+            self._journal.write(json.dumps({"name": name, "input": doc_hash, "models": fingerprints},
+                                           ensure_ascii=False) + "\n")
+            self._journal.flush()
+
+    def close(self):
+        # writes the manifest and removes the journal
+        with self._lock:
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+            if self.journal_path.exists():
+                self._save()
+                self.journal_path.unlink()
+
+    def _apply(self, name: str, doc_hash: str, fingerprints: dict[str, str]):
+        entry = self.documents.get(name)
+        if entry is None or entry["input"] != doc_hash:
+            entry = {"input": doc_hash, "models": {}}
+            self.documents[name] = entry
+        entry["models"].update(fingerprints)
+
+    def _replay(self):
+        with self.journal_path.open("r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    # the last line of a killed run can be cut off
+                    logger.warning(f"Skipping an unreadable line of {self.journal_path}")
+                    continue
+                self._apply(record["name"], record["input"], record["models"])
+
+    def _save(self):
+        tmp = self.path.with_suffix(f".tmp{os.getpid()}")
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump({"version": MANIFEST_VERSION, "documents": self.documents}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp, self.path)
@@ -0,0 +1,113 @@
+import json
+import logging
+import os
+import tracemalloc
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+MB = 2**20
+
+
+def current_rss() -> Optional[int]:
+    # resident set size in bytes, only available on linux
+    try:
+        with open("/proc/self/statm", "r") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def reset_peak_rss() -> bool:
+    # sets the peak RSS of the process (VmHWM) to its current RSS, only available on linux
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss() -> Optional[int]:
+    # peak resident set size in bytes since the last reset_peak_rss
+    try:
+        with open("/proc/self/status", "r") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class MemoryProfiler:
+    """
+    Measures every parse and annotator call: the tracemalloc peak above the
+    memory held before the call, the memory still held afterwards, the
+    resident set size after the call and the peak RSS during the call (reset
+    before every call through /proc/self/clear_refs, so linux only).
+    tracemalloc only sees Python allocations, torch and thinc buffers only
+    show up in the RSS numbers. One JSON line per call is written to out_file.
+    Calls must not overlap (no prefetch, worker processes or stage threads).
+    """
+
+    def __init__(self, out_file: Path):
+        self.out_file = Path(out_file)
+        self._fh = self.out_file.open("w", encoding="utf-8")
+        self.rows: list[dict] = []
+        self.doc_path: Optional[Path] = None
+        tracemalloc.start()
+
+    def _measure(self, doc_path: Path, stage: str, fn: Callable, arg, chars: Callable):
+        base = tracemalloc.get_traced_memory()[0]
+        tracemalloc.reset_peak()
+        peak_rss_reset = reset_peak_rss()
+        result = fn(arg)
+        current, peak = tracemalloc.get_traced_memory()
+        rss = current_rss()
+        call_peak_rss = peak_rss() if peak_rss_reset else None
+
+        row = {
+            "filename": Path(doc_path).name,
+            "stage": stage,
+            "chars": chars(arg, result),
+            "tracemalloc_peak_mb": (peak - base) / MB,
+            "tracemalloc_retained_mb": (current - base) / MB,
+            "rss_mb": rss / MB if rss is not None else None,
+            "peak_rss_mb": call_peak_rss / MB if call_peak_rss is not None else None,
+        }
+        self.rows.append(row)
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._fh.flush()
+        return result
+
+    def wrap_load(self, load: Callable[[Path], dict]) -> Callable[[Path], dict]:
+        def measured_load(doc_path):
+            return self._measure(doc_path, "parse", load, doc_path, lambda _, data: len(data["text"]))
+        return measured_load
+
+    def wrap_models(self, models: dict[str, Callable]) -> dict[str, Callable]:
+        # annotator calls are attributed to self.doc_path
+        def wrap(model_name, annotator):
+            def measured_annotate(text):
+                return self._measure(self.doc_path, model_name, annotator, text, lambda t, _: len(t))
+            return measured_annotate
+        return {model_name: wrap(model_name, annotator) for model_name, annotator in models.items()}
+
+    def summary(self):
+        by_stage: dict[str, list[dict]] = {}
+        for row in self.rows:
+            by_stage.setdefault(row["stage"], []).append(row)
+
+        for stage, rows in by_stage.items():
+            worst = max(rows, key=lambda r: r["tracemalloc_peak_mb"])
+            per_char = [r["tracemalloc_peak_mb"] * MB / r["chars"] for r in rows if r["chars"]]
+            peaks = [r["peak_rss_mb"] for r in rows if r["peak_rss_mb"] is not None]
+            logger.info(f"{stage:>12}: tracemalloc peak {worst['tracemalloc_peak_mb']:.1f} MB "
+                        f"({worst['filename']}, {worst['chars']} chars), up to {max(per_char, default=0.0):.0f} bytes/char, "
+                        f"peak RSS {f'{max(peaks):.0f} MB' if peaks else 'n/a'}")
+
+    def close(self):
+        self._fh.close()
+        tracemalloc.stop()
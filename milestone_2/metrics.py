@@ -0,0 +1,129 @@
+import csv
+import json
+import logging
+import math
+import threading
+import uuid
+from dataclasses import dataclass, field
+from datetime import datetime
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class DocStats:
+    chars: int = 0
+    parse_s: float = 0.0
+    save_s: float = 0.0
+    model_s: dict[str, float] = field(default_factory=dict)
+    model_entities: dict[str, int] = field(default_factory=dict)
+
+    def annotate_s(self) -> float:
+        return sum(self.model_s.values()) + self.save_s
+
+    def merge(self, other: "DocStats"):
+        # timings of the annotation, measured in a worker process or stage thread
+        self.model_s.update(other.model_s)
+        self.model_entities.update(other.model_entities)
+        self.save_s += other.save_s
+
+
+def percentile(values: list[float], p: float) -> float:
+    # nearest rank
+    if not values:
+        return 0.0
+    values = sorted(values)
+    return values[max(0, math.ceil(p * len(values)) - 1)]
+
+
+def _rate(amount: float, seconds: float) -> float:
+    return amount / seconds if seconds > 0 else 0.0
+
+
+class MetricsLog:
+    """
+    One JSON line per annotated document with parse, per model and save
+    times and the resulting characters/s and entities/s. summary() reduces
+    them to p50/p95/max per stage and model.
+
+    Runs append to out_file, so a resumed run keeps the lines of the documents
+    finished earlier. Every run starts with a header line {"run", "started"}
+    and its document lines carry the same "run", summary() only covers this run.
+    """
+
+    def __init__(self, out_file: Path):
+        self.out_file = Path(out_file)
+        self.run_id = uuid.uuid4().hex[:12]
+        self._fh = self.out_file.open("a", encoding="utf-8")
+        self._lock = threading.Lock()
+        self.rows: list[dict] = []
+        self._write({"run": self.run_id, "started": datetime.now().isoformat(timespec="seconds")})
+
+    def _write(self, row: dict):
+        self._fh.write(json.dumps(row, ensure_ascii=False) + "\n")
+        self._fh.flush()
+
+    def record(self, doc_path: Path, stats: DocStats):
+        row = {
+            "run": self.run_id,
+            "filename": doc_path.name,
+            "chars": stats.chars,
+            "parse_s": stats.parse_s,
+            "save_s": stats.save_s,
+        }
+        for model_name, seconds in stats.model_s.items():
+            n_entities = stats.model_entities.get(model_name, 0)
+            row[f"{model_name}_s"] = seconds
+            row[f"{model_name}_entities"] = n_entities
+            row[f"{model_name}_chars_per_s"] = _rate(stats.chars, seconds)
+            row[f"{model_name}_entities_per_s"] = _rate(n_entities, seconds)
+        total = stats.parse_s + stats.annotate_s()
+        row["total_s"] = total
+        row["chars_per_s"] = _rate(stats.chars, total)
+
+        with self._lock:
+            self.rows.append(row)
+            self._write(row)
+
+    def summary(self) -> list[dict]:
+        stages = ["parse", "save"]
+        for row in self.rows:
+            for key in row:
+                if key.endswith("_entities_per_s"):
+                    model_name = key[:-len("_entities_per_s")]
+                    if model_name not in stages:
+                        stages.insert(-1, model_name)
+        stages.append("total")
+
+        summary = []
+        for stage in stages:
+            key = f"{stage}_s"
+            rows = [row for row in self.rows if key in row]
+            seconds = [row[key] for row in rows]
+            total = sum(seconds)
+            summary.append({
+                "stage": stage,
+                "docs": len(rows),
+                "total_s": total,
+                "p50_s": percentile(seconds, 0.5),
+                "p95_s": percentile(seconds, 0.95),
+                "max_s": max(seconds, default=0.0),
+                "chars_per_s": _rate(sum(row["chars"] for row in rows), total),
+            })
+        return summary
+
+    def write_summary(self, out_file: Path):
+        summary = self.summary()
+        with Path(out_file).open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=list(summary[0]))
+            writer.writeheader()
+            writer.writerows(summary)
+
+        for s in summary:
+            logger.info(f"{s['stage']:>12}: {s['docs']} docs, total {s['total_s']:.1f}s, "
+                        f"p50 {s['p50_s']:.2f}s, p95 {s['p95_s']:.2f}s, max {s['max_s']:.2f}s, "
+                        f"{s['chars_per_s']:.0f} chars/s")
+
+    def close(self):
+        self._fh.close()
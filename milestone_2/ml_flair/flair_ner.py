@@ -1,28 +1,117 @@
-from flair.data import Sentence
 from flair.models import SequenceTagger
+from flair.splitter import SegtokSentenceSplitter
+from importlib.metadata import PackageNotFoundError, version
+from itertools import chain
 from pathlib import Path
+from typing import Optional
+import inspect
 import json
+import logging
+
+import flair
+import torch
 
 from ..entities import Entity
 
-#tagger = SequenceTagger.load("flair/ner-german")
-tagger = SequenceTagger.load("flair/ner-german-large")
-# tagger = SequenceTagger.load("flair/ner-multi-fast")
+logger = logging.getLogger(__name__)
+
+#MODEL_NAME = "flair/ner-german"
+MODEL_NAME = "flair/ner-german-large"
+# MODEL_NAME = "flair/ner-multi-fast"
 
 TARGETS = {"PER", "LOC", "ORG"}
+# sentences per predict batch
+MINI_BATCH_SIZE = 32
+
+
+def bundle_file(model_dir: Path) -> Path:
+    return Path(model_dir) / "flair" / (MODEL_NAME.replace("/", "--") + ".pt")
+
+
+def can_mmap() -> bool:
+    # torch.load(mmap=) and load_state_dict(assign=) are torch >= 2.1
+    return ("mmap" in inspect.signature(torch.load).parameters
+            and "assign" in inspect.signature(torch.nn.Module.load_state_dict).parameters)
+
+
+def load_mmap(path: Path) -> SequenceTagger:
+    # the tagger is built on the meta device (no weights allocated) and then takes over the tensors of the
+    # memory-mapped checkpoint (assign=True), so nothing is deserialized into the process and the workers
+    # loading the same file share its pages in the OS cache. Only on the CPU, .to() of a GPU copies anyway
+    state = torch.load(str(path), map_location="cpu", mmap=True, weights_only=False)
+    with torch.device("meta"):
+        tagger = SequenceTagger._init_model_with_state_dict(state)
+    tagger.load_state_dict(state["state_dict"], assign=True)
+    if any(t.is_meta for t in chain(tagger.parameters(), tagger.buffers())):
+        # a tensor the checkpoint does not hold (e.g. a non-persistent buffer) was never materialized
+        raise RuntimeError("checkpoint does not cover every tensor of the tagger")
+    if "model_card" in state:
+        tagger.model_card = state["model_card"]
+    return tagger.eval()
+
+
+def load_bundle_tagger(path: Path) -> tuple[SequenceTagger, str]:
+    # the tagger of the bundle and how it was loaded, memory-mapped where torch and flair allow it
+    if can_mmap() and flair.device.type == "cpu":
+        try:
+            return load_mmap(path), f"{path} (memory-mapped)"
+        except (AttributeError, KeyError, TypeError, RuntimeError) as e:
+            logger.warning(f"Cannot memory-map {path} ({e}), loading it in full")
+    return SequenceTagger.load(str(path)), str(path)
+
 
 class FlairNer:
-    def __init__(self):
-        return
+    def __init__(self, model_dir: Optional[Path] = None, mini_batch_size: int = MINI_BATCH_SIZE):
+        self.mini_batch_size = mini_batch_size
+        self._splitter = SegtokSentenceSplitter()
+        # loaded per instance, milestone_2.model_registry keeps one instance per process
+        path = bundle_file(model_dir) if model_dir is not None else None
+        if path is not None and path.is_file():
+            self._tagger, self.loaded_from = load_bundle_tagger(path)
+        else:
+            self._tagger = SequenceTagger.load(MODEL_NAME)
+            self.loaded_from = MODEL_NAME
+
+    @staticmethod
+    def populate(model_dir: Path) -> Path:
+        # downloads the model once (needs network) and saves it into the bundle
+        path = bundle_file(model_dir)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        SequenceTagger.load(MODEL_NAME).save(path)
+        return path
+
+    @staticmethod
+    def fingerprint(model_dir: Optional[Path] = None) -> str:
+        # identifies the predictions without loading the model, the bundle holds a copy of the same checkpoint
+        try:
+            flair_version = version("flair")
+        except PackageNotFoundError:
+            flair_version = "unknown"
+        return f"{MODEL_NAME} flair={flair_version} sentences=segtok"
 
     def annotate(self, text: str) -> list[Entity]:
-        sentence = Sentence(text)
-        tagger.predict(sentence)
-        entities: list[Entity] = []
-
-        for ent in sentence.get_spans("ner"):
-            label = ent.get_label("ner").value
-            if label in TARGETS:
-                entities.append(Entity(ent.text, label, ent.start_position, ent.end_position))
+        return self.annotate_many([text])[0]
+
+    def annotate_batch(self, texts: list[str]) -> list[list[Entity]]:
+        # batch hook of the pipeline (milestone_2.model_registry.LazyAnnotator.annotate_batch)
+        return self.annotate_many(texts)
+
+    def annotate_many(self, texts: list[str]) -> list[list[Entity]]:
+        # the sessions are tagged sentence by sentence, sentence.start_position is the offset in its text.
+        # The sentences of all texts are pooled and sorted by length, so every batch is full (except the
+        # last one) and holds sentences of similar length, which keeps the padding small
+        sentences = [(i, sentence) for i, text in enumerate(texts) for sentence in self._splitter.split(text)]
+        by_length = sorted((sentence for _, sentence in sentences), key=len, reverse=True)
+        for start in range(0, len(by_length), self.mini_batch_size):
+            batch = by_length[start:start + self.mini_batch_size]
+            self._tagger.predict(batch, mini_batch_size=len(batch))
+
+        entities: list[list[Entity]] = [[] for _ in texts]
+        for i, sentence in sentences:
+            for ent in sentence.get_spans("ner"):
+                label = ent.get_label("ner").value
+                if label in TARGETS:
+                    entities[i].append(Entity(ent.text, label, sentence.start_position + ent.start_position,
+                                              sentence.start_position + ent.end_position))
 
         return entities
\ No newline at end of file
@@ -1,18 +1,117 @@
+import json
 import spacy
+from collections import deque
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Iterable, Iterator, Optional
 
+from ..chunking import chunk_spans, remap
 from ..entities import Entity
 from spacy.language import Language
 
 TARGETS = {"PER","ORG","LOC"}
+MODEL_NAME = "de_core_news_md"
+# components loaded per profile, only doc.ents is read. "ner-only" still needs sentence boundaries:
+# NER does not let an entity cross one, so without the parser the (otherwise disabled) senter sets them
+PROFILES = {
+    "full": {"exclude": [], "enable": []},
+    "ner-only": {"exclude": ["tagger", "morphologizer", "parser", "lemmatizer", "attribute_ruler"],
+                 "enable": ["senter"]},
+}
+# ner-only becomes the default once benchmarks/bench_spacy_profiles.py shows the same F1 as the full pipeline
+PROFILE = "full"
+# longer texts are annotated in chunks of at most this many characters (see milestone_2/chunking.py),
+# which bounds the memory of a Doc instead of the old max_length of 3M characters. The chunks end at
+# paragraph or sentence breaks wherever possible, so they hardly ever cut through an entity
+CHUNK_CHARS = 100_000
+# chunks per nlp.pipe batch
+BATCH_SIZE = 4
+
+
+def _version(package: str) -> str:
+    try:
+        return version(package)
+    except PackageNotFoundError:
+        return "unknown"
+
+def bundle_dir(model_dir: Path, name: str = MODEL_NAME) -> Path:
+    return Path(model_dir) / "spacy" / name
+
+
+def load_pipeline(name: str, profile: str = PROFILE) -> Language:
+    components = PROFILES[profile]
+    nlp = spacy.load(name, exclude=components["exclude"])
+    for component in components["enable"]:
+        if component in nlp.disabled:
+            nlp.enable_pipe(component)
+    # a shared tok2vec that no remaining component listens to only costs time
+    if "tok2vec" in nlp.pipe_names and not any(
+            listener in nlp.pipe_names for listener in nlp.get_pipe("tok2vec").listening_components):
+        nlp.remove_pipe("tok2vec")
+    return nlp
+
 
 class SpacyNer:
-    def __init__(self):
-        self._nlp = spacy.load("de_core_news_md")
-        self._nlp.max_length = 3000000 # not a smart solution but it works
+    def __init__(self, model_dir: Optional[Path] = None, profile: str = PROFILE, chunk_chars: int = CHUNK_CHARS):
+        # a copy in the model bundle is used if there is one, otherwise the installed package
+        path = bundle_dir(model_dir) if model_dir is not None else None
+        self.loaded_from = str(path) if path is not None and path.is_dir() else MODEL_NAME
+        self._nlp = load_pipeline(self.loaded_from, profile)
+        self._nlp.max_length = max(self._nlp.max_length, chunk_chars)
+        self.chunk_chars = chunk_chars
         return
 
+    @staticmethod
+    def populate(model_dir: Path, name: str = MODEL_NAME) -> Path:
+        # copies the installed package into the bundle, the nodes then don't need it installed
+        path = bundle_dir(model_dir, name)
+        # to_disk only creates the last directory
+        path.parent.mkdir(parents=True, exist_ok=True)
+        spacy.load(name).to_disk(path)
+        return path
+
+    @staticmethod
+    def fingerprint(model_dir: Optional[Path] = None, profile: str = PROFILE, chunk_chars: int = CHUNK_CHARS) -> str:
+        # identifies the predictions without loading the model, the version of the bundled copy if there is one
+        model_version = _version(MODEL_NAME)
+        meta = bundle_dir(model_dir) / "meta.json" if model_dir is not None else None
+        if meta is not None and meta.exists():
+            with meta.open("r", encoding="utf-8") as f:
+                model_version = json.load(f).get("version", "unknown")
+        excluded = "+".join(PROFILES[profile]["exclude"]) or "none"
+        return (f"{MODEL_NAME}={model_version} spacy={spacy.__version__} profile={profile} exclude={excluded} "
+                f"chunk={chunk_chars}")
+
     def annotate(self, text: str) -> list[Entity]:
-        doc = self._nlp(text)
+        return next(self.annotate_stream([text]))
+
+    def annotate_stream(self, texts: Iterable[str], batch_size: int = BATCH_SIZE,
+                        n_process: int = 1) -> Iterator[list[Entity]]:
+        # entities of every text in input order, the chunks of all texts go through one nlp.pipe.
+        # n_process > 1 starts that many processes for the whole stream, so it only pays off on long streams
+        pending = deque()  # (text, spans) of the texts whose chunks are in the pipe
+
+        def chunks():
+            for text in texts:
+                spans = chunk_spans(text, self.chunk_chars)
+                pending.append((text, spans))
+                for i, (start, end, _) in enumerate(spans):
+                    yield text[start:end], i == len(spans) - 1
+
+        chunk_entities = []
+        for doc, last in self._nlp.pipe(chunks(), as_tuples=True, batch_size=batch_size, n_process=n_process):
+            chunk_entities.append(self._entities(doc))
+            if last:
+                text, spans = pending.popleft()
+                yield remap(text, spans, chunk_entities)
+                chunk_entities = []
+
+    def annotate_batch(self, texts: list[str], batch_size: int = BATCH_SIZE,
+                       n_process: int = 1) -> list[list[Entity]]:
+        return list(self.annotate_stream(texts, batch_size, n_process))
+
+    @staticmethod
+    def _entities(doc) -> list[Entity]:
         results: list[Entity] = []
         for ent in doc.ents:
             if ent.label_ in TARGETS:
@@ -0,0 +1,113 @@
+"""
+Local model bundle for machines without network access.
+
+populate downloads / copies every model into one directory (run it once on a
+machine with network, then copy the directory to the nodes):
+  <model_dir>/flair/flair--ner-german-large.pt        flair checkpoint, memory-mapped on the CPU
+  <model_dir>/spacy/de_core_news_md, de_core_news_sm   spaCy pipelines (no package install needed)
+  <model_dir>/rule_based/parliament_persons.json       parliament API response of the rule based gazetteer
+  <model_dir>/bundle.json                              fingerprints of the models when they were stored
+
+The pipeline uses the bundle with --model-dir or $NER_MODEL_DIR. info checks
+that the bundle still matches the installed versions and with --load times
+loading every model from it.
+
+usage: python -m milestone_2.model_bundle populate model_dir [--models flair,spacy]
+       python -m milestone_2.model_bundle info model_dir [--load]
+"""
+import argparse
+import json
+import logging
+import time
+from pathlib import Path
+
+from milestone_2 import model_registry
+
+logger = logging.getLogger(__name__)
+
+BUNDLE_JSON = "bundle.json"
+
+
+def read_bundle(model_dir: Path) -> dict:
+    path = Path(model_dir) / BUNDLE_JSON
+    if not path.exists():
+        return {"models": {}}
+    with path.open("r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def dir_size(path: Path) -> int:
+    if path.is_file():
+        return path.stat().st_size
+    return sum(p.stat().st_size for p in path.rglob("*") if p.is_file())
+
+
+def populate(model_dir: Path, model_names: list[str]):
+    model_dir.mkdir(parents=True, exist_ok=True)
+    bundle = read_bundle(model_dir)
+    for name in model_names:
+        start = time.perf_counter()
+        path = model_registry.populate(name, model_dir)
+        bundle["models"][name] = {
+            "path": str(path.relative_to(model_dir)),
+            "fingerprint": model_registry.fingerprint(name, model_dir),
+            "populated": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        }
+        logger.info(f"Stored {name} in {path} ({dir_size(path) / 2**20:.0f} MB, {time.perf_counter() - start:.0f}s)")
+        # written after every model, a failing download keeps the ones before
+        with (model_dir / BUNDLE_JSON).open("w", encoding="utf-8") as f:
+            json.dump(bundle, f, ensure_ascii=False, indent=2)
+
+
+def info(model_dir: Path, load: bool) -> bool:
+    bundle = read_bundle(model_dir)
+    ok = True
+    for name in model_registry.MODEL_NAMES:
+        entry = bundle["models"].get(name)
+        if entry is None:
+            print(f"{name:<12} missing")
+            ok = False
+            continue
+        path = model_dir / entry["path"]
+        current = model_registry.fingerprint(name, model_dir)
+        status = "ok" if path.exists() and entry["fingerprint"] == current else "stale"
+        if not path.exists():
+            status = "missing"
+        ok = ok and status == "ok"
+        size = f"{dir_size(path) / 2**20:.0f} MB" if path.exists() else "-"
+        print(f"{name:<12} {status:<8} {size:>8}  {entry['populated']}  {entry['fingerprint']}")
+        if status == "stale":
+            print(f"{'':<12} installed: {current}")
+
+    if load:
+        model_registry.configure(model_dir)
+        model_registry.preload([name for name in model_registry.MODEL_NAMES if name in bundle["models"]])
+        model_registry.startup_report()
+    return ok
+
+
+def main():
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s - %(message)s")
+    arg_parser = argparse.ArgumentParser(description="Store the NER models in a local directory")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    populate_parser = sub.add_parser("populate", help="download / copy the models into model_dir")
+    populate_parser.add_argument("model_dir", type=Path)
+    populate_parser.add_argument("--models", default=",".join(model_registry.MODEL_NAMES),
+                                 help="comma separated models to store (default: all)")
+    info_parser = sub.add_parser("info", help="show what is in model_dir and whether it is up to date")
+    info_parser.add_argument("model_dir", type=Path)
+    info_parser.add_argument("--load", action="store_true", help="also load every model and report the startup time")
+    args = arg_parser.parse_args()
+
+    if args.command == "populate":
+        try:
+            model_names = model_registry.parse_models(args.models)
+        except ValueError as e:
+            arg_parser.error(str(e))
+        populate(args.model_dir, model_names)
+    elif not info(args.model_dir, args.load):
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    main()
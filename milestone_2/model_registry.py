@@ -0,0 +1,123 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from milestone_2.entities import Entity
+
+logger = logging.getLogger(__name__)
+
+GEONAMES_DIR = Path("milestone_2/rule_based/location_data")
+
+# name -> (module, class, constructor arguments), nothing is imported before a model is used
+MODELS = {
+    "rule_based": ("milestone_2.rule_based.rule_based_ner", "RuleBasedNER", (GEONAMES_DIR,)),
+    "flair": ("milestone_2.ml_flair.flair_ner", "FlairNer", ()),
+    "spacy": ("milestone_2.ml_spacy.spacy_ner", "SpacyNer", ()),
+}
+MODEL_NAMES = list(MODELS)
+
+# local model bundle (see model_bundle.py), without one the models come from the installed packages and the hub
+MODEL_DIR_ENV = "NER_MODEL_DIR"
+_model_dir: Optional[Path] = Path(os.environ[MODEL_DIR_ENV]) if os.environ.get(MODEL_DIR_ENV) else None
+
+# keyword arguments of the model constructors and fingerprints, e.g. {"spacy": {"profile": "full"}}
+_options: dict[str, dict] = {}
+
+# one instance per model and process
+_instances: dict[str, object] = {}
+_lock = threading.Lock()
+# seconds it took to load every model of this process
+load_times: dict[str, float] = {}
+
+
+def configure(model_dir: Optional[Path] = None, options: Optional[dict[str, dict]] = None) -> Optional[Path]:
+    # None keeps $NER_MODEL_DIR, call before the first get_model and fingerprint
+    global _model_dir
+    if model_dir is not None:
+        _model_dir = Path(model_dir)
+    for name, model_options in (options or {}).items():
+        _options.setdefault(name, {}).update(model_options)
+    return _model_dir
+
+
+def parse_models(spec: str) -> list[str]:
+    # "spacy,rule_based" -> ["rule_based", "spacy"], always in MODEL_NAMES order
+    names = {name.strip() for name in spec.split(",") if name.strip()}
+    unknown = names - set(MODELS)
+    if unknown:
+        raise ValueError(f"Unknown models {', '.join(sorted(unknown))}, choose from {', '.join(MODEL_NAMES)}")
+    return [name for name in MODEL_NAMES if name in names]
+
+
+def model_class(name: str):
+    module_name, class_name, _ = MODELS[name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+
+def fingerprint(name: str, model_dir: Optional[Path] = None) -> str:
+    # only imports the annotator module, the model itself is not loaded. model_dir defaults to the configured one
+    _, _, init_args = MODELS[name]
+    model_dir = Path(model_dir) if model_dir is not None else _model_dir
+    return model_class(name).fingerprint(*init_args, model_dir=model_dir, **_options.get(name, {}))
+
+
+def populate(name: str, model_dir: Path) -> Path:
+    _, _, init_args = MODELS[name]
+    return model_class(name).populate(Path(model_dir), *init_args)
+
+
+def load_instance(name: str):
+    # a new instance, get_model shares one per process
+    start = time.perf_counter()
+    _, _, init_args = MODELS[name]
+    instance = model_class(name)(*init_args, model_dir=_model_dir, **_options.get(name, {}))
+    logger.info(f"Loaded {name} from {instance.loaded_from} in {time.perf_counter() - start:.1f}s")
+    return instance
+
+
+def get_model(name: str):
+    with _lock:
+        if name not in _instances:
+            start = time.perf_counter()
+            _instances[name] = load_instance(name)
+            load_times[name] = time.perf_counter() - start
+        return _instances[name]
+
+
+def startup_report():
+    if load_times:
+        times = ", ".join(f"{name} {seconds:.1f}s" for name, seconds in load_times.items())
+        logger.info(f"Model startup of process {os.getpid()}: {sum(load_times.values()):.1f}s ({times})")
+
+
+class LazyAnnotator:
+    """
+    annotate() of a registry model, the model is loaded on the first call.
+    Only the name is pickled, so it can be handed to worker processes.
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def __call__(self, text: str) -> list[Entity]:
+        return get_model(self.name).annotate(text)
+
+    def annotate_batch(self, texts: list[str], **options) -> list[list[Entity]]:
+        # models without annotate_batch annotate one text after the other, options are only for annotate_batch
+        model = get_model(self.name)
+        if hasattr(model, "annotate_batch"):
+            return model.annotate_batch(texts, **options)
+        return [model.annotate(text) for text in texts]
+
+
+def annotators(names: list[str]) -> dict[str, Callable[[str], list[Entity]]]:
+    return {name: LazyAnnotator(name) for name in names}
+
+
+def preload(names: list[str]):
+    for name in names:
+        get_model(name)
@@ -1,21 +1,42 @@
+import argparse
 import csv
 import json
 import os
 from pathlib import Path
 import logging
+import time
 
+from milestone_2.dedup import Deduplicator
 from milestone_2.entities import Entity
-from milestone_2.ml_flair.flair_ner import FlairNer
-from milestone_2.ml_spacy.spacy_ner import SpacyNer
-from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
-from milestone_2.rule_based.rule_based_ner import RuleBasedNER
+from milestone_2.manifest import RunManifest, input_hash
+from milestone_2.memory_profile import MemoryProfiler
+from milestone_2.metrics import DocStats, MetricsLog
+from milestone_2 import model_registry
+from milestone_2.parallel import DocumentPool
+from milestone_2.prefetch import prefetch
+from milestone_2.profiling import PROFILE_DIR, StageProfiler, parse_stages, profiled
+from milestone_2.scheduler import LptScheduler, file_cost, xmi_cost
+from milestone_2.sharding import parse_shard, select_shard, shard_file, write_shard_report
+from milestone_2.stages import StagedAnnotator, parse_stage_workers
+from milestone_2.preprocessing_gerparcor.corpus_store import CorpusStore
+from milestone_2.preprocessing_gerparcor.doc_cache import DocCache
+from milestone_2.preprocessing_gerparcor.tar_corpus import TarCorpus
+from milestone_2.preprocessing_gerparcor.xmi_parser import PARSER_VERSION, XmiParser
 
 LOG_DIR = Path("logs")
 RAW_XMI_DIR = Path("data/raw_xmi")
+CACHE_DIR = Path("data/parse_cache")
 
 RESULTS_DIR = Path("milestone_2/results")
 ENTITIES_DIR = RESULTS_DIR / "entities"
 SCORES_CSV = RESULTS_DIR / "scores.csv"
+DUPLICATES_JSON = RESULTS_DIR / "duplicates.json"
+MANIFEST_JSON = RESULTS_DIR / "manifest.json"
+SCHEDULER_JSON = RESULTS_DIR / "scheduler_calibration.json"
+METRICS_JSONL = RESULTS_DIR / "metrics.jsonl"
+METRICS_SUMMARY_CSV = RESULTS_DIR / "metrics_summary.csv"
+MEMORY_JSONL = RESULTS_DIR / "memory.jsonl"
+PERSONS_JSON = RESULTS_DIR / "parliament_persons.json"
 RESULTS_DIR.mkdir(exist_ok=True)
 ENTITIES_DIR.mkdir(exist_ok=True)
 LOG_DIR.mkdir(exist_ok=True)
@@ -35,67 +56,538 @@ logger = logging.getLogger(__name__)
 METRIC_NAMES = ["TP", "FP", "FN", "precision", "recall", "f1"]
 TARGETS = ["LOC", "PER", "ORG"]
 
-def initialize_rulebased_ner():
-    geonames_dir = Path("milestone_2/rule_based/location_data")
-    rulebased_ner = RuleBasedNER(geonames_dir)
-    return rulebased_ner
+def model_fingerprints(model_names: list[str]) -> dict[str, str]:
+    # same keys and order as load_models
+    return {name: model_registry.fingerprint(name) for name in model_names}
 
 
-def main():
+def expected_skips(files: list[Path], manifest: RunManifest, fingerprints: dict[str, str],
+                   duplicates_json: Path, dedup: bool) -> set[Path]:
+    # documents the last run says are up to date or duplicates, before they are parsed to know for sure
+    previous_duplicates = {}
+    if dedup and duplicates_json.exists():
+        try:
+            with duplicates_json.open("r", encoding="utf-8") as f:
+                previous_duplicates = json.load(f)
+        except (OSError, ValueError):
+            pass
+    return {f for f in files
+            if f.name in previous_duplicates
+            or (manifest.has_models(f.name, fingerprints) and (ENTITIES_DIR / f"{f.stem}_entities.json").exists())}
+
+
+def load_models(model_names: list[str] = model_registry.MODEL_NAMES):
+    # loaded up front, so the first document's timings don't include the model loading
+    model_registry.preload(model_names)
+    model_registry.startup_report()
+    return model_registry.annotators(model_names)
+
+
+def annotate_document(models, plain_text: str, model_names=None,
+                      stats: DocStats = None) -> dict[str, list[Entity]]:
+    predictions_by_model: dict[str, list[Entity]] = {}
+    for model_name, annotator in models.items():
+        if model_names is not None and model_name not in model_names:
+            continue
+        start = time.perf_counter()
+        preds = annotator(plain_text)
+        if stats is not None:
+            stats.model_s[model_name] = time.perf_counter() - start
+            stats.model_entities[model_name] = len(preds)
+        predictions_by_model[model_name] = preds
+    return predictions_by_model
+
+
+def annotate_and_save(models, doc_path: Path, plain_text: str, ground_truth: list[Entity],
+                      model_names=None, keep_previous: bool = False,
+                      profiler: StageProfiler = None) -> DocStats:
+    stats = DocStats()
+    predictions_by_model = annotate_document(models, plain_text, model_names, stats)
+    predictions_by_model = with_previous_predictions(doc_path, predictions_by_model, keep_previous)
+    start = time.perf_counter()
+    with profiled(profiler, "save", doc_path.name):
+        save_entities_for_doc(doc_path, ground_truth, predictions_by_model)
+    stats.save_s = time.perf_counter() - start
+    return stats
+
+
+def annotate_and_save_batch(models, docs: list[tuple], batch_options: dict[str, dict] = None):
+    # docs are (doc_path, plain_text, ground_truth, model_names, keep_previous), every model annotates all
+    # of its documents in one annotate_batch call and its time is split over them by characters.
+    # Returns (doc_path, stats, error) for every document, like DocumentPool
+    batch_options = batch_options or {}
+    stats = [DocStats() for _ in docs]
+    predictions = [{} for _ in docs]
+    errors = [None] * len(docs)
+
+    def record(i, model_name, preds, seconds):
+        stats[i].model_s[model_name] = seconds
+        stats[i].model_entities[model_name] = len(preds)
+        predictions[i][model_name] = preds
+
+    for model_name, annotator in models.items():
+        indices = [i for i, doc in enumerate(docs) if doc[3] is None or model_name in doc[3]]
+        annotate_batch = getattr(annotator, "annotate_batch", None)
+        if annotate_batch is not None and len(indices) > 1:
+            texts = [docs[i][1] for i in indices]
+            try:
+                start = time.perf_counter()
+                results = annotate_batch(texts, **batch_options.get(model_name, {}))
+                seconds = time.perf_counter() - start
+                total_chars = sum(len(text) for text in texts) or 1
+                for i, preds in zip(indices, results):
+                    record(i, model_name, preds, seconds * len(docs[i][1]) / total_chars)
+                continue
+            except Exception:
+                logger.warning(f"{model_name} failed on a batch, annotating its documents one by one", exc_info=True)
+        for i in indices:
+            if errors[i] is not None:
+                continue
+            try:
+                start = time.perf_counter()
+                preds = annotator(docs[i][1])
+                record(i, model_name, preds, time.perf_counter() - start)
+            except Exception as e:
+                errors[i] = e
+
+    finished = []
+    for i, (doc_path, _, ground_truth, _, keep_previous) in enumerate(docs):
+        if errors[i] is None:
+            try:
+                start = time.perf_counter()
+                save_entities_for_doc(doc_path, ground_truth,
+                                      with_previous_predictions(doc_path, predictions[i], keep_previous))
+                stats[i].save_s = time.perf_counter() - start
+            except Exception as e:
+                errors[i] = e
+        finished.append((doc_path, stats[i] if errors[i] is None else None, errors[i]))
+    return finished
+
+
+def with_previous_predictions(doc_path: Path, predictions_by_model: dict[str, list[Entity]],
+                              keep_previous: bool) -> dict[str, list[Entity]]:
+    # models that were not run (again) keep their predictions from the existing entities file
+    if not keep_previous or all(name in predictions_by_model for name in model_registry.MODEL_NAMES):
+        return predictions_by_model
+    merged = {**load_predictions(doc_path), **predictions_by_model}
+    order = model_registry.MODEL_NAMES + [name for name in merged if name not in model_registry.MODEL_NAMES]
+    return {name: merged[name] for name in order if name in merged}
+
+
+# models of a --workers process, loaded once by the pool initializer
+_worker_models = None
+
+
+def _init_worker(model_names: list[str], model_dir: Path = None, model_options: dict = None):
+    global _worker_models
+    model_registry.configure(model_dir, model_options)
+    _worker_models = load_models(model_names)
+
+
+def _annotate_in_worker(doc_path: Path, plain_text: str, ground_truth: list[Entity], model_names=None,
+                        keep_previous: bool = False) -> DocStats:
+    return annotate_and_save(_worker_models, doc_path, plain_text, ground_truth, model_names, keep_previous)
+
+
+def positive_int(value: str) -> int:
+    number = int(value)
+    if number < 1:
+        raise argparse.ArgumentTypeError(f"Must be at least 1, got {value!r}")
+    return number
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Run the NER models on the GerParCor XMI files")
+    parser.add_argument("--cache-dir", type=Path, default=CACHE_DIR,
+                        help="directory of the parsed document cache")
+    parser.add_argument("--cache-max-mb", type=int, default=2048,
+                        help="size cap of the parsed document cache")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="always parse the XMI files")
+    parser.add_argument("--store", type=Path, default=None,
+                        help="read the documents from a packed corpus store instead of the XMI files")
+    parser.add_argument("--tar", type=Path, nargs="+", default=None,
+                        help="read the documents straight from the GerParCor tar archives (e.g. downloads/*.tar)")
+    parser.add_argument("--prefetch", type=int, default=2,
+                        help="number of documents parsed ahead in the background while the models annotate (0 disables)")
+    parser.add_argument("--no-dedup", action="store_true",
+                        help="annotate documents with identical text separately")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="number of worker processes, each loads the models once")
+    parser.add_argument("--stages", action="store_true",
+                        help="run every model as its own stage with its own worker threads")
+    parser.add_argument("--stage-workers", default=None,
+                        help="threads per model stage, e.g. flair=3,spacy=1,rule_based=1 (default 1 each), every further thread loads its own model")
+    parser.add_argument("--shard", type=parse_shard, default=None,
+                        help="only annotate shard i of N (e.g. 0/4), see milestone_2/sharding.py")
+    parser.add_argument("--schedule", choices=["lpt", "name"], default="lpt",
+                        help="document order: largest first (default) or by file name")
+    parser.add_argument("--force", action="store_true",
+                        help="annotate every document again, even if the run manifest says it is up to date")
+    parser.add_argument("--profile-memory", action="store_true",
+                        help=f"record tracemalloc and RSS peaks of every parse and annotator call in {MEMORY_JSONL}")
+    parser.add_argument("--profile", type=parse_stages, default=None,
+                        help="cProfile these stages, e.g. parse,flair,save (default: $NER_PROFILE)")
+    parser.add_argument("--profile-sample", type=float, default=None,
+                        help="fraction of the documents to profile (default: $NER_PROFILE_SAMPLE or 1)")
+    parser.add_argument("--profile-dir", type=Path, default=None,
+                        help=f"where the .prof/.collapsed files go (default: $NER_PROFILE_DIR or {PROFILE_DIR})")
+    parser.add_argument("--models", default=",".join(model_registry.MODEL_NAMES),
+                        help="comma separated models to run (default: all), other predictions in existing entities files are kept")
+    parser.add_argument("--batch", type=int, default=8,
+                        help="documents annotated together by models with batch support (spacy, flair), 1 disables")
+    parser.add_argument("--spacy-batch-size", type=int, default=None,
+                        help="documents per spaCy nlp.pipe batch (default: milestone_2.ml_spacy.spacy_ner.BATCH_SIZE)")
+    parser.add_argument("--spacy-processes", type=int, default=1,
+                        help="nlp.pipe processes per --batch, only worth it with a large --batch")
+    parser.add_argument("--spacy-profile", choices=["ner-only", "full"], default=None,
+                        help="spaCy components to load (default: full, see milestone_2/ml_spacy/spacy_ner.py)")
+    parser.add_argument("--spacy-chunk-chars", type=positive_int, default=None,
+                        help="longer texts are annotated by spaCy in chunks of this size (default: milestone_2.ml_spacy.spacy_ner.CHUNK_CHARS)")
+    parser.add_argument("--flair-batch-size", type=int, default=None,
+                        help="sentences per flair predict batch (default: milestone_2.ml_flair.flair_ner.MINI_BATCH_SIZE)")
+    parser.add_argument("--model-dir", type=Path, default=None,
+                        help=f"load the models from this bundle (default: ${model_registry.MODEL_DIR_ENV}), see milestone_2/model_bundle.py")
+    args = parser.parse_args(argv)
+    try:
+        args.models = model_registry.parse_models(args.models)
+    except ValueError as e:
+        parser.error(str(e))
+    if args.stages and args.workers > 1:
+        parser.error("--stages and --workers can not be combined")
+    if args.profile_memory and (args.stages or args.workers > 1):
+        parser.error("--profile-memory measures one call at a time, it can not be combined with --stages or --workers")
+    args.profiler = StageProfiler.configure(args.profile, args.profile_sample, args.profile_dir)
+    if args.profiler is not None and (args.stages or args.workers > 1):
+        parser.error("profiling runs one stage at a time, it can not be combined with --stages or --workers")
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
 
     logger.info("Initializing classes")
-    xmi_parser = XmiParser()
+    cache = None
+    if not args.no_cache:
+        cache = DocCache(args.cache_dir, PARSER_VERSION, max_bytes=args.cache_max_mb * 2**20)
+    xmi_parser = XmiParser(streaming=True, cache=cache)
 
-    rule_based_ner = initialize_rulebased_ner()
-    flair_ner = FlairNer()
-    spacy_ner = SpacyNer()
+    model_options = {"flair": {}, "spacy": {}}
+    if args.flair_batch_size is not None:
+        model_options["flair"]["mini_batch_size"] = args.flair_batch_size
+    if args.spacy_profile is not None:
+        model_options["spacy"]["profile"] = args.spacy_profile
+    if args.spacy_chunk_chars is not None:
+        model_options["spacy"]["chunk_chars"] = args.spacy_chunk_chars
+    model_dir = model_registry.configure(args.model_dir, model_options)
+    if model_dir is not None:
+        logger.info(f"Loading the models from {model_dir}")
+    if "rule_based" in args.models:
+        # one parliament person list for the fingerprint and every process building the rules
+        persons_file = model_registry.model_class("rule_based").pin_parliament_persons(model_dir, PERSONS_JSON)
+        model_options["rule_based"] = {"persons_file": persons_file}
+        model_registry.configure(options={"rule_based": model_options["rule_based"]})
+    fingerprints = model_fingerprints(args.models)
+    manifest_json, duplicates_json = MANIFEST_JSON, DUPLICATES_JSON
+    metrics_jsonl, metrics_summary_csv = METRICS_JSONL, METRICS_SUMMARY_CSV
+    if args.shard is not None:
+        # per shard, so the results directories of all machines can be copied together
+        manifest_json, duplicates_json = shard_file("manifest", *args.shard), shard_file("duplicates", *args.shard)
+        metrics_jsonl = shard_file("metrics", *args.shard, suffix=".jsonl")
+        metrics_summary_csv = shard_file("metrics_summary", *args.shard, suffix=".csv")
+        manifest_json.parent.mkdir(exist_ok=True)
+    manifest = RunManifest(manifest_json)
+    metrics = MetricsLog(metrics_jsonl)
 
-    models = {
-        "rule_based": rule_based_ner.annotate,
-        "flair": flair_ner.annotate,
-        "spacy": spacy_ner.annotate,
-    }
+    pool = None
+    models = None
+    if args.workers > 1:
+        logger.info(f"Starting {args.workers} worker processes")
+        pool = DocumentPool(args.workers, _init_worker, (args.models, model_dir, model_options))
+    else:
+        models = load_models(args.models)
+
+    profiler = None
+    if args.profile_memory:
+        # tracemalloc is process wide, parsing ahead would be attributed to the annotators
+        args.prefetch = 0
+        profiler = MemoryProfiler(MEMORY_JSONL)
+        models = profiler.wrap_models(models)
+    stage_profiler = args.profiler
+    if stage_profiler is not None:
+        logger.info(f"Profiling {', '.join(sorted(stage_profiler.stages))} on {stage_profiler.sample:.0%} of the documents")
+        args.prefetch = 0
+        models = stage_profiler.wrap_models(models)
+    concurrency = parse_stage_workers(args.stage_workers, models) if args.stages else None
+    if profiler is not None or stage_profiler is not None:
+        # measurements are per document and call
+        args.batch = 1
+    batch_options = {"spacy": {"n_process": args.spacy_processes}}
+    if args.spacy_batch_size is not None:
+        batch_options["spacy"]["batch_size"] = args.spacy_batch_size
 
     logger.info("loading files")
 
-    if RAW_XMI_DIR.is_file():
-        files = [RAW_XMI_DIR]
+    if args.store is not None:
+        store = CorpusStore(args.store)
+        files = [Path(name) for name in store.names()]
+        load_document = store.load
+        unit, document_cost = "chars", lambda f: store.metadata(f.name)["chars"]
+    elif args.tar is not None:
+        tar_corpus = TarCorpus(args.tar, xmi_parser)
+        files = [Path(name) for name in tar_corpus.names()]
+        load_document = tar_corpus.load
+
+        def document_cost(f):
+            member = tar_corpus.member(f.name)
+            return xmi_cost(member.size, member.name.endswith(".gz"))
+        unit = "xmi_bytes"
     else:
-        files = [p for p in RAW_XMI_DIR.iterdir() if p.is_file()]
+        if RAW_XMI_DIR.is_file():
+            files = [RAW_XMI_DIR]
+        else:
+            files = sorted(p for p in RAW_XMI_DIR.iterdir() if p.is_file())
+        load_document = xmi_parser.parse
+        unit, document_cost = "xmi_bytes", file_cost
+
+    corpus = files
+    if args.shard is not None:
+        files = select_shard(corpus, *args.shard)
+        logger.info(f"shard {args.shard[0]}/{args.shard[1]}: {len(files)} of {len(corpus)} files")
+
+    scheduler = None
+    if args.schedule == "lpt":
+        scheduler = LptScheduler(args.workers, unit, SCHEDULER_JSON)
+        skips = set() if args.force else expected_skips(files, manifest, fingerprints, duplicates_json,
+                                                        not args.no_dedup)
+        files = scheduler.order(files, document_cost, skips)
 
     logger.info(f"loaded {len(files)} files")
 
 
-    for i, f in enumerate(files):
+    dedup = Deduplicator()
+    # ground truth of documents whose text was already seen, linked after all annotations are done
+    duplicates: dict[Path, list[Entity]] = {}
+    saved: set[Path] = set()
+    # input hash, models run, stats and whether older predictions are kept for every document being annotated
+    running: dict[Path, tuple[str, list[str], DocStats, bool]] = {}
+
+    def mark_saved(doc_path, annotation: DocStats):
+        doc_hash, model_names, stats, _ = running.pop(doc_path)
+        manifest.record(doc_path.name, doc_hash, {m: fingerprints[m] for m in model_names})
+        saved.add(doc_path)
+        stats.merge(annotation)
+        metrics.record(doc_path, stats)
+        if scheduler is not None:
+            scheduler.done(doc_path, stats.annotate_s())
+
+    def collect(finished):
+        for doc_path, annotation, error in finished:
+            if error is not None:
+                running.pop(doc_path, None)
+                logger.error(f"Error annotating file {doc_path}", exc_info=error)
+            else:
+                mark_saved(doc_path, annotation)
+
+    def collect_staged(finished):
+        # finished stage documents are saved here in the main thread, like everything touching running/saved
+        for doc_path, ground_truth, predictions_by_model, annotation, errors in finished:
+            if errors:
+                running.pop(doc_path, None)
+                for model_name, error in errors.items():
+                    logger.error(f"Error annotating file {doc_path} with {model_name}", exc_info=error)
+                continue
+            try:
+                keep_previous = running[doc_path][3]
+                predictions_by_model = with_previous_predictions(doc_path, predictions_by_model, keep_previous)
+                start = time.perf_counter()
+                save_entities_for_doc(doc_path, ground_truth, predictions_by_model)
+                annotation.save_s = time.perf_counter() - start
+                mark_saved(doc_path, annotation)
+            except Exception:
+                running.pop(doc_path, None)
+                logger.exception(f"Error saving file {doc_path}")
+
+    staged = None
+    if args.stages:
+        logger.info(f"Running model stages with {concurrency} threads")
+        # every further thread of a stage gets its own model instance
+        staged = StagedAnnotator(models, concurrency, lambda name: model_registry.load_instance(name).annotate)
+
+    if profiler is not None:
+        load_document = profiler.wrap_load(load_document)
+    if stage_profiler is not None:
+        load_document = stage_profiler.wrap_load(load_document)
+
+    # documents waiting for a batched annotation (serial runs only)
+    batch: list[tuple] = []
+
+    def flush_batch():
+        finished = annotate_and_save_batch(models, batch, batch_options)
+        batch.clear()
+        collect(finished)
+
+    def plan(f, plain_text, ground_truth, parse_s):
+        # models to run and whether older predictions are kept, no models if the document is up to date
+        doc_hash = input_hash(plain_text, ground_truth)
+        model_names = list(fingerprints)
+        keep_previous = (ENTITIES_DIR / f"{f.stem}_entities.json").exists() and manifest.is_current(f.name, doc_hash)
+        if not args.force and keep_previous:
+            model_names = manifest.stale_models(f.name, doc_hash, fingerprints)
+            if not model_names:
+                logger.info(f"{f.name} is up to date, skipping annotation")
+                saved.add(f)
+                return [], keep_previous
+            if len(model_names) < len(fingerprints):
+                logger.info(f"{f.name}: running {', '.join(model_names)} again")
+        running[f] = (doc_hash, model_names, DocStats(chars=len(plain_text), parse_s=parse_s), keep_previous)
+        return model_names, keep_previous
+
+    def timed_load(doc_path):
+        start = time.perf_counter()
+        gerparcor_data = load_document(doc_path)
+        return gerparcor_data, time.perf_counter() - start
+
+    for i, (f, loaded, error) in enumerate(prefetch(files, timed_load, args.prefetch)):
         logger.info("Processing file {}/{}".format(i+1, len(files)))
 
-        try:
+        if error is not None:
+            logger.error(f"Error parsing file {f}", exc_info=error)
+            continue
 
-            gerparcor_data = xmi_parser.parse(f)
+        try:
+            gerparcor_data, parse_s = loaded
 
             plain_text = gerparcor_data["text"]
 
             ground_truth: list[Entity] = [Entity(**e) if isinstance(e, dict) else e for e in gerparcor_data["entities"]]
 
-            predictions_by_model: dict[str, list[Entity]] = {}
-            for model_name, annotator in models.items():
-                preds = annotator(plain_text)
-                predictions_by_model[model_name] = preds
+            if not args.no_dedup:
+                canonical = dedup.check(f, plain_text)
+                if canonical is not None:
+                    logger.info(f"{f.name} has the same text as {canonical.name}, skipping annotation")
+                    duplicates[f] = ground_truth
+                    continue
+
+            model_names, keep_previous = plan(f, plain_text, ground_truth, parse_s)
+            if not model_names:
+                continue
 
-            save_entities_for_doc(f, ground_truth, predictions_by_model)
+            if pool is not None:
+                collect(pool.submit(f, _annotate_in_worker, f, plain_text, ground_truth, model_names, keep_previous))
+                continue
+            if staged is not None:
+                collect_staged(staged.submit(f, plain_text, ground_truth, model_names))
+                continue
+
+            if args.batch > 1:
+                batch.append((f, plain_text, ground_truth, model_names, keep_previous))
+                if len(batch) >= args.batch:
+                    flush_batch()
+                continue
+
+            if profiler is not None:
+                profiler.doc_path = f
+            if stage_profiler is not None:
+                stage_profiler.doc_name = f.name
+            mark_saved(f, annotate_and_save(models, f, plain_text, ground_truth, model_names, keep_previous,
+                                            stage_profiler))
 
         except Exception as e:
+            running.pop(f, None)
             logger.exception(f"Error parsing file {f}")
 
+    if batch:
+        flush_batch()
+    if pool is not None:
+        collect(pool.join())
+    if staged is not None:
+        collect_staged(staged.join())
+
+    # the annotated document of a duplicate group failed, the next document of the group is annotated instead
+    failed = sorted({canonical for canonical in dedup.duplicates.values() if canonical not in saved})
+    while failed:
+        if models is None:
+            logger.info("Loading the models to annotate the duplicates of failed documents")
+            models = load_models(args.models)
+        for canonical in failed:
+            f = dedup.promote(canonical)
+            ground_truth = duplicates.pop(f)
+            logger.info(f"Annotating {f.name} instead of {canonical.name}, which failed")
+            try:
+                gerparcor_data, parse_s = timed_load(f)
+                model_names, keep_previous = plan(f, gerparcor_data["text"], ground_truth, parse_s)
+                if model_names:
+                    mark_saved(f, annotate_and_save(models, f, gerparcor_data["text"], ground_truth, model_names,
+                                                    keep_previous))
+            except Exception:
+                running.pop(f, None)
+                logger.exception(f"Error annotating file {f}")
+        failed = sorted({canonical for canonical in dedup.duplicates.values() if canonical not in saved})
+
+    if scheduler is not None:
+        scheduler.report()
+    manifest.close()
+    metrics.close()
+    if metrics.rows:
+        metrics.write_summary(metrics_summary_csv)
+        logger.info(f"Metrics written to {metrics_jsonl} and {metrics_summary_csv}")
+    if profiler is not None:
+        profiler.close()
+        profiler.summary()
+        logger.info(f"Memory profile written to {MEMORY_JSONL}")
+    if stage_profiler is not None:
+        stage_profiler.dump()
+
+    link_duplicates(dedup, duplicates, saved, duplicates_json)
+
+    if args.shard is not None:
+        report = write_shard_report(*args.shard, corpus, files, saved, fingerprints)
+        logger.info(f"Shard report written to {report}")
+
+
+def link_duplicates(dedup: Deduplicator, duplicates: dict[Path, list[Entity]], saved: set[Path],
+                    out_file: Path = DUPLICATES_JSON) -> None:
+    if not dedup.duplicates:
+        return
+
+    logger.info(f"{len(dedup.duplicates)} duplicate documents, copying predictions")
+    for f, ground_truth in duplicates.items():
+        canonical = dedup.duplicates[f]
+        if canonical not in saved:
+            logger.error(f"No predictions for {canonical}, cannot copy them to its duplicate {f}")
+            continue
+        try:
+            predictions_by_model = load_predictions(canonical)
+            save_entities_for_doc(f, ground_truth, predictions_by_model, duplicate_of=canonical)
+            saved.add(f)
+        except Exception as e:
+            logger.exception(f"Error copying predictions of {canonical} to {f}")
+    dedup.write_report(out_file)
+    logger.info(f"Duplicates written to {out_file}")
+
+
+def load_predictions(doc_path: Path) -> dict[str, list[Entity]]:
+    with open(ENTITIES_DIR / f"{doc_path.stem}_entities.json", "r", encoding="utf-8") as f:
+        payload = json.load(f)
+    return {
+        model_name: [Entity(**e) for e in ents]
+        for model_name, ents in payload.items()
+        if model_name not in ("filename", "ground_truth", "duplicate_of")
+    }
+
 
 def save_entities_for_doc(doc_path: Path,
                           ground_truth: list[Entity],
-                          predictions_by_model: dict[str, list[Entity]]) -> None:
+                          predictions_by_model: dict[str, list[Entity]],
+                          duplicate_of: Path = None) -> None:
     doc_id = doc_path.stem
     payload = {
         "filename": doc_path.name,
         "ground_truth": [e.to_dict() for e in ground_truth],
     }
+    if duplicate_of is not None:
+        payload["duplicate_of"] = duplicate_of.name
     for model_name, ents in predictions_by_model.items():
         payload[model_name] = [e.to_dict() for e in ents]
 
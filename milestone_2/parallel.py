@@ -0,0 +1,50 @@
+import multiprocessing
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from pathlib import Path
+from typing import Any, Callable, Optional
+
+
+class DocumentPool:
+    """
+    Runs one task per document in a pool of spawned worker processes, the
+    initializer runs once in every worker (e.g. to load the models).
+    At most max_pending documents are in flight, submit() blocks until a slot
+    is free. Finished documents are returned as (doc_path, result, error).
+    """
+
+    def __init__(self, workers: int, initializer: Callable, initargs: tuple = (),
+                 max_pending: Optional[int] = None):
+        self._executor = ProcessPoolExecutor(
+            max_workers=workers,
+            # fork would copy the prefetch thread's locks into the workers
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=initializer,
+            initargs=initargs,
+        )
+        self._max_pending = max_pending or 2 * workers
+        self._pending: dict[Future, Path] = {}
+
+    def _collect(self, block: bool) -> list[tuple[Path, Any, Optional[BaseException]]]:
+        if not self._pending:
+            return []
+        done, _ = wait(self._pending, timeout=None if block else 0, return_when=FIRST_COMPLETED)
+        finished = []
+        for future in done:
+            doc_path = self._pending.pop(future)
+            error = future.exception()
+            finished.append((doc_path, None if error else future.result(), error))
+        return finished
+
+    def submit(self, doc_path: Path, fn: Callable, *args) -> list[tuple[Path, Any, Optional[BaseException]]]:
+        finished = []
+        while len(self._pending) >= self._max_pending:
+            finished += self._collect(block=True)
+        self._pending[self._executor.submit(fn, *args)] = doc_path
+        return finished + self._collect(block=False)
+
+    def join(self) -> list[tuple[Path, Any, Optional[BaseException]]]:
+        finished = []
+        while self._pending:
+            finished += self._collect(block=True)
+        self._executor.shutdown()
+        return finished
@@ -0,0 +1,73 @@
+import queue
+import threading
+from typing import Callable, Iterable, Iterator, Optional, Tuple, TypeVar
+
+T = TypeVar("T")
+R = TypeVar("R")
+
+_DONE = object()
+
+
+class _Failed:
+    # an error of the items iterator itself, raised in the consumer like without prefetching
+    def __init__(self, error: BaseException):
+        self.error = error
+
+
+def prefetch(items: Iterable[T], load: Callable[[T], R],
+             depth: int = 2) -> Iterator[Tuple[T, Optional[R], Optional[Exception]]]:
+    """
+    Yields (item, load(item), None) in input order, or (item, None, error) if
+    loading failed. A background thread loads up to `depth` items ahead of the
+    consumer, so at most depth + 2 loaded items are alive at any time.
+    depth <= 0 loads in the calling thread.
+    """
+    if depth <= 0:
+        for item in items:
+            try:
+                yield item, load(item), None
+            except Exception as e:
+                yield item, None, e
+        return
+
+    q: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(entry) -> bool:
+        # gives up once the consumer is gone so the thread can't hang on a full queue
+        while not stop.is_set():
+            try:
+                q.put(entry, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker():
+        try:
+            for item in items:
+                try:
+                    entry = (item, load(item), None)
+                except Exception as e:
+                    entry = (item, None, e)
+                if not put(entry):
+                    return
+        except BaseException as e:
+            put(_Failed(e))
+        finally:
+            # the consumer must never wait for an entry that doesn't come
+            put(_DONE)
+
+    thread = threading.Thread(target=worker, name="prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            entry = q.get()
+            if entry is _DONE:
+                break
+            if isinstance(entry, _Failed):
+                raise entry.error
+            yield entry
+    finally:
+        stop.set()
+        thread.join()
@@ -0,0 +1,198 @@
+"""
+Packed corpus store: the sofa texts of all documents in one utf-8 blob
+(texts.bin), their ground truth entities as int32 (begin, end, label code)
+triples (entities.bin) and an index.json with offsets and per-document
+metadata parsed from the NR_*/BR_* file names.
+
+Both blobs are memory-mapped, so reading a document needs no gzip/XML work
+and worker processes share the page cache instead of holding their own copies.
+
+usage:
+  python -m milestone_2.preprocessing_gerparcor.corpus_store pack data/raw_xmi data/corpus_store [--per-chamber 5]
+  python -m milestone_2.preprocessing_gerparcor.corpus_store info data/corpus_store
+"""
+import argparse
+import json
+import logging
+import mmap
+import os
+import re
+from array import array
+from pathlib import Path
+from typing import Optional
+
+from milestone_1.preprocessing.xmi_engine import LABELS
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+logger = logging.getLogger(__name__)
+
+STORE_VERSION = 1
+TEXTS_FILE = "texts.bin"
+ENTITIES_FILE = "entities.bin"
+INDEX_FILE = "index.json"
+
+# NR_102.S_01.10.1920.xmi / BR_1.S_07.09.1949.xmi.gz
+DOC_NAME_RE = re.compile(r"^(NR|BR)_(\d+)\.S_(\d{2})\.(\d{2})\.(\d{4})")
+
+
+def doc_metadata(name: str) -> dict:
+    m = DOC_NAME_RE.match(name)
+    if m is None:
+        return {"chamber": None, "session": None, "date": None}
+    chamber, session, day, month, year = m.groups()
+    return {"chamber": chamber, "session": int(session), "date": f"{year}-{month}-{day}"}
+
+
+def pack(xmi_files: list[Path], store_dir: Path, parser: Optional[XmiParser] = None) -> list[dict]:
+    parser = parser or XmiParser(streaming=True)
+    store_dir.mkdir(parents=True, exist_ok=True)
+
+    # written next to the store and renamed once everything is packed, a failing run keeps the old store
+    tmp = {name: store_dir / f"{name}.tmp{os.getpid()}" for name in (TEXTS_FILE, ENTITIES_FILE, INDEX_FILE)}
+    try:
+        documents = []
+        text_offset = 0
+        entity_offset = 0
+        with tmp[TEXTS_FILE].open("wb") as texts, tmp[ENTITIES_FILE].open("wb") as ents:
+            for xmi_path in xmi_files:
+                try:
+                    layers = parser.layers(xmi_path)
+                except Exception as e:
+                    logger.warning(f"Skipping {xmi_path}, it can not be parsed: {e}")
+                    continue
+                data = layers.text.encode("utf-8")
+                texts.write(data)
+
+                triples = array("i")
+                for b, e, code in zip(layers.entity_begin, layers.entity_end, layers.entity_label):
+                    triples.extend((b, e, code))
+                triples.tofile(ents)
+
+                n_entities = len(layers.entity_begin)
+                documents.append({
+                    "name": xmi_path.name,
+                    "offset": text_offset,
+                    "nbytes": len(data),
+                    "chars": len(layers.text),
+                    "entity_offset": entity_offset,
+                    "entities": n_entities,
+                    **doc_metadata(xmi_path.name),
+                })
+                text_offset += len(data)
+                entity_offset += n_entities
+
+        index = {"version": STORE_VERSION, "labels": list(LABELS), "documents": documents}
+        with tmp[INDEX_FILE].open("w", encoding="utf-8") as f:
+            json.dump(index, f, ensure_ascii=False, indent=2)
+    except BaseException:
+        for path in tmp.values():
+            path.unlink(missing_ok=True)
+        raise
+    # index last, so it never points into blobs of another pack
+    for name in (TEXTS_FILE, ENTITIES_FILE, INDEX_FILE):
+        os.replace(tmp[name], store_dir / name)
+    return documents
+
+
+def _mmap(path: Path):
+    # mmap cannot map empty files
+    if path.stat().st_size == 0:
+        return b""
+    with path.open("rb") as fh:
+        return mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class CorpusStore:
+
+    def __init__(self, store_dir: Path):
+        self.store_dir = Path(store_dir)
+        with (self.store_dir / INDEX_FILE).open("r", encoding="utf-8") as f:
+            index = json.load(f)
+        if index.get("version") != STORE_VERSION:
+            raise ValueError(f"Corpus store {store_dir} has version {index.get('version')}, expected {STORE_VERSION}")
+
+        self.labels = tuple(index["labels"])
+        self.documents = {doc["name"]: doc for doc in index["documents"]}
+        self._texts = _mmap(self.store_dir / TEXTS_FILE)
+        self._entities = _mmap(self.store_dir / ENTITIES_FILE)
+
+    def names(self) -> list[str]:
+        return list(self.documents)
+
+    def metadata(self, name: str) -> dict:
+        return self.documents[name]
+
+    def raw(self, name: str) -> memoryview:
+        # zero-copy view of the utf-8 encoded text
+        doc = self.documents[name]
+        return memoryview(self._texts)[doc["offset"]:doc["offset"] + doc["nbytes"]]
+
+    def text(self, name: str) -> str:
+        return str(self.raw(name), "utf-8")
+
+    def entity_spans(self, name: str) -> list[tuple[int, int, str]]:
+        doc = self.documents[name]
+        triples = array("i")
+        itemsize = triples.itemsize * 3
+        start = doc["entity_offset"] * itemsize
+        triples.frombytes(memoryview(self._entities)[start:start + doc["entities"] * itemsize])
+        return [(triples[i], triples[i + 1], self.labels[triples[i + 2]]) for i in range(0, len(triples), 3)]
+
+    def load(self, doc_path: Path) -> dict:
+        # same result as XmiParser.parse on the packed file
+        name = Path(doc_path).name
+        raw_text = self.text(name)
+        entities = [
+            {"start": b, "end": e, "text": raw_text[b:e], "label": label}
+            for b, e, label in self.entity_spans(name)
+        ]
+        return {"text": raw_text, "entities": entities}
+
+
+def select_files(input_dir: Path, per_chamber: Optional[int] = None) -> list[Path]:
+    files = sorted(p for p in input_dir.iterdir() if p.is_file())
+    if per_chamber is None:
+        return files
+
+    counts: dict = {}
+    selected = []
+    for p in files:
+        chamber = doc_metadata(p.name)["chamber"]
+        if counts.get(chamber, 0) < per_chamber:
+            counts[chamber] = counts.get(chamber, 0) + 1
+            selected.append(p)
+    return selected
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Pack GerParCor XMI files into a memory-mapped corpus store")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+
+    pack_cmd = sub.add_parser("pack")
+    pack_cmd.add_argument("input_dir", type=Path)
+    pack_cmd.add_argument("store_dir", type=Path)
+    pack_cmd.add_argument("--per-chamber", type=int, default=None,
+                          help="only pack the first N documents of each chamber (replaces sample_corpus.sh)")
+
+    info_cmd = sub.add_parser("info")
+    info_cmd.add_argument("store_dir", type=Path)
+
+    args = arg_parser.parse_args()
+
+    if args.command == "pack":
+        files = select_files(args.input_dir, args.per_chamber)
+        documents = pack(files, args.store_dir)
+        print(f"Packed {len(documents)} of {len(files)} documents into {args.store_dir}")
+    else:
+        store = CorpusStore(args.store_dir)
+        chars = sum(doc["chars"] for doc in store.documents.values())
+        by_chamber: dict = {}
+        for doc in store.documents.values():
+            by_chamber[doc["chamber"]] = by_chamber.get(doc["chamber"], 0) + 1
+        print(f"{len(store.documents)} documents, {chars} characters")
+        for chamber, n in sorted(by_chamber.items(), key=lambda x: str(x[0])):
+            print(f"  {chamber}: {n}")
+
+
+if __name__ == "__main__":
+    main()
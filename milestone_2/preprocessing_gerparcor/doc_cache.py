@@ -0,0 +1,131 @@
+import hashlib
+import logging
+import os
+import re
+import shutil
+import struct
+from array import array
+from pathlib import Path
+from typing import Optional
+
+from milestone_1.preprocessing.xmi_engine import XmiLayers
+
+logger = logging.getLogger(__name__)
+
+# magic, parser version, text bytes, tokens, entities
+HEADER = struct.Struct("<4sIQII")
+MAGIC = b"GPDC"
+
+
+class DocCache:
+    """
+    Parsed documents keyed by the sha256 of the (possibly gzipped) file content.
+    Every entry is one binary file: header, utf-8 sofa text and the int32
+    offset arrays of XmiLayers (native byte order, the cache is machine local).
+    Entries live in a v<version> directory, directories of other parser
+    versions are removed on start. The least recently used entries are evicted
+    once the cache grows over max_bytes.
+    """
+
+    def __init__(self, cache_dir: Path, version: int, max_bytes: int = 2 * 2**30):
+        self.cache_dir = Path(cache_dir)
+        self.version = version
+        self.max_bytes = max_bytes
+        self._dir = self.cache_dir / f"v{version}"
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._drop_stale_versions()
+        self._size = sum(p.stat().st_size for p in self._entries())
+
+    def _drop_stale_versions(self):
+        # only v<number> directories, the cache dir may be shared with other data
+        for d in self.cache_dir.iterdir():
+            if d.is_dir() and re.fullmatch(r"v\d+", d.name) and d != self._dir:
+                logger.info(f"Removing parse cache of parser version {d.name[1:]}")
+                shutil.rmtree(d, ignore_errors=True)
+
+    def _entries(self):
+        return self._dir.glob("*/*.bin")
+
+    def _path(self, key: str) -> Path:
+        return self._dir / key[:2] / f"{key}.bin"
+
+    def key(self, xmi_path: Path) -> str:
+        with Path(xmi_path).open("rb") as fh:
+            return hashlib.file_digest(fh, "sha256").hexdigest()
+
+    def get(self, key: str) -> Optional[XmiLayers]:
+        path = self._path(key)
+        try:
+            data = path.read_bytes()
+        except FileNotFoundError:
+            return None
+
+        try:
+            text, arrays = self._decode(data)
+        except (struct.error, ValueError) as e:
+            # truncated or corrupt entry (e.g. a full disk), parse the document again
+            logger.warning(f"Dropping corrupt parse cache entry {path.name}: {e}")
+            self._size -= len(data)
+            path.unlink(missing_ok=True)
+            return None
+        if text is None:
+            return None
+
+        # mtime doubles as last access time for the eviction
+        os.utime(path)
+        return XmiLayers(text, *arrays)
+
+    def _decode(self, data: bytes):
+        magic, version, text_len, n_tokens, n_entities = HEADER.unpack_from(data)
+        if magic != MAGIC or version != self.version:
+            return None, None
+        itemsize = array("i").itemsize
+        expected = HEADER.size + text_len + (2 * n_tokens + 3 * n_entities) * itemsize
+        if len(data) != expected:
+            raise ValueError(f"{len(data)} bytes instead of {expected}")
+
+        pos = HEADER.size
+        text = data[pos:pos + text_len].decode("utf-8")
+        pos += text_len
+
+        arrays = []
+        for n in (n_tokens, n_tokens, n_entities, n_entities, n_entities):
+            a = array("i")
+            a.frombytes(data[pos:pos + n * itemsize])
+            pos += n * itemsize
+            arrays.append(a)
+        return text, arrays
+
+    def put(self, key: str, layers: XmiLayers):
+        path = self._path(key)
+        path.parent.mkdir(exist_ok=True)
+
+        text = layers.text.encode("utf-8")
+        header = HEADER.pack(MAGIC, self.version, len(text), len(layers.token_begin), len(layers.entity_begin))
+        tmp = path.with_suffix(f".tmp{os.getpid()}")
+        with tmp.open("wb") as fh:
+            fh.write(header)
+            fh.write(text)
+            for a in (layers.token_begin, layers.token_end,
+                      layers.entity_begin, layers.entity_end, layers.entity_label):
+                a.tofile(fh)
+        old_size = path.stat().st_size if path.exists() else 0
+        os.replace(tmp, path)
+
+        self._size += path.stat().st_size - old_size
+        if self._size > self.max_bytes:
+            self.evict()
+
+    def evict(self):
+        entries = sorted(self._entries(), key=lambda p: p.stat().st_mtime)
+        for path in entries:
+            if self._size <= self.max_bytes:
+                break
+            size = path.stat().st_size
+            path.unlink(missing_ok=True)
+            self._size -= size
+
+    def clear(self):
+        shutil.rmtree(self._dir, ignore_errors=True)
+        self._dir.mkdir(parents=True, exist_ok=True)
+        self._size = 0
@@ -0,0 +1,105 @@
+"""
+Reads GerParCor documents straight from the downloaded Bundesrat.tar /
+Nationalrat.tar archives, including their inner .gz files, without
+extracting anything to disk. Members get the same NR_*/BR_* names that
+download_corpus.sh gives the extracted files (without the .gz suffix).
+"""
+import logging
+import re
+import tarfile
+from pathlib import Path
+from typing import Iterator, Optional
+
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+logger = logging.getLogger(__name__)
+
+# nationalrat: 01.02.1938_29._Sitzung.xmi(.gz)
+NR_RE = re.compile(r"^([0-9]{2}\.[0-9]{2}\.[0-9]{4})_([0-9]+)\._Sitzung")
+# bundesrat: Plenarprotokoll_2._Sitzung,_12.09.1949.xmi(.gz)
+BR_RE = re.compile(r"^Plenarprotokoll_([0-9]+)\._Sitzung,_([0-9]{2}\.[0-9]{2}\.[0-9]{4})")
+
+
+def logical_name(member_name: str) -> str:
+    # same renaming as download_corpus.sh
+    stem = Path(member_name).name
+    if stem.endswith(".gz"):
+        stem = stem[:-len(".gz")]
+
+    # remove duplicate extensions, normalize to single .xmi
+    clean = stem
+    for _ in range(2):
+        if clean.endswith(".xmi"):
+            clean = clean[:-len(".xmi")]
+    clean = f"{clean}.xmi"
+
+    m = NR_RE.match(clean)
+    if m:
+        date, session = m.groups()
+        return f"NR_{session}.S_{date}.xmi"
+
+    m = BR_RE.match(clean)
+    if m:
+        session, date = m.groups()
+        return f"BR_{session}.S_{date}.xmi"
+
+    return clean
+
+
+class TarCorpus:
+
+    def __init__(self, archives: list[Path], parser: Optional[XmiParser] = None):
+        self.archives = [Path(a) for a in archives]
+        self.parser = parser or XmiParser(streaming=True)
+        self._members: Optional[dict[str, tuple[Path, tarfile.TarInfo]]] = None
+        self._open: dict[Path, tarfile.TarFile] = {}
+
+    def __getstate__(self):
+        # open archives are not picklable, every process opens its own
+        state = self.__dict__.copy()
+        state["_open"] = {}
+        return state
+
+    def _tar(self, archive: Path) -> tarfile.TarFile:
+        if archive not in self._open:
+            self._open[archive] = tarfile.open(archive, "r:*")
+        return self._open[archive]
+
+    def _index(self) -> dict[str, tuple[Path, tarfile.TarInfo]]:
+        if self._members is None:
+            self._members = {}
+            for archive in self.archives:
+                for member in self._tar(archive).getmembers():
+                    if not member.isfile():
+                        continue
+                    name = logical_name(member.name)
+                    if name in self._members:
+                        # download_corpus.sh would overwrite the earlier file, the later one wins here too
+                        logger.warning(f"{member.name} in {archive} replaces {self._members[name][1].name} as {name}")
+                    self._members[name] = (archive, member)
+        return self._members
+
+    def names(self) -> list[str]:
+        return list(self._index())
+
+    def member(self, name: str) -> tarfile.TarInfo:
+        return self._index()[name][1]
+
+    def open(self, name: str):
+        archive, member = self._index()[name]
+        return self._tar(archive).extractfile(member)
+
+    def load(self, doc_path: Path) -> dict:
+        # same result as XmiParser.parse on the extracted and renamed file
+        with self.open(Path(doc_path).name) as fh:
+            return self.parser.parse(fh)
+
+    def iter_documents(self) -> Iterator[tuple[str, dict]]:
+        # sequential pass in archive order, only reads forward through the archives
+        for name in self.names():
+            yield name, self.load(Path(name))
+
+    def close(self):
+        for tf in self._open.values():
+            tf.close()
+        self._open = {}
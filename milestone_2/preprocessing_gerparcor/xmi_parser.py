@@ -1,67 +1,38 @@
-import gzip
-import xml.etree.ElementTree as ET
 from pathlib import Path
+from typing import Optional
 
-# namespace in corpus
-NS = {
-    "cas": "http:///uima/cas.ecore",
-    "token": "http:///org/texttechnologylab/annotation/token.ecore",
-    "ner": "http:///de/tudarmstadt/ukp/dkpro/core/api/ner/type.ecore",
-}
+from milestone_1.preprocessing.xmi_engine import extract_layers
+from milestone_2.preprocessing_gerparcor.doc_cache import DocCache
 
-VALID_NER = {"PER": "PER", "ORG": "ORG", "LOC": "LOC"}
+# bump whenever the output of parse() changes, invalidates DocCache entries
+PARSER_VERSION = 1
 
 class XmiParser:
 
-    def __init__(self):
-        return
+    def __init__(self, streaming: bool = False, cache: Optional[DocCache] = None):
+        # streaming=True reads the document with iterparse in a single pass and
+        # drops every element once it has been inspected
+        self.streaming = streaming
+        self.cache = cache
 
-    def _ns(self, tag, prefix):
-        return f".//{{{NS[prefix]}}}{tag}"
+    def layers(self, xmi_path: Path):
+        # open file objects (tar members) are not cached, their content has no path to hash
+        if self.cache is None or hasattr(xmi_path, "read"):
+            return extract_layers(xmi_path, tokens=False, streaming=self.streaming)
 
-    def _parse_tree(self, xmi_path: Path) -> ET.ElementTree:
-        with xmi_path.open("rb") as fh:
-            magic = fh.read(2)
-            fh.seek(0)
-            if magic == b"\x1f\x8b":
-                with gzip.open(fh, "rb") as gfh:
-                    return ET.parse(gfh)
-            else:
-                return ET.parse(fh)
+        key = self.cache.key(xmi_path)
+        layers = self.cache.get(key)
+        if layers is None:
+            layers = extract_layers(xmi_path, tokens=False, streaming=self.streaming)
+            self.cache.put(key, layers)
+        return layers
 
     def parse(self, xmi_path: Path):
-        tree = self._parse_tree(xmi_path)
-        root = tree.getroot()
-
-        # raw text
-        sofa_elem = None
-        for s in root.findall(".//"):
-            if s.tag.endswith("Sofa") and "sofaString" in s.attrib:
-                sofa_elem = s
-                break
-        if sofa_elem is None:
-            sofa_elem = root.find(self._ns("Sofa", "cas"))
-        if sofa_elem is None or "sofaString" not in sofa_elem.attrib:
-            raise ValueError(f"No sofaString found in {xmi_path}")
-        raw_text = sofa_elem.attrib["sofaString"]
-
-        # NER
-        entities = []
-        for ne in root.findall(self._ns("NamedEntity", "ner")):
-            try:
-                b, e = int(ne.attrib["begin"]), int(ne.attrib["end"])
-            except KeyError:
-                continue
-            val = ne.attrib.get("value", "").strip().upper()
-            if val in VALID_NER:
-                entities.append({"start": b, "end": e, "text": raw_text[b:e], "label": VALID_NER[val]})
-        if not entities:
-            for elem in root.findall(".//"):
-                if elem.tag.endswith("NamedEntity") and "begin" in elem.attrib:
-                    b, e = int(elem.attrib["begin"]), int(elem.attrib["end"])
-                    val = elem.attrib.get("value", "").strip().upper()
-                    if val in VALID_NER:
-                        entities.append({"start": b, "end": e, "text": raw_text[b:e], "label": VALID_NER[val]})
-
+        layers = self.layers(xmi_path)
+        raw_text = layers.text
 
+        entities = [
+            {"start": b, "end": e, "text": raw_text[b:e], "label": label}
+            for b, e, label in layers.entities()
+        ]
         return {"text": raw_text, "entities": entities}
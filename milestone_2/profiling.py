@@ -0,0 +1,147 @@
+"""
+Profiling hook for the pipeline stages (parse, a model, save, evaluate).
+
+Selected stages are profiled for a sampled subset of the documents, the
+sample is a stable hash of the file name so a document is either profiled in
+every stage or in none. For every stage two files are written to the
+profile directory:
+  <stage>.prof       cProfile stats (snakeviz, python -m pstats)
+  <stage>.collapsed  stack samples in collapsed format (flamegraph.pl, speedscope)
+
+Switched on with --profile in ner_pipeline or with environment variables
+(also read by evaluate_results):
+  NER_PROFILE=flair,save NER_PROFILE_SAMPLE=0.1 NER_PROFILE_DIR=milestone_2/results/profiles
+"""
+import cProfile
+import hashlib
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager, nullcontext
+from pathlib import Path
+from typing import Callable, Optional
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = Path("milestone_2/results/profiles")
+
+
+def parse_stages(spec: Optional[str]) -> set[str]:
+    return {stage.strip() for stage in (spec or "").split(",") if stage.strip()}
+
+
+def sampled(doc_name: str, rate: float) -> bool:
+    digest = hashlib.blake2b(doc_name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") < rate * 2**64
+
+
+class _StackSampler:
+    # samples the stack of the profiled thread from a background thread
+
+    def __init__(self, interval: float):
+        self.interval = interval
+        self.counts: dict[str, Counter] = {}
+        self._target = None
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="stack-sampler", daemon=True)
+        self._thread.start()
+
+    def begin(self, stage: str):
+        self._target = (stage, threading.get_ident())
+        self._wake.set()
+
+    def end(self):
+        self._target = None
+        self._wake.clear()
+
+    def _run(self):
+        while True:
+            self._wake.wait()
+            target = self._target
+            if target is None:
+                continue
+            stage, ident = target
+            frame = sys._current_frames().get(ident)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f"{Path(code.co_filename).name}:{code.co_name}")
+                frame = frame.f_back
+            if stack:
+                self.counts.setdefault(stage, Counter())[";".join(reversed(stack))] += 1
+            time.sleep(self.interval)
+
+
+class StageProfiler:
+    """
+    Only one stage can be profiled at a time (cProfile hooks are process
+    wide from Python 3.12), so the pipeline runs without prefetching or
+    parallel workers while profiling.
+    """
+
+    def __init__(self, stages: set[str], sample: float = 1.0, out_dir: Path = PROFILE_DIR,
+                 interval: float = 0.005):
+        self.stages = stages
+        self.sample = sample
+        self.out_dir = Path(out_dir)
+        self.doc_name: Optional[str] = None
+        self._profiles: dict[str, cProfile.Profile] = {}
+        self._sampler = _StackSampler(interval)
+
+    @classmethod
+    def configure(cls, stages: Optional[set[str]] = None, sample: Optional[float] = None,
+                  out_dir: Optional[Path] = None) -> Optional["StageProfiler"]:
+        # arguments that are None fall back to the NER_PROFILE* environment variables
+        stages = stages or parse_stages(os.environ.get("NER_PROFILE"))
+        if not stages:
+            return None
+        if sample is None:
+            sample = float(os.environ.get("NER_PROFILE_SAMPLE", "1.0"))
+        if out_dir is None:
+            out_dir = Path(os.environ.get("NER_PROFILE_DIR", PROFILE_DIR))
+        return cls(stages, sample, out_dir)
+
+    @contextmanager
+    def profile(self, stage: str, doc_name: str):
+        if stage not in self.stages or not sampled(doc_name, self.sample):
+            yield
+            return
+        profile = self._profiles.setdefault(stage, cProfile.Profile())
+        self._sampler.begin(stage)
+        profile.enable()
+        try:
+            yield
+        finally:
+            profile.disable()
+            self._sampler.end()
+
+    def wrap_load(self, load: Callable[[Path], dict]) -> Callable[[Path], dict]:
+        def profiled_load(doc_path):
+            with self.profile("parse", Path(doc_path).name):
+                return load(doc_path)
+        return profiled_load
+
+    def wrap_models(self, models: dict[str, Callable]) -> dict[str, Callable]:
+        # annotator calls are attributed to self.doc_name
+        def wrap(model_name, annotator):
+            def profiled_annotate(text):
+                with self.profile(model_name, self.doc_name):
+                    return annotator(text)
+            return profiled_annotate
+        return {model_name: wrap(model_name, annotator) for model_name, annotator in models.items()}
+
+    def dump(self):
+        self.out_dir.mkdir(parents=True, exist_ok=True)
+        for stage, profile in self._profiles.items():
+            profile.dump_stats(self.out_dir / f"{stage}.prof")
+            with (self.out_dir / f"{stage}.collapsed").open("w", encoding="utf-8") as f:
+                for stack, count in self._sampler.counts.get(stage, Counter()).most_common():
+                    f.write(f"{stack} {count}\n")
+            logger.info(f"Profile of {stage} written to {self.out_dir / stage}.prof/.collapsed")
+
+
+def profiled(profiler: Optional[StageProfiler], stage: str, doc_name: str):
+    return nullcontext() if profiler is None else profiler.profile(stage, doc_name)
@@ -1,3 +1,5 @@
+import hashlib
+import json
 from dataclasses import dataclass
 from pathlib import Path
 from typing import List, Dict, Set, Tuple, Optional, Any
@@ -10,30 +12,124 @@ from spacy.tokens import Doc
 
 from ..entities import Entity
 
+BASE_MODEL = "de_core_news_sm"
+
 
 class RuleBasedNER:
 
-    def __init__(self, geonames_dir: Path, verbose: bool = False):
+    # parliament API response of this process, the fingerprint and the rules use the same list
+    _fetched_persons: Optional[Set[str]] = None
+
+    def __init__(self, geonames_dir: Path, verbose: bool = False, model_dir: Optional[Path] = None,
+                 persons_file: Optional[Path] = None):
         self._verbose = verbose
         self.geonames_dir = geonames_dir
+        self.model_dir = Path(model_dir) if model_dir is not None else None
+        # parliament persons to use instead of the bundle / the API, see pin_parliament_persons
+        self.persons_file = Path(persons_file) if persons_file is not None else None
         self.gazetteers = self._build_gazetteers()
         self.nlp = self._build_nlp()
 
-    def _fetch_parliament_persons(self) -> Set[str]:
+    @staticmethod
+    def fingerprint(geonames_dir: Path, model_dir: Optional[Path] = None, persons_file: Optional[Path] = None) -> str:
+        # rules (this file), gazetteer files, parliament persons and base model, without building the pipeline
+        h = hashlib.blake2b(Path(__file__).read_bytes(), digest_size=8)
+        if geonames_dir.is_dir():
+            for p in sorted(geonames_dir.iterdir()):
+                h.update(f"{p.name}:{p.stat().st_size};".encode("utf-8"))
+                h.update(p.read_bytes())
+        persons_file = RuleBasedNER._persons_source(model_dir, persons_file)
+        if persons_file is not None:
+            with persons_file.open("r", encoding="utf-8") as f:
+                persons = set(json.load(f))
+        else:
+            # the same list as the rules of this process, other processes fetch their own (see pin_parliament_persons)
+            persons = RuleBasedNER._fetch_parliament_persons()
+        h.update(json.dumps(sorted(persons), ensure_ascii=False).encode("utf-8"))
+        return f"rules={h.hexdigest()} {BASE_MODEL} spacy={spacy.__version__}"
+
+    @staticmethod
+    def _base_model_dir(model_dir: Path) -> Path:
+        return Path(model_dir) / "spacy" / BASE_MODEL
+
+    @staticmethod
+    def _persons_file(model_dir: Path) -> Path:
+        return Path(model_dir) / "rule_based" / "parliament_persons.json"
+
+    @staticmethod
+    def _persons_source(model_dir: Optional[Path], persons_file: Optional[Path]) -> Optional[Path]:
+        # file the parliament persons are read from, None if they have to be fetched
+        if persons_file is not None:
+            return Path(persons_file)
+        if model_dir is not None and RuleBasedNER._persons_file(model_dir).exists():
+            return RuleBasedNER._persons_file(model_dir)
+        return None
+
+    @staticmethod
+    def pin_parliament_persons(model_dir: Optional[Path], out_file: Path) -> Path:
+        # the persons list of a run: the one of the bundle, or fetched once into out_file. Passed as persons_file
+        # to the fingerprint and to every instance, so the predictions are made with the fingerprinted list
+        persons_file = RuleBasedNER._persons_source(model_dir, None)
+        if persons_file is not None:
+            return persons_file
+        persons = RuleBasedNER._fetch_parliament_persons()
+        out_file = Path(out_file)
+        out_file.parent.mkdir(parents=True, exist_ok=True)
+        with out_file.open("w", encoding="utf-8") as f:
+            json.dump(sorted(persons), f, ensure_ascii=False, indent=2)
+        return out_file
+
+    @staticmethod
+    def populate(model_dir: Path, geonames_dir: Path) -> Path:
+        # base model and parliament persons, so the rules can be built without network
+        base_model_dir = RuleBasedNER._base_model_dir(model_dir)
+        base_model_dir.parent.mkdir(parents=True, exist_ok=True)
+        spacy.load(BASE_MODEL).to_disk(base_model_dir)
+        persons_file = RuleBasedNER._persons_file(model_dir)
+        persons_file.unlink(missing_ok=True)
+        # building it once fetches the persons into the bundle and checks that the bundle loads
+        RuleBasedNER(geonames_dir, model_dir=model_dir)
+        return persons_file.parent
+
+    def _load_parliament_persons(self) -> Set[str]:
+        # read from persons_file or the model bundle, fetched (and stored there) if it's not available yet
+        if self.persons_file is not None:
+            with self.persons_file.open("r", encoding="utf-8") as f:
+                return set(json.load(f))
+        if self.model_dir is None:
+            return self._fetch_parliament_persons(self._verbose)
+        persons_file = self._persons_file(self.model_dir)
+        if persons_file.exists():
+            with persons_file.open("r", encoding="utf-8") as f:
+                return set(json.load(f))
+        persons = self._fetch_parliament_persons(self._verbose)
+        persons_file.parent.mkdir(parents=True, exist_ok=True)
+        with persons_file.open("w", encoding="utf-8") as f:
+            json.dump(sorted(persons), f, ensure_ascii=False, indent=2)
+        return persons
+
+    @classmethod
+    def _fetch_parliament_persons(cls, verbose: bool = False) -> Set[str]:
+        # fetched once per process
+        if cls._fetched_persons is not None:
+            return set(cls._fetched_persons)
+
         url = "https://www.parlament.gv.at/Filter/api/filter/data/409?1=1&showAll=true"
 
-        if self._verbose:
+        if verbose:
             print("RULEBASED_NER: fetching parliament persons...")
 
         resp = requests.get(url, timeout=60)
         resp.raise_for_status()
         data = resp.json()
 
-        persons = self._parse_parliament_persons_from_json(data)
+        persons = cls._parse_parliament_persons_from_json(data)
+        RuleBasedNER._fetched_persons = persons
 
-        return persons
+        return set(persons)
 
-    def _parse_parliament_persons_from_json(self, data: Dict[str, Any]) -> Set[str]:
+    @staticmethod
+    def _parse_parliament_persons_from_json(data: Dict[str, Any]) -> Set[str]:
         persons: Set[str] = set()
 
         headers: List[Dict[str, Any]] = data.get("header", [])
@@ -200,7 +296,6 @@ class RuleBasedNER:
         return result
 
 
-    #TODO: store and load if already available
     #TODO: fix issue where normal words are tagged as person or locations
     def _build_gazetteers(self):
         if self._verbose:
@@ -210,7 +305,7 @@ class RuleBasedNER:
         locs: Set[str] = set()
         orgs: Set[str] = set()
 
-        parliament_persons = self._fetch_parliament_persons()
+        parliament_persons = self._load_parliament_persons()
 
         if self._verbose:
             print(f"RULEBASED_NER: fetched {len(parliament_persons)} parliament person entries")
@@ -303,7 +398,11 @@ class RuleBasedNER:
         if self._verbose:
             print("RULEBASED_NER: building spaCy pipeline")
 
-        nlp = spacy.load("de_core_news_sm")
+        base_model = BASE_MODEL
+        if self.model_dir is not None and self._base_model_dir(self.model_dir).is_dir():
+            base_model = str(self._base_model_dir(self.model_dir))
+        self.loaded_from = base_model
+        nlp = spacy.load(base_model)
 
         if "ner" in nlp.pipe_names:
             nlp.remove_pipe("ner")
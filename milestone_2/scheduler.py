@@ -0,0 +1,118 @@
+import heapq
+import json
+import logging
+import time
+from pathlib import Path
+from typing import Callable, Iterable, Optional
+
+logger = logging.getLogger(__name__)
+
+# rough size ratio of gzipped XMI, only has to rank .gz files against plain ones
+GZIP_RATIO = 8
+
+
+def xmi_cost(size: int, gzipped: bool) -> float:
+    return size * GZIP_RATIO if gzipped else size
+
+
+def file_cost(xmi_path: Path) -> float:
+    with Path(xmi_path).open("rb") as fh:
+        gzipped = fh.read(2) == b"\x1f\x8b"
+    return xmi_cost(xmi_path.stat().st_size, gzipped)
+
+
+def lpt_makespan(costs: list[float], slots: int) -> float:
+    # greedy list scheduling in the given order, every job goes to the least loaded slot
+    loads = [0.0] * max(1, slots)
+    for cost in costs:
+        heapq.heapreplace(loads, loads[0] + cost)
+    return max(loads)
+
+
+class LptScheduler:
+    """
+    Orders the documents largest first (longest processing time first), so
+    no huge document is left for the end while the other workers are idle.
+    The cost of a document is its size in some unit (sofa characters from the
+    corpus store, estimated XMI bytes otherwise). The seconds per unit of the
+    last run are kept in calibration_file to predict the makespan in seconds.
+    Documents that are expected to be skipped (up to date or duplicates) are
+    ordered too, but left out of the prediction.
+    """
+
+    def __init__(self, slots: int, unit: str, calibration_file: Path):
+        self.slots = max(1, slots)
+        self.unit = unit
+        self.calibration_file = Path(calibration_file)
+        self.costs: dict[Path, float] = {}
+        self._seconds_per_unit = self._load_calibration()
+        self._busy = 0.0
+        self._busy_cost = 0.0
+        self._done: list[float] = []
+        self._start = self._end = None
+
+    def _load_calibration(self) -> Optional[float]:
+        try:
+            with self.calibration_file.open("r", encoding="utf-8") as f:
+                return json.load(f).get(self.unit)
+        except (OSError, ValueError):
+            return None
+
+    def order(self, files: list[Path], cost: Callable[[Path], float], skips: Iterable[Path] = ()) -> list[Path]:
+        for f in files:
+            try:
+                self.costs[f] = cost(f)
+            except Exception:
+                logger.warning(f"No size estimate for {f}, scheduling it last")
+                self.costs[f] = 0.0
+        # stable sort, equal sizes keep their (name) order
+        ordered = sorted(files, key=lambda f: self.costs[f], reverse=True)
+
+        skips = set(skips)
+        annotated = [f for f in ordered if f not in skips]
+        predicted = lpt_makespan([self.costs[f] for f in annotated], self.slots)
+        message = (f"LPT schedule of {len(annotated)} documents to annotate ({len(files) - len(annotated)} expected "
+                   f"to be up to date or duplicates) on {self.slots} slots: predicted makespan {predicted:.0f} {self.unit}")
+        if self._seconds_per_unit:
+            message += f" = {predicted * self._seconds_per_unit:.1f}s"
+        logger.info(message)
+
+        self._start = time.perf_counter()
+        return ordered
+
+    def done(self, doc_path: Path, seconds: Optional[float] = None):
+        cost = self.costs.get(doc_path, 0.0)
+        self._done.append(cost)
+        if seconds is not None:
+            self._busy += seconds
+            self._busy_cost += cost
+        self._end = time.perf_counter()
+
+    def report(self):
+        done_cost = sum(self._done)
+        if self._start is None or self._end is None or not done_cost:
+            return
+        actual = self._end - self._start
+
+        if self._busy_cost:
+            seconds_per_unit = self._busy / self._busy_cost
+        else:
+            # no per-document times, assume all slots were busy the whole run
+            seconds_per_unit = actual * self.slots / done_cost
+        if self._seconds_per_unit:
+            # the calibration of the previous run, on the documents that were annotated in this one
+            predicted = lpt_makespan(sorted(self._done, reverse=True), self.slots) * self._seconds_per_unit
+            logger.info(f"Makespan {actual:.1f}s, predicted with the previous calibration {predicted:.1f}s "
+                        f"({(predicted - actual) / actual:+.0%})")
+        else:
+            logger.info(f"Makespan {actual:.1f}s, no calibration of an earlier run to compare with")
+
+        calibration = {}
+        try:
+            with self.calibration_file.open("r", encoding="utf-8") as f:
+                calibration = json.load(f)
+        except (OSError, ValueError):
+            pass
+        calibration[self.unit] = seconds_per_unit
+        with self.calibration_file.open("w", encoding="utf-8") as f:
+            json.dump(calibration, f, indent=2)
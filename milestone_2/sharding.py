@@ -0,0 +1,196 @@
+"""
+Deterministic sharding of one annotation run across several machines.
+
+Every document is assigned to a shard by a hash of its file name, so all
+machines agree on the assignment without talking to each other:
+
+  python -m milestone_2.ner_pipeline --shard 0/4    (on machine 1, ... 3/4 on machine 4)
+
+Each shard writes its entities files as usual plus a shard report in
+milestone_2/results/shards. Once the results directories of all machines are
+copied together, merge checks that every shard is there and complete and
+that all of them ran with the same models on the same corpus:
+
+  python -m milestone_2.sharding merge [--shards N] [--evaluate]
+
+Only the reports of the N-way split are merged, reports left from a run with
+another number of shards are ignored. Without --shards the split is taken from
+the reports, if they are all of the same one.
+"""
+import argparse
+import hashlib
+import json
+import re
+import sys
+from pathlib import Path
+
+RESULTS_DIR = Path("milestone_2/results")
+ENTITIES_DIR = RESULTS_DIR / "entities"
+SHARDS_DIR = RESULTS_DIR / "shards"
+DUPLICATES_JSON = RESULTS_DIR / "duplicates.json"
+
+
+def parse_shard(spec: str) -> tuple[int, int]:
+    # "1/4" -> (1, 4), shards are numbered from 0
+    try:
+        index, count = (int(x) for x in spec.split("/"))
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Shard must look like i/N, got {spec!r}")
+    if count < 1 or not 0 <= index < count:
+        raise argparse.ArgumentTypeError(f"Shard index must be in 0..N-1, got {spec!r}")
+    return index, count
+
+
+def shard_of(name: str, count: int) -> int:
+    # stable across machines and Python processes, unlike hash()
+    digest = hashlib.blake2b(name.encode("utf-8"), digest_size=8).digest()
+    return int.from_bytes(digest, "big") % count
+
+
+def select_shard(files: list[Path], index: int, count: int) -> list[Path]:
+    return [f for f in files if shard_of(f.name, count) == index]
+
+
+def corpus_digest(files: list[Path]) -> str:
+    h = hashlib.blake2b(digest_size=16)
+    for name in sorted(f.name for f in files):
+        h.update(name.encode("utf-8") + b"\0")
+    return h.hexdigest()
+
+
+def shard_file(kind: str, index: int, count: int, suffix: str = ".json") -> Path:
+    return SHARDS_DIR / f"{kind}_{index}_of_{count}{suffix}"
+
+
+def write_shard_report(index: int, count: int, corpus: list[Path], assigned: list[Path],
+                       saved: set[Path], fingerprints: dict[str, str]) -> Path:
+    SHARDS_DIR.mkdir(parents=True, exist_ok=True)
+    report = {
+        "shard": index,
+        "shards": count,
+        "corpus_size": len(corpus),
+        "corpus_digest": corpus_digest(corpus),
+        "fingerprints": fingerprints,
+        "documents": sorted(f.name for f in assigned),
+        "failed": sorted(f.name for f in assigned if f not in saved),
+    }
+    out_file = shard_file("shard", index, count)
+    with out_file.open("w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    return out_file
+
+
+def report_counts() -> list[int]:
+    # numbers of shards of the reports in SHARDS_DIR
+    counts = set()
+    for path in SHARDS_DIR.glob("shard_*_of_*.json"):
+        m = re.fullmatch(r"shard_\d+_of_(\d+)\.json", path.name)
+        if m:
+            counts.add(int(m.group(1)))
+    return sorted(counts)
+
+
+def read_reports(count: int) -> list[dict]:
+    reports = []
+    for index in range(count):
+        path = shard_file("shard", index, count)
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                reports.append(json.load(f))
+    return reports
+
+
+def check_shards(reports: list[dict]) -> list[str]:
+    if not reports:
+        return [f"No shard reports in {SHARDS_DIR}"]
+
+    problems = []
+    counts = {r["shards"] for r in reports}
+    if len(counts) > 1:
+        return [f"Shard reports of different splits: {sorted(counts)} shards"]
+    count = counts.pop()
+
+    by_index = {r["shard"]: r for r in reports}
+    missing = [i for i in range(count) if i not in by_index]
+    if missing:
+        problems.append(f"Missing shards {missing} of {count}")
+
+    first = reports[0]
+    for r in reports[1:]:
+        if r["corpus_digest"] != first["corpus_digest"]:
+            problems.append(f"Shard {r['shard']} ran on a different corpus than shard {first['shard']}")
+        if r["fingerprints"] != first["fingerprints"]:
+            problems.append(f"Shard {r['shard']} ran other models than shard {first['shard']}: "
+                            f"{r['fingerprints']} != {first['fingerprints']}")
+
+    seen: dict[str, int] = {}
+    failed = set()
+    for r in reports:
+        for name in r["documents"]:
+            if shard_of(name, count) != r["shard"]:
+                problems.append(f"{name} does not belong to shard {r['shard']}")
+            if name in seen:
+                problems.append(f"{name} is in shard {seen[name]} and {r['shard']}")
+            seen[name] = r["shard"]
+        for name in r["failed"]:
+            problems.append(f"{name} failed in shard {r['shard']}")
+            failed.add(name)
+
+    if not missing and len(seen) != first["corpus_size"]:
+        problems.append(f"Shards cover {len(seen)} of {first['corpus_size']} documents")
+
+    for name in seen:
+        if name not in failed and not (ENTITIES_DIR / f"{Path(name).stem}_entities.json").exists():
+            problems.append(f"No entities file for {name}")
+
+    return problems
+
+
+def merge_duplicates(count: int):
+    merged = {}
+    for index in range(count):
+        path = shard_file("duplicates", index, count)
+        if path.exists():
+            with path.open("r", encoding="utf-8") as f:
+                merged.update(json.load(f))
+    with DUPLICATES_JSON.open("w", encoding="utf-8") as f:
+        json.dump(merged, f, ensure_ascii=False, indent=2)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(description="Check and merge the results of a sharded NER run")
+    sub = arg_parser.add_subparsers(dest="command", required=True)
+    merge_cmd = sub.add_parser("merge")
+    merge_cmd.add_argument("--shards", type=int, default=None,
+                           help="number of shards of the run (default: the one of the shard reports)")
+    merge_cmd.add_argument("--evaluate", action="store_true",
+                           help="run evaluate_results once all shards are complete")
+    args = arg_parser.parse_args()
+
+    count = args.shards
+    if count is None:
+        counts = report_counts()
+        if len(counts) > 1:
+            print(f"Shard reports of different splits: {counts} shards, choose one with --shards", file=sys.stderr)
+            sys.exit(1)
+        count = counts[0] if counts else 1
+    elif count < 1:
+        arg_parser.error(f"--shards must be at least 1, got {count}")
+
+    reports = read_reports(count)
+    problems = check_shards(reports)
+    if problems:
+        for problem in problems:
+            print(problem, file=sys.stderr)
+        sys.exit(1)
+
+    merge_duplicates(count)
+    print(f"All {count} shards complete, {reports[0]['corpus_size']} documents")
+
+    if args.evaluate:
+        from milestone_2 import evaluate_results
+        evaluate_results.main()
+
+
+if __name__ == "__main__":
+    main()
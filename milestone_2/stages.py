@@ -0,0 +1,151 @@
+import logging
+import queue
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Optional
+
+from milestone_2.entities import Entity
+from milestone_2.metrics import DocStats
+
+logger = logging.getLogger(__name__)
+
+_STOP = object()
+
+
+def parse_stage_workers(spec: Optional[str], model_names) -> dict[str, int]:
+    # "flair=3,spacy=1" -> {"flair": 3, "spacy": 1, "rule_based": 1}
+    concurrency = {name: 1 for name in model_names}
+    if not spec:
+        return concurrency
+    for part in spec.split(","):
+        name, _, n = part.partition("=")
+        name = name.strip()
+        if name not in concurrency:
+            raise ValueError(f"Unknown model in stage workers: {name}")
+        concurrency[name] = int(n)
+    return concurrency
+
+
+class _Pending:
+
+    def __init__(self, doc_path: Path, ground_truth: list[Entity], model_names):
+        self.doc_path = doc_path
+        self.ground_truth = ground_truth
+        self.remaining = set(model_names)
+        self.predictions: dict[str, list[Entity]] = {}
+        self.errors: dict[str, BaseException] = {}
+        self.stats = DocStats()
+
+
+class StagedAnnotator:
+    """
+    Runs every model as its own stage: a bounded queue of parsed documents and
+    a configurable number of worker threads per model. The models are not
+    thread safe, so every further thread of a stage gets its own instance from
+    replicate(model_name); without replicate a stage has a single thread.
+    A document's predictions are joined once all stages are done with it.
+    Finished documents are returned by submit() and join() as
+    (doc_path, ground_truth, predictions_by_model, stats, errors_by_model),
+    so they are handled in the submitting thread.
+    At most max_in_flight documents are held, submit() blocks beyond that.
+    """
+
+    def __init__(self, models: dict[str, Callable[[str], list[Entity]]], concurrency: dict[str, int],
+                 replicate: Optional[Callable[[str], Callable[[str], list[Entity]]]] = None,
+                 max_in_flight: int = 4):
+        self.models = models
+        self._replicate = replicate
+        self._slots = threading.Semaphore(max_in_flight)
+        self._lock = threading.Lock()
+        self._pending: dict[int, _Pending] = {}
+        self._next_id = 0
+        self._finished: queue.Queue = queue.Queue()
+
+        self._queues: dict[str, queue.Queue] = {}
+        self._threads: list[threading.Thread] = []
+        for model_name in models:
+            q: queue.Queue = queue.Queue(maxsize=max_in_flight)
+            self._queues[model_name] = q
+            threads = max(1, concurrency.get(model_name, 1))
+            if threads > 1 and replicate is None:
+                logger.warning(f"{model_name} can not be shared between threads, running its stage with 1 thread")
+                threads = 1
+            for i in range(threads):
+                t = threading.Thread(target=self._run_stage, args=(model_name, q, i),
+                                     name=f"stage-{model_name}-{i}", daemon=True)
+                t.start()
+                self._threads.append(t)
+
+    def submit(self, doc_path: Path, plain_text: str, ground_truth: list[Entity], model_names=None) -> list[tuple]:
+        # model_names restricts the document to some of the stages
+        model_names = [m for m in self.models if model_names is None or m in model_names]
+        self._slots.acquire()
+        with self._lock:
+            doc_id = self._next_id
+            self._next_id += 1
+            self._pending[doc_id] = _Pending(doc_path, ground_truth, model_names)
+        for model_name in model_names:
+            self._queues[model_name].put((doc_id, plain_text))
+        return self._collect()
+
+    def _collect(self) -> list[tuple]:
+        finished = []
+        while True:
+            try:
+                finished.append(self._finished.get_nowait())
+            except queue.Empty:
+                return finished
+
+    def _run_stage(self, model_name: str, q: queue.Queue, index: int):
+        if index == 0:
+            annotator = self.models[model_name]
+        else:
+            try:
+                annotator = self._replicate(model_name)
+            except Exception:
+                # the other threads of the stage keep going
+                logger.exception(f"Could not load another {model_name} instance for {threading.current_thread().name}")
+                return
+        while True:
+            item = q.get()
+            if item is _STOP:
+                return
+            doc_id, plain_text = item
+            start = time.perf_counter()
+            try:
+                preds, error = annotator(plain_text), None
+            except Exception as e:
+                preds, error = None, e
+            self._finish(doc_id, model_name, preds, error, time.perf_counter() - start)
+
+    def _finish(self, doc_id: int, model_name: str, preds, error, seconds: float):
+        with self._lock:
+            pending = self._pending[doc_id]
+            if error is not None:
+                pending.errors[model_name] = error
+            else:
+                pending.predictions[model_name] = preds
+                pending.stats.model_s[model_name] = seconds
+                pending.stats.model_entities[model_name] = len(preds)
+            pending.remaining.discard(model_name)
+            if pending.remaining:
+                return
+            del self._pending[doc_id]
+
+        # same model order as the serial pipeline
+        predictions_by_model = {name: pending.predictions[name] for name in self.models
+                                if name in pending.predictions}
+        stats = pending.stats
+        stats.model_s = {name: stats.model_s[name] for name in predictions_by_model}
+        self._finished.put((pending.doc_path, pending.ground_truth, predictions_by_model, stats, pending.errors))
+        self._slots.release()
+
+    def join(self) -> list[tuple]:
+        for model_name, q in self._queues.items():
+            for t in self._threads:
+                if t.name.startswith(f"stage-{model_name}-") and t.is_alive():
+                    q.put(_STOP)
+        for t in self._threads:
+            t.join()
+        return self._collect()
@@ -0,0 +1,37 @@
+import gzip
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic_corpus import generate_xmi
+
+# small synthetic sessions named like the renamed GerParCor files
+DOCUMENTS = {
+    "NR_102.S_01.10.1920.xmi": (400, 0),
+    "NR_5.S_12.03.1975.xmi": (1200, 1),
+    "BR_1.S_07.09.1949.xmi": (150, 2),
+}
+
+
+def write_xmi(path: Path, n_tokens: int, seed: int, gzipped: bool = False) -> Path:
+    data = generate_xmi(n_tokens, seed)
+    if gzipped:
+        with gzip.GzipFile(path, "wb", mtime=0) as f:
+            f.write(data)
+    else:
+        path.write_bytes(data)
+    return path
+
+
+@pytest.fixture
+def xmi_dir(tmp_path) -> Path:
+    directory = tmp_path / "raw_xmi"
+    directory.mkdir()
+    for name, (n_tokens, seed) in DOCUMENTS.items():
+        write_xmi(directory / name, n_tokens, seed)
+    return directory
+
+
+@pytest.fixture
+def xmi_files(xmi_dir) -> list[Path]:
+    return sorted(xmi_dir.iterdir())
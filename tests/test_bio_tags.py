@@ -0,0 +1,136 @@
+"""
+Equivalence of the bisect-based _bio_tags with the original loop over all
+tokens for every entity (kept below as the reference implementation).
+
+run from the repository root: python -m pytest tests
+"""
+import json
+import random
+from pathlib import Path
+
+import pytest
+
+from benchmarks.synthetic_corpus import SIZES, write_corpus
+from milestone_1.preprocessing.xmi_engine import extract_layers
+from milestone_1.preprocessing.xmi_parser import _bio_tags
+
+TEST_SET = Path("data/test_set")
+TEST_SET_JSON = Path("data/test_set_json")
+
+
+def reference_bio_tags(tokens, entities):
+    # extract_from_xmi before the bisect version, O(entities x tokens)
+    bio_tags = ["O"] * len(tokens)
+    for ent_b, ent_e, ent_label in entities:
+        started = False
+        for i, (tb, te, _) in enumerate(tokens):
+            if tb >= ent_b and te <= ent_e:
+                if not started:
+                    bio_tags[i] = f"B-{ent_label}"
+                    started = True
+                else:
+                    bio_tags[i] = f"I-{ent_label}"
+            elif tb < ent_e and te > ent_b and not (tb >= ent_b and te <= ent_e):
+                if not started:
+                    bio_tags[i] = f"B-{ent_label}"
+                    started = True
+                else:
+                    bio_tags[i] = f"I-{ent_label}"
+    return bio_tags
+
+
+def files(directory: Path, pattern: str) -> list[Path]:
+    return sorted(directory.glob(pattern)) if directory.is_dir() else []
+
+
+def entities_from_tags(tokens, bio_tags):
+    # token aligned entity spans of a BIO sequence
+    entities = []
+    for (tb, te, _), tag in zip(tokens, bio_tags):
+        if tag.startswith("B-") or (tag.startswith("I-") and (not entities or entities[-1][2] != tag[2:])):
+            entities.append([tb, te, tag[2:]])
+        elif tag.startswith("I-"):
+            entities[-1][1] = te
+    return [tuple(e) for e in entities]
+
+
+@pytest.mark.parametrize("xmi_path", files(TEST_SET, "*.xmi"), ids=lambda p: p.name)
+def test_test_set(xmi_path):
+    with xmi_path.open("rb") as f:
+        if f.read(7) == b"version":
+            pytest.skip("git lfs pointer, the XMI files need git lfs pull")
+    layers = extract_layers(xmi_path)
+    tokens, entities = layers.tokens(), layers.entities()
+    tags = _bio_tags(tokens, entities)
+    assert tags == reference_bio_tags(tokens, entities)
+
+    # data/test_set_json was written with the old loop
+    json_path = TEST_SET_JSON / xmi_path.name.replace(".xmi", ".json")
+    if json_path.exists():
+        with json_path.open("r", encoding="utf-8") as f:
+            assert tags == json.load(f)["bio_tags"]
+
+
+@pytest.mark.parametrize("json_path", files(TEST_SET_JSON, "*.json"), ids=lambda p: p.name)
+def test_test_set_json(json_path):
+    # the real token layers of the test set, with the entities recovered from the stored tags
+    # and additionally shifted by a few characters so they cut into tokens
+    with json_path.open("r", encoding="utf-8") as f:
+        data = json.load(f)
+    tokens = [tuple(t) for t in data["tokens"]]
+    entities = entities_from_tags(tokens, data["bio_tags"])
+    assert entities
+    assert _bio_tags(tokens, entities) == reference_bio_tags(tokens, entities)
+    assert _bio_tags(tokens, entities) == data["bio_tags"]
+
+    rng = random.Random(json_path.name)
+    shifted = [(b + rng.randint(-3, 3), e + rng.randint(-3, 3), label) for b, e, label in entities]
+    assert _bio_tags(tokens, shifted) == reference_bio_tags(tokens, shifted)
+
+
+def test_synthetic_corpus(tmp_path):
+    for path in write_corpus(tmp_path, list(SIZES)[:2]):
+        layers = extract_layers(path)
+        tokens, entities = layers.tokens(), layers.entities()
+        assert _bio_tags(tokens, entities) == reference_bio_tags(tokens, entities)
+
+
+@pytest.mark.parametrize("entities", [
+    [],
+    [(0, 3, "PER"), (4, 9, "PER")],                     # adjacent entities
+    [(0, 9, "ORG"), (4, 9, "PER")],                     # nested, the later one wins
+    [(4, 9, "PER"), (0, 9, "ORG")],
+    [(2, 6, "LOC"), (5, 12, "ORG")],                    # partial overlaps with tokens and each other
+    [(1, 2, "PER")],                                    # inside a single token
+    [(10, 10, "LOC"), (20, 30, "LOC")],                 # empty and out of range
+    [(9, 4, "ORG"), (14, 14, "LOC")],                   # reversed, empty at a token begin
+])
+def test_overlapping_and_adjacent(entities):
+    tokens = [(0, 3, "Abg"), (3, 4, "."), (4, 9, "Kogler"), (10, 13, "und"), (13, 13, ""), (14, 18, "Wien")]
+    assert _bio_tags(tokens, entities) == reference_bio_tags(tokens, entities)
+
+
+def test_long_token():
+    # one token spanning all others, e.g. a URL or a table cell
+    tokens = [(0, 500, "x" * 500)] + [(i, i + 3, "abc") for i in range(0, 500, 4)]
+    entities = [(i, i + 7, "LOC") for i in range(0, 500, 25)] + [(490, 520, "ORG")]
+    assert _bio_tags(tokens, entities) == reference_bio_tags(tokens, entities)
+
+
+def test_random_spans():
+    rng = random.Random(0)
+    for _ in range(200):
+        tokens, pos = [], 0
+        for _ in range(rng.randint(0, 40)):
+            pos += rng.randint(0, 2)
+            length = rng.randint(0, 6)
+            tokens.append((pos, pos + length, "x" * length))
+            pos += length
+        # unsorted and overlapping tokens too
+        if rng.random() < 0.3:
+            rng.shuffle(tokens)
+        entities = []
+        for _ in range(rng.randint(0, 10)):
+            b = rng.randint(0, pos + 2)
+            entities.append((b, b + rng.randint(0, 12), rng.choice(["PER", "ORG", "LOC"])))
+        assert _bio_tags(tokens, entities) == reference_bio_tags(tokens, entities)
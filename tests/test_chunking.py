@@ -0,0 +1,32 @@
+"""
+chunk_spans / remap of milestone_2/chunking.py
+
+run from the repository root: python -m pytest tests
+"""
+import pytest
+
+from milestone_2.chunking import chunk_spans, remap
+from milestone_2.entities import Entity
+
+TEXT = "Abg. Dr. Kogler sprach in Wien.\n\nDer Präsident dankte. Dann sprach Frau Rendi Wagner aus Wien"
+
+
+@pytest.mark.parametrize("max_chars", [0, -1])
+def test_rejects_empty_chunks(max_chars):
+    with pytest.raises(ValueError):
+        chunk_spans(TEXT, max_chars)
+
+
+@pytest.mark.parametrize("max_chars", [1, 7, 20, 40, len(TEXT), 3_000_000])
+def test_spans_cover_text(max_chars):
+    spans = chunk_spans(TEXT, max_chars)
+    assert spans[0][0] == 0 and spans[-1][1] == len(TEXT) and spans[-1][2] == "end"
+    assert all(end - start <= max_chars for start, end, _ in spans)
+    assert all(a[1] == b[0] for a, b in zip(spans, spans[1:]))
+
+
+def test_merges_name_cut_at_whitespace():
+    text = "Frau Rendi Wagner"
+    spans = [(0, 11, "whitespace"), (11, len(text), "end")]
+    chunk_entities = [[Entity("Rendi", "PER", 5, 10)], [Entity("Wagner", "PER", 0, 6)]]
+    assert remap(text, spans, chunk_entities) == [Entity("Rendi Wagner", "PER", 5, 17)]
@@ -0,0 +1,60 @@
+"""
+Packing XMI files into the corpus store of milestone_2/preprocessing_gerparcor/corpus_store.py and reading them back
+"""
+from milestone_2.preprocessing_gerparcor.corpus_store import (
+    INDEX_FILE, CorpusStore, doc_metadata, pack, select_files,
+)
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+def test_round_trip(tmp_path, xmi_files):
+    documents = pack(xmi_files, tmp_path / "store")
+    store = CorpusStore(tmp_path / "store")
+    parser = XmiParser()
+
+    assert [doc["name"] for doc in documents] == store.names() == [f.name for f in xmi_files]
+    for path in xmi_files:
+        expected = parser.parse(path)
+        assert store.load(path) == expected
+        assert store.metadata(path.name)["chars"] == len(expected["text"])
+        assert bytes(store.raw(path.name)) == expected["text"].encode("utf-8")
+
+
+def test_unparseable_files_are_skipped(tmp_path, xmi_files):
+    broken = tmp_path / "broken.xmi"
+    broken.write_text("not xml", encoding="utf-8")
+    documents = pack([broken] + xmi_files, tmp_path / "store")
+
+    assert [doc["name"] for doc in documents] == [f.name for f in xmi_files]
+    assert CorpusStore(tmp_path / "store").load(xmi_files[0]) == XmiParser().parse(xmi_files[0])
+    assert sorted(p.name for p in (tmp_path / "store").iterdir()) == sorted(["entities.bin", INDEX_FILE, "texts.bin"])
+
+
+def test_failed_pack_keeps_old_store(tmp_path, xmi_files):
+    pack(xmi_files[:1], tmp_path / "store")
+
+    class FailingParser(XmiParser):
+        def layers(self, xmi_path):
+            if xmi_path == xmi_files[-1]:
+                raise KeyboardInterrupt
+            return super().layers(xmi_path)
+
+    try:
+        pack(xmi_files, tmp_path / "store", FailingParser())
+    except KeyboardInterrupt:
+        pass
+    store = CorpusStore(tmp_path / "store")
+    assert store.names() == [xmi_files[0].name]
+    assert len(list((tmp_path / "store").iterdir())) == 3
+
+
+def test_empty_store(tmp_path):
+    pack([], tmp_path / "store")
+    assert CorpusStore(tmp_path / "store").names() == []
+
+
+def test_metadata_and_selection(xmi_dir):
+    assert doc_metadata("NR_102.S_01.10.1920.xmi") == {"chamber": "NR", "session": 102, "date": "1920-10-01"}
+    assert doc_metadata("BR_1.S_07.09.1949.xmi.gz")["chamber"] == "BR"
+    assert doc_metadata("other.xmi") == {"chamber": None, "session": None, "date": None}
+    assert [p.name for p in select_files(xmi_dir, per_chamber=1)] == ["BR_1.S_07.09.1949.xmi", "NR_102.S_01.10.1920.xmi"]
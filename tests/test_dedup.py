@@ -0,0 +1,40 @@
+"""
+Deduplicator of milestone_2/dedup.py
+"""
+import json
+from pathlib import Path
+
+from milestone_2.dedup import Deduplicator
+
+
+def test_check():
+    dedup = Deduplicator()
+    assert dedup.check(Path("a.xmi"), "Wien") is None
+    assert dedup.check(Path("b.xmi"), "Graz") is None
+    assert dedup.check(Path("c.xmi"), "Wien") == Path("a.xmi")
+    assert dedup.check(Path("d.xmi"), "Wien ") is None
+    # a document seen again is not its own duplicate
+    assert dedup.check(Path("a.xmi"), "Wien") is None
+    assert dedup.duplicates == {Path("c.xmi"): Path("a.xmi")}
+
+
+def test_promote():
+    dedup = Deduplicator()
+    for name in ("a.xmi", "b.xmi", "c.xmi"):
+        dedup.check(Path(name), "Wien")
+    assert dedup.promote(Path("a.xmi")) == Path("b.xmi")
+    assert dedup.duplicates == {Path("c.xmi"): Path("b.xmi")}
+    # later documents with the text are duplicates of the promoted one
+    assert dedup.check(Path("d.xmi"), "Wien") == Path("b.xmi")
+
+    assert dedup.promote(Path("b.xmi")) == Path("c.xmi")
+    assert dedup.duplicates == {Path("d.xmi"): Path("c.xmi")}
+    assert dedup.promote(Path("x.xmi")) is None
+
+
+def test_report(tmp_path):
+    dedup = Deduplicator()
+    dedup.check(Path("data/a.xmi"), "Wien")
+    dedup.check(Path("data/b.xmi"), "Wien")
+    dedup.write_report(tmp_path / "duplicates.json")
+    assert json.loads((tmp_path / "duplicates.json").read_text(encoding="utf-8")) == {"b.xmi": "a.xmi"}
@@ -0,0 +1,69 @@
+"""
+DocCache of milestone_2/preprocessing_gerparcor/doc_cache.py and its use by XmiParser
+"""
+from benchmarks.synthetic_corpus import generate_xmi
+from milestone_1.preprocessing.xmi_engine import extract_layers
+from milestone_2.preprocessing_gerparcor.doc_cache import DocCache
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+def test_miss_then_hit(tmp_path, xmi_files):
+    cache = DocCache(tmp_path / "cache", version=1)
+    key = cache.key(xmi_files[0])
+    assert cache.get(key) is None
+
+    layers = extract_layers(xmi_files[0], tokens=False)
+    cache.put(key, layers)
+    assert cache.get(key) == layers
+    # a new instance finds the entry on disk
+    assert DocCache(tmp_path / "cache", version=1).get(key) == layers
+
+
+def test_key_is_content_addressed(tmp_path):
+    a, b, c = tmp_path / "a.xmi", tmp_path / "b.xmi", tmp_path / "c.xmi"
+    a.write_bytes(generate_xmi(100, 0))
+    b.write_bytes(generate_xmi(100, 0))
+    c.write_bytes(generate_xmi(100, 1))
+    cache = DocCache(tmp_path / "cache", version=1)
+    assert cache.key(a) == cache.key(b) != cache.key(c)
+
+
+def test_parser_with_cache(tmp_path, xmi_files):
+    cache = DocCache(tmp_path / "cache", version=1)
+    parser, cached = XmiParser(), XmiParser(cache=cache)
+    for path in xmi_files:
+        assert cached.parse(path) == parser.parse(path)
+        assert cache.get(cache.key(path)) is not None
+        assert cached.parse(path) == parser.parse(path)
+
+
+def test_corrupt_entry_is_a_miss(tmp_path, xmi_files):
+    cache = DocCache(tmp_path / "cache", version=1)
+    key = cache.key(xmi_files[0])
+    cache.put(key, extract_layers(xmi_files[0], tokens=False))
+    path = cache._path(key)
+    path.write_bytes(path.read_bytes()[:-10])
+
+    assert cache.get(key) is None
+    assert not path.exists()
+
+
+def test_other_version_is_a_miss(tmp_path, xmi_files):
+    key = DocCache(tmp_path / "cache", version=1).key(xmi_files[0])
+    DocCache(tmp_path / "cache", version=1).put(key, extract_layers(xmi_files[0], tokens=False))
+    assert DocCache(tmp_path / "cache", version=2).get(key) is None
+
+
+def test_only_version_dirs_are_dropped(tmp_path):
+    for name in ("v1", "v12", "venv", "vocab", "data"):
+        (tmp_path / name).mkdir()
+    DocCache(tmp_path, version=2)
+    assert sorted(p.name for p in tmp_path.iterdir()) == ["data", "v2", "venv", "vocab"]
+
+
+def test_eviction(tmp_path, xmi_files):
+    cache = DocCache(tmp_path / "cache", version=1, max_bytes=1)
+    for path in xmi_files:
+        cache.put(cache.key(path), extract_layers(path, tokens=False))
+    assert cache._size <= 1
+    assert not list(cache._entries())
@@ -0,0 +1,134 @@
+"""
+milestone_2/ml_flair/flair_ner.py without the flair model: loading from the bundle, entity offsets
+"""
+import re
+from dataclasses import dataclass
+
+import pytest
+
+pytest.importorskip("flair")
+
+from milestone_2.entities import Entity  # noqa: E402
+from milestone_2.ml_flair import flair_ner  # noqa: E402
+
+
+@pytest.fixture
+def checkpoint(tmp_path, monkeypatch):
+    path = flair_ner.bundle_file(tmp_path)
+    path.parent.mkdir(parents=True)
+    path.write_bytes(b"")
+    monkeypatch.setattr(flair_ner.SequenceTagger, "load", staticmethod(lambda name: f"full:{name}"))
+    return path
+
+
+def test_memory_mapped_load(checkpoint, monkeypatch):
+    monkeypatch.setattr(flair_ner, "can_mmap", lambda: True)
+    monkeypatch.setattr(flair_ner, "load_mmap", lambda path: f"mmap:{path}")
+    assert flair_ner.load_bundle_tagger(checkpoint) == (f"mmap:{checkpoint}", f"{checkpoint} (memory-mapped)")
+
+
+def test_full_load_without_mmap(checkpoint, monkeypatch):
+    def load_mmap(path):
+        raise RuntimeError("legacy checkpoint format")
+
+    monkeypatch.setattr(flair_ner, "can_mmap", lambda: True)
+    monkeypatch.setattr(flair_ner, "load_mmap", load_mmap)
+    assert flair_ner.load_bundle_tagger(checkpoint) == (f"full:{checkpoint}", str(checkpoint))
+
+    monkeypatch.setattr(flair_ner, "can_mmap", lambda: False)
+    assert flair_ner.load_bundle_tagger(checkpoint) == (f"full:{checkpoint}", str(checkpoint))
+
+
+@dataclass
+class Label:
+    value: str
+
+
+@dataclass
+class Span:
+    # a flair span, offsets in its sentence
+    text: str
+    start_position: int
+    end_position: int
+    label: str
+
+    def get_label(self, label_type):
+        return Label(self.label)
+
+
+class Sentence:
+    def __init__(self, text: str, start_position: int):
+        self.text, self.start_position = text, start_position
+        self.spans = []
+
+    def __len__(self):
+        return len(self.text.split())
+
+    def get_spans(self, label_type):
+        return self.spans
+
+
+class Splitter:
+    def split(self, text: str) -> list[Sentence]:
+        return [Sentence(m.group(), m.start()) for m in re.finditer(r"[^.]+\.?", text)]
+
+
+class Tagger:
+    # capitalized words after the first one of a sentence, LOC for the cities, PER otherwise; records the batches
+    CITIES = {"Wien", "Graz"}
+
+    def __init__(self):
+        self.batches = []
+        self.lengths = []
+
+    def predict(self, sentences, mini_batch_size):
+        self.batches.append(len(sentences))
+        self.lengths.append([len(sentence) for sentence in sentences])
+        for sentence in sentences:
+            for m in list(re.finditer(r"\b[A-ZÄÖÜ]\w+", sentence.text))[1:]:
+                label = "LOC" if m.group() in self.CITIES else "PER"
+                sentence.spans.append(Span(m.group(), m.start(), m.end(), label))
+            sentence.spans.append(Span("x", 0, 1, "MISC"))
+
+
+@pytest.fixture
+def ner():
+    ner = flair_ner.FlairNer.__new__(flair_ner.FlairNer)
+    ner.mini_batch_size = 2
+    ner._splitter, ner._tagger = Splitter(), Tagger()
+    return ner
+
+
+def expected(text: str) -> list[Entity]:
+    # the tagger's entities in document offsets
+    entities = []
+    for m in re.finditer(r"[^.]+\.?", text):
+        for w in list(re.finditer(r"\b[A-ZÄÖÜ]\w+", m.group()))[1:]:
+            label = "LOC" if w.group() in Tagger.CITIES else "PER"
+            entities.append(Entity(w.group(), label, m.start() + w.start(), m.start() + w.end()))
+    return entities
+
+
+def test_document_offsets(ner):
+    texts = ["Heute sprach Kogler in Wien. Dann dankte Renner.", "", "Ein Satz ohne Namen. Der Abgeordnete aus Graz."]
+    entities = ner.annotate_many(texts)
+    assert entities == [expected(text) for text in texts]
+    for text, ents in zip(texts, entities):
+        assert all(text[e.start:e.end] == e.text for e in ents)
+    # 4 sentences in batches of 2, MISC is left out
+    assert ner._tagger.batches == [2, 2]
+
+
+def test_batch_matches_single_texts(ner):
+    texts = ["Heute sprach Kogler in Wien. Dann dankte Renner.", "Der Abgeordnete aus Graz."]
+    assert ner.annotate_batch(texts) == [ner.annotate(text) for text in texts]
+
+
+def test_sentences_are_pooled_by_length(ner):
+    # one sentence per document still fills the batches, which hold sentences of similar length
+    texts = ["Kurz.", "Ein sehr viel längerer Satz aus Wien mit vielen Wörtern.", "Mittellanger Satz aus Graz.",
+             "Noch ein sehr langer Satz mit Renner und noch mehr Wörtern."]
+    entities = ner.annotate_many(texts)
+    assert ner._tagger.batches == [2, 2]
+    assert ner._tagger.lengths == [[11, 10], [4, 1]]
+    assert entities == [expected(text) for text in texts]
@@ -0,0 +1,68 @@
+"""
+RunManifest of milestone_2/manifest.py
+"""
+import json
+
+from milestone_2.entities import Entity
+from milestone_2.manifest import RunManifest, input_hash
+
+FINGERPRINTS = {"rule_based": "r1", "spacy": "s1"}
+
+
+def test_up_to_date_and_stale_models(tmp_path):
+    manifest = RunManifest(tmp_path / "manifest.json")
+    assert manifest.stale_models("a.xmi", "h1", FINGERPRINTS) == ["rule_based", "spacy"]
+
+    manifest.record("a.xmi", "h1", FINGERPRINTS)
+    assert manifest.is_current("a.xmi", "h1")
+    assert manifest.stale_models("a.xmi", "h1", FINGERPRINTS) == []
+    assert manifest.stale_models("a.xmi", "h1", {**FINGERPRINTS, "spacy": "s2"}) == ["spacy"]
+    assert manifest.has_models("a.xmi", FINGERPRINTS)
+    # another input: everything again, and older model entries are gone
+    assert manifest.stale_models("a.xmi", "h2", FINGERPRINTS) == ["rule_based", "spacy"]
+    manifest.record("a.xmi", "h2", {"spacy": "s1"})
+    assert manifest.stale_models("a.xmi", "h2", FINGERPRINTS) == ["rule_based"]
+
+
+def test_close_compacts_the_journal(tmp_path):
+    manifest = RunManifest(tmp_path / "manifest.json")
+    manifest.record("a.xmi", "h1", {"rule_based": "r1"})
+    manifest.record("a.xmi", "h1", {"spacy": "s1"})
+    assert (tmp_path / "manifest.jsonl").exists()
+    manifest.close()
+
+    assert not (tmp_path / "manifest.jsonl").exists()
+    with (tmp_path / "manifest.json").open(encoding="utf-8") as f:
+        assert json.load(f)["documents"] == {"a.xmi": {"input": "h1", "models": FINGERPRINTS}}
+    assert RunManifest(tmp_path / "manifest.json").stale_models("a.xmi", "h1", FINGERPRINTS) == []
+
+
+def test_interrupted_run_is_replayed(tmp_path):
+    manifest = RunManifest(tmp_path / "manifest.json")
+    manifest.record("a.xmi", "h1", FINGERPRINTS)
+    manifest.close()
+    manifest = RunManifest(tmp_path / "manifest.json")
+    manifest.record("b.xmi", "h2", FINGERPRINTS)
+    manifest.record("a.xmi", "h3", {"spacy": "s1"})
+    # killed while writing the next line, close() never ran
+    with (tmp_path / "manifest.jsonl").open("a", encoding="utf-8") as f:
+        f.write('{"name": "c.xmi", "inp')
+
+    resumed = RunManifest(tmp_path / "manifest.json")
+    assert resumed.documents == {
+        "a.xmi": {"input": "h3", "models": {"spacy": "s1"}},
+        "b.xmi": {"input": "h2", "models": FINGERPRINTS},
+    }
+    assert not (tmp_path / "manifest.jsonl").exists()
+
+
+def test_unreadable_manifest(tmp_path):
+    (tmp_path / "manifest.json").write_text("{", encoding="utf-8")
+    assert RunManifest(tmp_path / "manifest.json").documents == {}
+
+
+def test_input_hash():
+    entities = [Entity("Wien", "LOC", 0, 4)]
+    assert input_hash("Wien", entities) == input_hash("Wien", [e.to_dict() for e in entities])
+    assert input_hash("Wien", entities) != input_hash("Wien", [Entity("Wien", "ORG", 0, 4)])
+    assert input_hash("Wien", entities) != input_hash("Wien ", entities)
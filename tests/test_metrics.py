@@ -0,0 +1,59 @@
+"""
+MetricsLog of milestone_2/metrics.py
+"""
+import json
+from pathlib import Path
+
+from milestone_2.metrics import DocStats, MetricsLog, percentile
+
+
+def stats(chars: int, seconds: float) -> DocStats:
+    return DocStats(chars=chars, parse_s=0.1, save_s=0.1, model_s={"spacy": seconds}, model_entities={"spacy": 2})
+
+
+def read_lines(path: Path) -> list[dict]:
+    with path.open(encoding="utf-8") as f:
+        return [json.loads(line) for line in f]
+
+
+def test_resumed_run_appends(tmp_path):
+    out_file = tmp_path / "metrics.jsonl"
+    first = MetricsLog(out_file)
+    first.record(Path("a.xmi"), stats(1000, 1.0))
+    first.record(Path("b.xmi"), stats(2000, 2.0))
+    first.close()
+
+    resumed = MetricsLog(out_file)
+    resumed.record(Path("c.xmi"), stats(4000, 4.0))
+    resumed.close()
+
+    lines = read_lines(out_file)
+    assert [line.get("filename") for line in lines] == [None, "a.xmi", "b.xmi", None, "c.xmi"]
+    assert lines[0]["run"] == first.run_id and "started" in lines[0]
+    assert lines[3]["run"] == resumed.run_id != first.run_id
+    assert [line["run"] for line in lines[1:3]] == [first.run_id] * 2
+    assert lines[4]["run"] == resumed.run_id
+
+    # the summary is the one of this run
+    spacy = next(s for s in resumed.summary() if s["stage"] == "spacy")
+    assert spacy["docs"] == 1 and spacy["total_s"] == 4.0
+
+
+def test_summary(tmp_path):
+    metrics = MetricsLog(tmp_path / "metrics.jsonl")
+    for i in range(1, 5):
+        metrics.record(Path(f"{i}.xmi"), stats(1000 * i, float(i)))
+    metrics.write_summary(tmp_path / "metrics_summary.csv")
+    metrics.close()
+
+    summary = {s["stage"]: s for s in metrics.summary()}
+    assert list(summary) == ["parse", "spacy", "save", "total"]
+    assert summary["spacy"]["p50_s"] == 2.0 and summary["spacy"]["max_s"] == 4.0
+    assert summary["spacy"]["chars_per_s"] == 1000
+    assert (tmp_path / "metrics_summary.csv").read_text(encoding="utf-8").startswith("stage,docs,total_s")
+
+
+def test_percentile():
+    assert percentile([], 0.5) == 0.0
+    assert percentile([3, 1, 2], 0.5) == 2
+    assert percentile(list(range(1, 101)), 0.95) == 95
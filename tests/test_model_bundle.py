@@ -0,0 +1,48 @@
+"""
+populate of milestone_2/model_bundle.py into a fresh directory, with a blank spaCy pipeline in place of the models
+"""
+import json
+from pathlib import Path
+
+import pytest
+
+spacy = pytest.importorskip("spacy")
+pytest.importorskip("requests")
+
+from milestone_2 import model_bundle, model_registry  # noqa: E402
+from milestone_2.rule_based.rule_based_ner import RuleBasedNER  # noqa: E402
+
+PERSONS = {"Leopold Figl", "Karl Renner"}
+
+
+@pytest.fixture
+def stub_models(monkeypatch):
+    # package names load a blank German pipeline, bundle directories the stored copy
+    load = spacy.load
+
+    def stub_load(name, **kwargs):
+        if Path(name).is_dir():
+            return load(name, **kwargs)
+        return spacy.blank("de")
+
+    monkeypatch.setattr(spacy, "load", stub_load)
+    monkeypatch.setattr(RuleBasedNER, "_fetched_persons", None)
+    monkeypatch.setattr(RuleBasedNER, "_fetch_parliament_persons", classmethod(lambda cls, verbose=False: set(PERSONS)))
+    monkeypatch.setattr(model_registry, "_options", {})
+
+
+def test_populate_fresh_directory(tmp_path, stub_models):
+    model_dir = tmp_path / "models"
+    model_bundle.populate(model_dir, ["rule_based", "spacy"])
+
+    bundle = model_bundle.read_bundle(model_dir)
+    assert list(bundle["models"]) == ["rule_based", "spacy"]
+    assert (model_dir / "spacy" / "de_core_news_sm" / "config.cfg").is_file()
+    assert (model_dir / "spacy" / "de_core_news_md" / "config.cfg").is_file()
+    with (model_dir / "rule_based" / "parliament_persons.json").open(encoding="utf-8") as f:
+        assert set(json.load(f)) == PERSONS
+    assert model_bundle.info(model_dir, load=False) is False  # flair was not stored
+
+    # the rules are built from the bundle
+    assert RuleBasedNER(model_registry.GEONAMES_DIR, model_dir=model_dir).loaded_from == \
+        str(model_dir / "spacy" / "de_core_news_sm")
@@ -0,0 +1,169 @@
+"""
+milestone_2/ner_pipeline.py end to end on the synthetic sessions, with stub annotators in place of the models
+"""
+import json
+import re
+import shutil
+
+import pytest
+
+from benchmarks.synthetic_corpus import generate_xmi
+from milestone_2 import model_registry, ner_pipeline, sharding
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+class StubNer:
+    # every match of PATTERN, fingerprinted by VERSION; CALLS records (model, text length) of every annotation
+    PATTERN = None
+    LABEL = None
+    VERSION = "1"
+    CALLS: list = []
+
+    def __init__(self, *args, model_dir=None, **options):
+        self.loaded_from = "stub"
+
+    @classmethod
+    def fingerprint(cls, *args, model_dir=None, **options) -> str:
+        return f"{cls.__name__}={cls.VERSION}"
+
+    def annotate(self, text: str) -> list:
+        StubNer.CALLS.append((type(self).__name__, len(text)))
+        return [ner_pipeline.Entity(m.group(), self.LABEL, m.start(), m.end()) for m in self.PATTERN.finditer(text)]
+
+
+class RuleStub(StubNer):
+    PATTERN = re.compile(r"\b(Kogler|Kreisky|Renner|Figl)\b")
+    LABEL = "PER"
+
+    @staticmethod
+    def pin_parliament_persons(model_dir, out_file):
+        out_file.write_text("[]", encoding="utf-8")
+        return out_file
+
+
+class SpacyStub(StubNer):
+    PATTERN = re.compile(r"\b(Wien|Graz|Linz|Salzburg|Österreich)\b")
+    LABEL = "LOC"
+    # number of texts of every annotate_batch call, FAIL_BATCH makes them raise
+    BATCHES: list = []
+    FAIL_BATCH = False
+
+    def annotate_batch(self, texts: list[str], **options) -> list:
+        SpacyStub.BATCHES.append(len(texts))
+        if self.FAIL_BATCH:
+            raise RuntimeError("stub batch failure")
+        return [self.annotate(text) for text in texts]
+
+
+MODELS = {"rule_based": RuleStub, "spacy": SpacyStub}
+
+
+@pytest.fixture
+def run_pipeline(tmp_path, monkeypatch, xmi_dir):
+    # runs main in tmp_path on xmi_dir, returns the entities files
+    monkeypatch.chdir(tmp_path)
+    ner_pipeline.ENTITIES_DIR.mkdir(parents=True)
+    monkeypatch.setattr(ner_pipeline, "RAW_XMI_DIR", xmi_dir)
+    for name, cls in MODELS.items():
+        monkeypatch.setitem(model_registry.MODELS, name, (__name__, cls.__name__, ()))
+    monkeypatch.setattr(model_registry, "_instances", {})
+    monkeypatch.setattr(model_registry, "_options", {})
+    monkeypatch.setattr(model_registry, "_model_dir", None)
+    monkeypatch.setattr(StubNer, "CALLS", [])
+    monkeypatch.setattr(SpacyStub, "VERSION", "1")
+    monkeypatch.setattr(SpacyStub, "BATCHES", [])
+    monkeypatch.setattr(SpacyStub, "FAIL_BATCH", False)
+
+    def run(*args):
+        model_registry._instances.clear()
+        StubNer.CALLS.clear()
+        SpacyStub.BATCHES.clear()
+        ner_pipeline.main(["--models", "rule_based,spacy", "--no-cache", *args])
+        return entities_files()
+    return run
+
+
+def entities_files() -> dict[str, dict]:
+    files = {}
+    for path in sorted(ner_pipeline.ENTITIES_DIR.glob("*_entities.json")):
+        with path.open(encoding="utf-8") as f:
+            files[path.name] = json.load(f)
+    return files
+
+
+def calls(model: str) -> int:
+    return sum(1 for name, _ in StubNer.CALLS if name == model)
+
+
+def test_annotates_every_document(run_pipeline, xmi_files):
+    files = run_pipeline()
+    assert sorted(files) == sorted(f"{f.stem}_entities.json" for f in xmi_files)
+    for payload in files.values():
+        assert list(payload) == ["filename", "ground_truth", "rule_based", "spacy"]
+        assert all(e["label"] == "LOC" for e in payload["spacy"])
+    assert any(payload["spacy"] for payload in files.values())
+    assert calls("RuleStub") == calls("SpacyStub") == len(xmi_files)
+    # the rules of every process read the list of the fingerprint
+    assert model_registry._options["rule_based"]["persons_file"] == ner_pipeline.PERSONS_JSON
+
+
+def test_resume_skips_up_to_date_documents(run_pipeline, xmi_files):
+    first = run_pipeline()
+    assert run_pipeline() == first
+    assert StubNer.CALLS == []
+
+    # only the model whose fingerprint changed runs again, the others keep their predictions
+    SpacyStub.VERSION = "2"
+    assert run_pipeline() == first
+    assert calls("RuleStub") == 0 and calls("SpacyStub") == len(xmi_files)
+
+    assert run_pipeline("--force") == first
+    assert calls("RuleStub") == calls("SpacyStub") == len(xmi_files)
+
+
+def test_changed_input_is_annotated_again(run_pipeline, xmi_files):
+    first = run_pipeline()
+    xmi_files[0].write_bytes(generate_xmi(300, 7))
+    files = run_pipeline()
+    assert StubNer.CALLS == [("RuleStub", len(XmiParser().parse(xmi_files[0])["text"])),
+                             ("SpacyStub", len(XmiParser().parse(xmi_files[0])["text"]))]
+    changed = f"{xmi_files[0].stem}_entities.json"
+    assert files[changed] != first[changed]
+    assert {k: v for k, v in files.items() if k != changed} == {k: v for k, v in first.items() if k != changed}
+
+
+def test_duplicates_are_copied(run_pipeline, xmi_dir, xmi_files):
+    shutil.copyfile(xmi_files[0], xmi_dir / "NR_9.S_01.01.1931.xmi")
+    files = run_pipeline()
+    assert calls("RuleStub") == len(xmi_files)
+    copy = files["NR_9.S_01.01.1931_entities.json"]
+    assert copy.pop("duplicate_of") == xmi_files[0].name
+    original = files[f"{xmi_files[0].stem}_entities.json"]
+    assert {k: v for k, v in copy.items() if k != "filename"} == {k: v for k, v in original.items() if k != "filename"}
+
+
+def test_batches_match_single_documents(run_pipeline, xmi_files):
+    single = run_pipeline("--batch", "1")
+    assert SpacyStub.BATCHES == []
+
+    assert run_pipeline("--force", "--batch", "8") == single
+    assert SpacyStub.BATCHES == [len(xmi_files)]
+    assert calls("RuleStub") == calls("SpacyStub") == len(xmi_files)
+
+    # a failing batch is annotated again document by document
+    SpacyStub.FAIL_BATCH = True
+    assert run_pipeline("--force", "--batch", "2") == single
+    assert SpacyStub.BATCHES == [2]
+    assert calls("SpacyStub") == len(xmi_files)
+
+
+def test_shards_add_up_to_the_whole_run(run_pipeline, xmi_files):
+    run_pipeline("--shard", "0/2")
+    assert 0 < calls("RuleStub") < len(xmi_files)
+    files = run_pipeline("--shard", "1/2")
+    assert sorted(files) == sorted(f"{f.stem}_entities.json" for f in xmi_files)
+    assert sharding.check_shards(sharding.read_reports(2)) == []
+
+    shutil.rmtree(ner_pipeline.ENTITIES_DIR)
+    ner_pipeline.ENTITIES_DIR.mkdir()
+    assert run_pipeline("--force") == files
@@ -0,0 +1,61 @@
+"""
+Background loading of milestone_2/prefetch.py
+"""
+import threading
+
+import pytest
+
+from milestone_2.prefetch import prefetch
+
+
+def load(item):
+    if item == 3:
+        raise ValueError("cannot load 3")
+    return item * 10
+
+
+@pytest.mark.parametrize("depth", [0, 1, 2, 8])
+def test_order_and_errors(depth):
+    results = list(prefetch(range(6), load, depth))
+    assert [item for item, _, _ in results] == list(range(6))
+    assert [loaded for _, loaded, _ in results] == [0, 10, 20, None, 40, 50]
+    assert isinstance(results[3][2], ValueError)
+    assert all(error is None for i, (_, _, error) in enumerate(results) if i != 3)
+
+
+@pytest.mark.parametrize("depth", [0, 2])
+def test_iterator_error_reaches_consumer(depth):
+    def items():
+        yield 1
+        yield 2
+        raise OSError("listing failed")
+
+    seen = []
+    with pytest.raises(OSError):
+        for item, _, _ in prefetch(items(), load, depth):
+            seen.append(item)
+    assert seen == [1, 2]
+
+
+def test_loads_ahead_in_background():
+    loaded = []
+    started = threading.Event()
+
+    def slow_load(item):
+        loaded.append(item)
+        if len(loaded) >= 3:
+            started.set()
+        return item
+
+    it = prefetch(range(100), slow_load, depth=2)
+    assert next(it)[0] == 0
+    assert started.wait(5)
+    # bounded by the queue, not the whole input
+    assert len(loaded) <= 2 + 2 + 1
+
+
+def test_consumer_stops_early():
+    it = prefetch(range(1000), load, depth=2)
+    assert next(it)[0] == 0
+    it.close()
+    assert not any(t.name == "prefetch" and t.is_alive() for t in threading.enumerate())
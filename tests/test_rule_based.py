@@ -0,0 +1,67 @@
+"""
+Fingerprint of milestone_2/rule_based/rule_based_ner.py, without building the rules
+"""
+import json
+
+import pytest
+
+pytest.importorskip("spacy")
+pytest.importorskip("requests")
+
+from milestone_2.rule_based.rule_based_ner import RuleBasedNER  # noqa: E402
+
+
+@pytest.fixture
+def geonames_dir(tmp_path):
+    directory = tmp_path / "location_data"
+    directory.mkdir()
+    (directory / "countryInfo.txt").write_text("AT\tAUT\t040\tAU\tAustria\tVienna\n", encoding="utf-8")
+    return directory
+
+
+@pytest.fixture
+def fetched(monkeypatch):
+    persons = {"Leopold Figl"}
+    monkeypatch.setattr(RuleBasedNER, "_fetched_persons", None)
+    monkeypatch.setattr(RuleBasedNER, "_parse_parliament_persons_from_json", staticmethod(lambda data: set(persons)))
+    monkeypatch.setattr("milestone_2.rule_based.rule_based_ner.requests.get", lambda *a, **k: FakeResponse())
+    return persons
+
+
+class FakeResponse:
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return {}
+
+
+def test_gazetteer_contents(geonames_dir, tmp_path):
+    persons_file = tmp_path / "persons.json"
+    persons_file.write_text("[]", encoding="utf-8")
+    before = RuleBasedNER.fingerprint(geonames_dir, persons_file=persons_file)
+    # same size, other content
+    (geonames_dir / "countryInfo.txt").write_text("AT\tAUT\t040\tAU\tAustria\tWienna\n", encoding="utf-8")
+    assert RuleBasedNER.fingerprint(geonames_dir, persons_file=persons_file) != before
+
+
+def test_pinned_persons(geonames_dir, tmp_path, fetched):
+    out_file = RuleBasedNER.pin_parliament_persons(None, tmp_path / "persons.json")
+    with out_file.open(encoding="utf-8") as f:
+        assert json.load(f) == ["Leopold Figl"]
+    pinned = RuleBasedNER.fingerprint(geonames_dir, persons_file=out_file)
+
+    # the API has changed since, the run keeps the pinned list
+    fetched.add("Julius Raab")
+    RuleBasedNER._fetched_persons = None
+    assert RuleBasedNER.fingerprint(geonames_dir, persons_file=out_file) == pinned
+    out_file.write_text(json.dumps(sorted(fetched)), encoding="utf-8")
+    assert RuleBasedNER.fingerprint(geonames_dir, persons_file=out_file) != pinned
+
+
+def test_bundle_persons_are_pinned(tmp_path, fetched):
+    bundle_file = tmp_path / "models" / "rule_based" / "parliament_persons.json"
+    bundle_file.parent.mkdir(parents=True)
+    bundle_file.write_text('["Karl Renner"]', encoding="utf-8")
+    assert RuleBasedNER.pin_parliament_persons(tmp_path / "models", tmp_path / "persons.json") == bundle_file
+    assert not (tmp_path / "persons.json").exists()
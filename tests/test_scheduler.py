@@ -0,0 +1,79 @@
+"""
+LPT ordering and makespan calibration of milestone_2/scheduler.py
+"""
+import gzip
+import json
+import logging
+from pathlib import Path
+
+from milestone_2.scheduler import GZIP_RATIO, LptScheduler, file_cost, lpt_makespan
+
+COSTS = {Path("a.xmi"): 10, Path("b.xmi"): 50, Path("c.xmi"): 10, Path("d.xmi"): 30, Path("e.xmi"): 20}
+
+
+def test_largest_first(tmp_path):
+    scheduler = LptScheduler(2, "chars", tmp_path / "calibration.json")
+    ordered = scheduler.order(list(COSTS), COSTS.__getitem__)
+    # equal sizes keep their order
+    assert ordered == [Path(p) for p in ("b.xmi", "d.xmi", "e.xmi", "a.xmi", "c.xmi")]
+
+
+def test_failing_cost_goes_last(tmp_path):
+    def cost(f):
+        if f.name == "b.xmi":
+            raise OSError("gone")
+        return COSTS[f]
+
+    ordered = LptScheduler(2, "chars", tmp_path / "calibration.json").order(list(COSTS), cost)
+    assert ordered[-1] == Path("b.xmi")
+
+
+def test_lpt_makespan():
+    assert lpt_makespan([50, 30, 20, 10, 10], 2) == 60
+    assert lpt_makespan([50, 30, 20, 10, 10], 1) == 120
+    assert lpt_makespan([50, 30, 20, 10, 10], 10) == 50
+    assert lpt_makespan([], 3) == 0
+
+
+def test_skips_are_left_out_of_the_prediction(tmp_path, caplog):
+    scheduler = LptScheduler(2, "chars", tmp_path / "calibration.json")
+    with caplog.at_level(logging.INFO, logger="milestone_2.scheduler"):
+        ordered = scheduler.order(list(COSTS), COSTS.__getitem__, skips=[Path("b.xmi")])
+    assert ordered[0] == Path("b.xmi")
+    assert "LPT schedule of 4 documents to annotate (1 expected" in caplog.text
+    assert "predicted makespan 40 chars" in caplog.text
+
+
+def test_calibration(tmp_path, caplog):
+    calibration_file = tmp_path / "calibration.json"
+    calibration_file.write_text(json.dumps({"bytes": 3.0}), encoding="utf-8")
+
+    scheduler = LptScheduler(2, "chars", calibration_file)
+    scheduler.order(list(COSTS), COSTS.__getitem__)
+    for f, cost in COSTS.items():
+        scheduler.done(f, seconds=cost / 100)
+    with caplog.at_level(logging.INFO, logger="milestone_2.scheduler"):
+        scheduler.report()
+    assert "no calibration of an earlier run" in caplog.text
+    with calibration_file.open(encoding="utf-8") as f:
+        calibration = json.load(f)
+    assert calibration["bytes"] == 3.0
+    assert abs(calibration["chars"] - 0.01) < 1e-12
+
+    # the next run predicts with it, on the documents it annotated
+    scheduler = LptScheduler(2, "chars", calibration_file)
+    with caplog.at_level(logging.INFO, logger="milestone_2.scheduler"):
+        scheduler.order(list(COSTS), COSTS.__getitem__)
+        assert "predicted makespan 60 chars = 0.6s" in caplog.text
+        for f in (Path("b.xmi"), Path("d.xmi"), Path("e.xmi"), Path("a.xmi")):
+            scheduler.done(f, seconds=0.01)
+        scheduler.report()
+    assert "predicted with the previous calibration 0.6s" in caplog.text
+
+
+def test_file_cost(tmp_path):
+    plain, packed = tmp_path / "a.xmi", tmp_path / "b.xmi.gz"
+    plain.write_bytes(b"x" * 1000)
+    packed.write_bytes(gzip.compress(b"x" * 1000))
+    assert file_cost(plain) == 1000
+    assert file_cost(packed) == packed.stat().st_size * GZIP_RATIO
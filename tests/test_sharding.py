@@ -0,0 +1,112 @@
+"""
+Shard assignment and merge checks of milestone_2/sharding.py
+"""
+import argparse
+import json
+import sys
+from pathlib import Path
+
+import pytest
+
+from milestone_2 import sharding
+
+NAMES = [f"NR_{i}.S_01.01.1950.xmi" for i in range(40)]
+FINGERPRINTS = {"rule_based": "r1", "spacy": "s1"}
+
+
+@pytest.fixture
+def results_dir(tmp_path, monkeypatch):
+    # sharding works on relative results paths, like a copy of the results directories of all machines
+    monkeypatch.chdir(tmp_path)
+    sharding.ENTITIES_DIR.mkdir(parents=True)
+    return tmp_path
+
+
+def run_shards(count: int, failed=(), skip=()):
+    # what ner_pipeline --shard i/count leaves behind for NAMES
+    corpus = [Path(name) for name in NAMES]
+    for index in range(count):
+        if index in skip:
+            continue
+        assigned = sharding.select_shard(corpus, index, count)
+        saved = {f for f in assigned if f.name not in failed}
+        for f in saved:
+            (sharding.ENTITIES_DIR / f"{f.stem}_entities.json").write_text("{}", encoding="utf-8")
+        sharding.write_shard_report(index, count, corpus, assigned, saved, FINGERPRINTS)
+        with sharding.shard_file("duplicates", index, count).open("w", encoding="utf-8") as f:
+            json.dump({f"copy_{index}.xmi": assigned[0].name}, f)
+
+
+def test_shards_partition_the_corpus():
+    corpus = [Path(name) for name in NAMES]
+    shards = [sharding.select_shard(corpus, index, 4) for index in range(4)]
+    assert sorted(f for shard in shards for f in shard) == sorted(corpus)
+    assert all(shards)
+    # the same on every machine, whatever the order of the listing
+    assert sharding.select_shard(corpus[::-1], 1, 4) == shards[1][::-1]
+    assert all(sharding.shard_of(name, 1) == 0 for name in NAMES)
+
+
+def test_parse_shard():
+    assert sharding.parse_shard("1/4") == (1, 4)
+    for spec in ("4/4", "-1/4", "0/0", "1", "a/b"):
+        with pytest.raises(argparse.ArgumentTypeError):
+            sharding.parse_shard(spec)
+
+
+def test_complete_shards(results_dir):
+    run_shards(3)
+    assert sharding.check_shards(sharding.read_reports(3)) == []
+
+
+def test_problems(results_dir):
+    run_shards(3, failed={NAMES[0]}, skip={1})
+    problems = sharding.check_shards(sharding.read_reports(3))
+    assert "Missing shards [1] of 3" in problems
+    assert f"{NAMES[0]} failed in shard {sharding.shard_of(NAMES[0], 3)}" in problems
+
+    reports = sharding.read_reports(3)
+    reports[1]["fingerprints"] = {**FINGERPRINTS, "spacy": "s2"}
+    reports[1]["corpus_digest"] = "other"
+    problems = sharding.check_shards(reports)
+    assert any("different corpus" in p for p in problems)
+    assert any("ran other models" in p for p in problems)
+
+    assert sharding.check_shards([]) == [f"No shard reports in {sharding.SHARDS_DIR}"]
+
+
+def test_missing_entities_file(results_dir):
+    run_shards(2)
+    (sharding.ENTITIES_DIR / f"{Path(NAMES[3]).stem}_entities.json").unlink()
+    assert sharding.check_shards(sharding.read_reports(2)) == [f"No entities file for {NAMES[3]}"]
+
+
+def test_reports_of_another_split_are_ignored(results_dir):
+    run_shards(2)
+    run_shards(3)
+    assert sharding.report_counts() == [2, 3]
+    assert [r["shard"] for r in sharding.read_reports(2)] == [0, 1]
+    assert sharding.check_shards(sharding.read_reports(2)) == []
+
+
+def merge(monkeypatch, *args):
+    monkeypatch.setattr(sys, "argv", ["sharding", "merge", *args])
+    sharding.main()
+
+
+def test_merge(results_dir, monkeypatch, capsys):
+    run_shards(2)
+    merge(monkeypatch)
+    assert "All 2 shards complete, 40 documents" in capsys.readouterr().out
+    with sharding.DUPLICATES_JSON.open(encoding="utf-8") as f:
+        assert sorted(json.load(f)) == ["copy_0.xmi", "copy_1.xmi"]
+
+    # two splits in the results: only with --shards
+    run_shards(3, skip={2})
+    with pytest.raises(SystemExit):
+        merge(monkeypatch)
+    assert "choose one with --shards" in capsys.readouterr().err
+    merge(monkeypatch, "--shards", "2")
+    with pytest.raises(SystemExit):
+        merge(monkeypatch, "--shards", "3")
+    assert "Missing shards [2] of 3" in capsys.readouterr().err
@@ -0,0 +1,81 @@
+"""
+milestone_2/ml_spacy/spacy_ner.py on an untrained stand-in for de_core_news_md, stored like a bundle copy
+"""
+import pytest
+
+spacy = pytest.importorskip("spacy")
+
+from milestone_2.ml_spacy import spacy_ner  # noqa: E402
+from milestone_2.ml_spacy.spacy_ner import CHUNK_CHARS, PROFILES, SpacyNer, load_pipeline  # noqa: E402
+
+PARAGRAPHS = [
+    "Abg. Dr. Kogler sprach in Wien über den Haushalt. Der Präsident dankte ihm.",
+    "Dann sprach Frau Rendi Wagner aus Wien.\nSie forderte mehr Geld für Graz und Linz!",
+    "Bundesminister Figl (ÖVP): Die Republik Österreich braucht Stabilität, sagte er in Salzburg.",
+]
+
+
+@pytest.fixture(scope="module")
+def pipeline_dir(tmp_path_factory):
+    # the components of de_core_news_md, senter disabled like in the package
+    nlp = spacy.blank("de")
+    for component in ("tok2vec", "tagger", "parser", "senter", "ner", "attribute_ruler"):
+        nlp.add_pipe(component)
+    nlp.get_pipe("tagger").add_label("NN")
+    nlp.get_pipe("parser").add_label("nk")
+    nlp.get_pipe("ner").add_label("LOC")
+    nlp.initialize()
+    nlp.disable_pipe("senter")
+    path = tmp_path_factory.mktemp("spacy") / "de_core_news_md"
+    nlp.to_disk(path)
+    return path
+
+
+def test_ner_only_keeps_sentence_boundaries(pipeline_dir):
+    nlp = load_pipeline(str(pipeline_dir), "ner-only")
+    assert nlp.pipe_names == ["senter", "ner"]
+    assert not nlp.disabled
+    assert nlp("Ich wohne in Wien. Du wohnst in Graz.").has_annotation("SENT_START")
+
+
+def test_full_profile(pipeline_dir):
+    nlp = load_pipeline(str(pipeline_dir), "full")
+    assert {"tagger", "parser", "ner", "attribute_ruler"} <= set(nlp.pipe_names)
+    assert nlp.disabled == ["senter"]
+    assert PROFILES["full"] == {"exclude": [], "enable": []}
+
+
+@pytest.fixture
+def ruler_ner(monkeypatch):
+    # an entity ruler instead of the statistical NER, so every chunking gets the same entities
+    def ruler_pipeline(name, profile):
+        nlp = spacy.blank("de")
+        nlp.add_pipe("entity_ruler").add_patterns(
+            [{"label": "LOC", "pattern": city} for city in ("Wien", "Graz", "Linz", "Salzburg", "Österreich")]
+            + [{"label": "PER", "pattern": [{"TEXT": "Rendi"}, {"TEXT": "Wagner"}]},
+               {"label": "PER", "pattern": "Kogler"}, {"label": "ORG", "pattern": "ÖVP"}])
+        return nlp
+
+    monkeypatch.setattr(spacy_ner, "load_pipeline", ruler_pipeline)
+
+
+def long_text(n_chars: int) -> str:
+    paragraphs = []
+    while sum(len(p) + 2 for p in paragraphs) < n_chars:
+        paragraphs.append(PARAGRAPHS[len(paragraphs) % len(PARAGRAPHS)] * (1 + len(paragraphs) % 4))
+    return "\n\n".join(paragraphs)
+
+
+def test_chunked_output_is_identical(ruler_ner):
+    text = long_text(250_000)
+    whole = SpacyNer(chunk_chars=len(text)).annotate(text)
+    assert whole
+    for chunk_chars in (CHUNK_CHARS, 10_000, 1_000):
+        assert SpacyNer(chunk_chars=chunk_chars).annotate(text) == whole
+
+
+def test_batch_of_chunked_texts(ruler_ner):
+    texts = [long_text(n) for n in (500, 5_000, 120_000)] + [""]
+    ner = SpacyNer(chunk_chars=2_000)
+    unchunked = SpacyNer(chunk_chars=200_000)
+    assert ner.annotate_batch(texts, batch_size=3) == [unchunked.annotate(text) for text in texts]
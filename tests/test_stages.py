@@ -0,0 +1,107 @@
+"""
+StagedAnnotator of milestone_2/stages.py with stub annotators
+"""
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from milestone_2.entities import Entity
+from milestone_2.stages import StagedAnnotator, parse_stage_workers
+
+
+class Stub:
+    # finds a word, slower for longer texts so documents finish out of order; records its threads
+    def __init__(self, word: str, label: str):
+        self.word, self.label = word, label
+        self.threads = set()
+
+    def __call__(self, text: str) -> list[Entity]:
+        self.threads.add(threading.current_thread().name)
+        time.sleep(len(text) / 20000)
+        start = text.find(self.word)
+        if start < 0:
+            return []
+        return [Entity(self.word, self.label, start, start + len(self.word))]
+
+
+def failing(text: str) -> list[Entity]:
+    if "Fehler" in text:
+        raise RuntimeError("stub failure")
+    return []
+
+
+def texts():
+    return {Path(f"doc{i}.xmi"): "x" * (100 * ((7 * i) % 5)) + f" Wien {i} Kogler" for i in range(12)}
+
+
+def run(staged: StagedAnnotator, documents: dict, model_names=None) -> dict:
+    finished = []
+    for path, text in documents.items():
+        finished.extend(staged.submit(path, text, [], model_names))
+    finished.extend(staged.join())
+    return {path: (preds, errors) for path, _, preds, _, errors in finished}
+
+
+def test_predictions_of_every_document():
+    documents = texts()
+    models = {"rule_based": Stub("Kogler", "PER"), "spacy": Stub("Wien", "LOC")}
+    results = run(StagedAnnotator(models, {"rule_based": 1, "spacy": 1}, max_in_flight=3), documents)
+
+    assert set(results) == set(documents)
+    for path, (preds, errors) in results.items():
+        assert not errors
+        # joined in model order, whatever stage finished first
+        assert list(preds) == ["rule_based", "spacy"]
+        assert preds == {name: model(documents[path]) for name, model in models.items()}
+
+
+def test_model_names_restrict_the_stages():
+    models = {"rule_based": Stub("Kogler", "PER"), "spacy": Stub("Wien", "LOC")}
+    results = run(StagedAnnotator(models, {}), texts(), ["spacy"])
+    assert all(list(preds) == ["spacy"] for preds, _ in results.values())
+
+
+def test_errors_per_model():
+    documents = {Path("a.xmi"): "Wien", Path("b.xmi"): "Fehler in Wien"}
+    models = {"flair": failing, "spacy": Stub("Wien", "LOC")}
+    results = run(StagedAnnotator(models, {}), documents)
+
+    assert results[Path("a.xmi")][1] == {}
+    preds, errors = results[Path("b.xmi")]
+    assert list(errors) == ["flair"] and isinstance(errors["flair"], RuntimeError)
+    assert list(preds) == ["spacy"]
+
+
+def test_every_thread_has_its_own_instance():
+    replicas = []
+
+    def replicate(model_name):
+        replicas.append(Stub("Wien", "LOC"))
+        return replicas[-1]
+
+    first = Stub("Wien", "LOC")
+    documents = texts()
+    results = run(StagedAnnotator({"flair": first}, {"flair": 3}, replicate, max_in_flight=6), documents)
+
+    assert len(replicas) == 2
+    assert len(results) == len(documents)
+    instances = [first] + replicas
+    for a in instances:
+        assert len(a.threads) <= 1
+        for b in instances:
+            assert a is b or not a.threads & b.threads
+
+
+def test_single_thread_without_replicate():
+    model = Stub("Wien", "LOC")
+    run(StagedAnnotator({"flair": model}, {"flair": 3}, max_in_flight=6), texts())
+    assert model.threads == {"stage-flair-0"}
+
+
+def test_parse_stage_workers():
+    assert parse_stage_workers("flair=3", ["rule_based", "flair"]) == {"rule_based": 1, "flair": 3}
+    assert parse_stage_workers(None, ["spacy"]) == {"spacy": 1}
+    with pytest.raises(ValueError):
+        parse_stage_workers("bert=2", ["spacy"])
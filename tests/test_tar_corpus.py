@@ -0,0 +1,67 @@
+"""
+Reading documents straight from GerParCor tar archives, milestone_2/preprocessing_gerparcor/tar_corpus.py
+"""
+import gzip
+import io
+import tarfile
+
+import pytest
+
+from benchmarks.synthetic_corpus import generate_xmi
+from milestone_2.preprocessing_gerparcor.tar_corpus import TarCorpus, logical_name
+from milestone_2.preprocessing_gerparcor.xmi_parser import XmiParser
+
+
+@pytest.mark.parametrize("member, name", [
+    ("Nationalrat/01.10.1920_102._Sitzung.xmi.gz", "NR_102.S_01.10.1920.xmi"),
+    ("Nationalrat/01.10.1920_102._Sitzung.xmi.xmi", "NR_102.S_01.10.1920.xmi"),
+    ("Bundesrat/Plenarprotokoll_2._Sitzung,_12.09.1949.xmi.gz", "BR_2.S_12.09.1949.xmi"),
+    ("Bundesrat/Plenarprotokoll_2._Sitzung,_12.09.1949.xmi", "BR_2.S_12.09.1949.xmi"),
+    ("misc/Anhang.xmi.gz", "Anhang.xmi"),
+    ("misc/Anhang", "Anhang.xmi"),
+])
+def test_logical_name(member, name):
+    assert logical_name(member) == name
+
+
+def add(tf: tarfile.TarFile, name: str, data: bytes):
+    info = tarfile.TarInfo(name)
+    info.size = len(data)
+    tf.addfile(info, io.BytesIO(data))
+
+
+@pytest.fixture
+def archives(tmp_path):
+    nr = tmp_path / "Nationalrat.tar"
+    with tarfile.open(nr, "w") as tf:
+        add(tf, "Nationalrat/01.10.1920_102._Sitzung.xmi.gz", gzip.compress(generate_xmi(300, 0), mtime=0))
+        add(tf, "Nationalrat/12.03.1975_5._Sitzung.xmi", generate_xmi(200, 1))
+    br = tmp_path / "Bundesrat.tar.gz"
+    with tarfile.open(br, "w:gz") as tf:
+        add(tf, "Bundesrat/Plenarprotokoll_1._Sitzung,_07.09.1949.xmi.gz", gzip.compress(generate_xmi(100, 2), mtime=0))
+    return [nr, br]
+
+
+def test_documents_match_extracted_files(tmp_path, archives):
+    corpus = TarCorpus(archives)
+    assert corpus.names() == ["NR_102.S_01.10.1920.xmi", "NR_5.S_12.03.1975.xmi", "BR_1.S_07.09.1949.xmi"]
+
+    parser = XmiParser()
+    for name, seed, n_tokens in (("NR_102.S_01.10.1920.xmi", 0, 300), ("NR_5.S_12.03.1975.xmi", 1, 200),
+                                 ("BR_1.S_07.09.1949.xmi", 2, 100)):
+        extracted = tmp_path / name
+        extracted.write_bytes(generate_xmi(n_tokens, seed))
+        assert corpus.load(extracted) == parser.parse(extracted)
+    assert [name for name, _ in corpus.iter_documents()] == corpus.names()
+    corpus.close()
+
+
+def test_later_member_wins(tmp_path):
+    archive = tmp_path / "Nationalrat.tar"
+    with tarfile.open(archive, "w") as tf:
+        add(tf, "a/01.10.1920_102._Sitzung.xmi", generate_xmi(100, 0))
+        add(tf, "b/01.10.1920_102._Sitzung.xmi.gz", gzip.compress(generate_xmi(100, 1), mtime=0))
+    corpus = TarCorpus([archive])
+    assert corpus.names() == ["NR_102.S_01.10.1920.xmi"]
+    assert corpus.member("NR_102.S_01.10.1920.xmi").name.startswith("b/")
+    corpus.close()